@@ -14,62 +14,155 @@ from types import FunctionType
 
 import numpy as np
 cimport numpy as cnp
+cimport cython
 
 
-cdef cnp.ndarray[cnp.uint8_t, ndim=1] \
-    _make_filter_array_general(arr,
-                               ids,
-                               metadata,
-                               func,
-                               axis,
-                               cnp.uint8_t invert):
+# the dtypes in which a table stores its values
+ctypedef fused storage_t:
+    cnp.uint32_t
+    cnp.int64_t
+    cnp.float32_t
+    cnp.float64_t
+
+
+def _make_filter_array_general(storage_t[::1] data, cnp.int32_t[::1] indptr,
+                               cnp.int32_t[::1] indices, row_or_col, ids,
+                               metadata, func):
     """Faster version of
-    [func(vals_i, id_i, md_i) ^ invert for
+    [func(vals_i, id_i, md_i) for
     (vals_i, id_i, md_i) in zip(ids, metadata, rows/cols)]
+
+    The dense vector handed to func is row_or_col, an array of zeros of the
+    dtype of data. It is reused: only the entries of the previous vector are
+    cleared before the next one is scattered in, so each call costs O(nnz) of
+    the vector rather than O(n).
     """
     cdef:
-        Py_ssize_t i, j, n = arr.shape[::-1][axis]
-        cnp.ndarray[cnp.float64_t, ndim=1] data = arr.data, \
-                                           row_or_col = np.zeros(n)
-        cnp.ndarray[cnp.int32_t, ndim=1] indptr = arr.indptr, \
-                                         indices = arr.indices
+        Py_ssize_t i, j
+        storage_t[::1] dense = row_or_col
         cnp.ndarray[cnp.uint8_t, ndim=1] bools = \
             np.empty(len(ids), dtype=np.uint8)
-        cnp.int32_t start, end
+        cnp.int32_t start, end, last_start = 0, last_end = 0
 
     for i in range(len(ids)):
+        for j in range(last_start, last_end):
+            dense[indices[j]] = 0
+
         start, end = indptr[i], indptr[i+1]
+        for j in range(start, end):
+            dense[indices[j]] = data[j]
+        last_start, last_end = start, end
 
-        # The following loop should be equivalent to
-        # row_or_col = np.zeros(n)
-        # row_or_col.put(indices[start:end], data[start:end])
-        for j in range(n):
-            if start >= end or j < indices[start]:
-                row_or_col[j] = 0
-            elif j == indices[start]:
-                row_or_col[j] = data[start]
-                start += 1
-
-        # After converting the output of the filtering function to a
-        # bool, we XOR it with invert (if invert is false it doesn't
-        # modify the function output, if it's true it inverts it).
-        bools[i] = bool(func(row_or_col, ids[i], metadata[i])) ^ invert
+        bools[i] = bool(func(row_or_col, ids[i], metadata[i]))
 
     return bools
 
-cdef _remove_rows_csr(arr, cnp.ndarray[cnp.uint8_t, ndim=1] booleans):
-    """Sparse equivalent of arr[booleans] for a dense array.
+
+cdef cnp.ndarray[cnp.uint8_t, ndim=1] \
+    _make_filter_array_ids(dict index, ids_to_keep, Py_ssize_t n):
+    """Mark the positions of ids_to_keep, looked up in the index of the ids
     """
-    cdef Py_ssize_t m, n, row, j, offset, offset_rows, nnz
+    cdef cnp.ndarray[cnp.uint8_t, ndim=1] bools = np.zeros(n, dtype=np.uint8)
+
+    for id_ in ids_to_keep:
+        bools[<Py_ssize_t>index[id_]] = 1
+
+    return bools
+
+
+@cython.boundscheck(False)
+@cython.wraparound(False)
+def _vector_stats(storage_t[::1] data, cnp.int64_t[::1] indptr,
+                  double[::1] totals, cnp.int64_t[::1] nnz):
+    """The total and the number of nonzero values of each vector"""
+    cdef Py_ssize_t i, j
+
+    with nogil:
+        for i in range(indptr.shape[0] - 1):
+            totals[i] = 0
+            nnz[i] = 0
+            for j in range(indptr[i], indptr[i + 1]):
+                totals[i] += data[j]
+                if data[j] != 0:
+                    nnz[i] += 1
+
+
+def _filter_mask(arr, ids, metadata, index, ids_to_keep, vectorized=False,
+                 min_total=None, min_nnz=None):
+    """Evaluate which vectors of a compressed sparse matrix are kept
+
+    Parameters
+    ----------
+    arr : {csr_matrix, csc_matrix}
+        The rows of a csr matrix, or the columns of a csc matrix, are the
+        vectors to evaluate
+    ids : 1D array_like
+    metadata : 1D array_like or None
+    index : dict
+        Maps id to index
+    ids_to_keep : function, iterable or None
+        If ``None``, only `min_total` and `min_nnz` are evaluated
+    vectorized : bool, optional
+        If ``True``, `ids_to_keep` is called once as
+        ``ids_to_keep(arr, ids, metadata)`` and must return one boolean per
+        vector
+    min_total : number, optional
+        Only keep the vectors whose values sum to at least `min_total`
+    min_nnz : int, optional
+        Only keep the vectors with at least `min_nnz` nonzero values
+
+    Returns
+    -------
+    1D ndarray of bool
+    """
+    n = len(ids)
+
+    if ids_to_keep is None:
+        keep = np.ones(n, dtype=bool)
+    elif vectorized:
+        if not callable(ids_to_keep):
+            raise TypeError("ids_to_keep must be a function if vectorized")
+        keep = np.array(ids_to_keep(arr, ids, metadata), dtype=bool)
+        if keep.shape != (n,):
+            raise ValueError("ids_to_keep must return %d booleans, got an "
+                             "array of shape %s" % (n, keep.shape))
+    elif isinstance(ids_to_keep, Iterable):
+        keep = _make_filter_array_ids(index, ids_to_keep, n).view(bool)
+    elif isinstance(ids_to_keep, FunctionType):
+        if metadata is None:
+            metadata = (None,) * n
+        length = arr.shape[1] if arr.getformat() == 'csr' else arr.shape[0]
+        keep = _make_filter_array_general(arr.data, arr.indptr, arr.indices,
+                                          np.zeros(length, dtype=arr.dtype),
+                                          ids, metadata,
+                                          ids_to_keep).view(bool)
+    else:
+        raise TypeError("ids_to_keep must be an iterable or a function")
+
+    if min_total is not None or min_nnz is not None:
+        totals = np.empty(n, dtype=np.float64)
+        nnz = np.empty(n, dtype=np.int64)
+        _vector_stats(np.ascontiguousarray(arr.data),
+                      np.asarray(arr.indptr, dtype=np.int64), totals, nnz)
+
+        if min_total is not None:
+            keep &= totals >= min_total
+        if min_nnz is not None:
+            keep &= nnz >= min_nnz
+
+    return keep
+
+def _compact_rows(storage_t[::1] data, cnp.int32_t[::1] indptr,
+                  cnp.int32_t[::1] indices, cnp.uint8_t[::1] booleans):
+    """Move the rows of the CSR arrays which are kept to their front, in
+    place, and return the number of values kept
+    """
+    cdef Py_ssize_t row, j, offset, offset_rows, nnz
     cdef cnp.int32_t start, end
-    cdef cnp.ndarray[cnp.int32_t, ndim=1] indptr = arr.indptr
-    cdef cnp.ndarray[cnp.int32_t, ndim=1] indices = arr.indices
-    cdef cnp.ndarray[cnp.float64_t, ndim=1] data = arr.data
-    m, n = arr.shape
     offset_rows = 0
     offset = 0
     nnz = 0
-    for row in range(m):
+    for row in range(booleans.shape[0]):
         start, end = indptr[row], indptr[row+1]
         if booleans[row]:
             indptr[row-offset_rows] = nnz
@@ -81,12 +174,21 @@ cdef _remove_rows_csr(arr, cnp.ndarray[cnp.uint8_t, ndim=1] booleans):
         else:
             offset += end - start
             offset_rows += 1
-    arr.data = data[:nnz]
-    arr.indices = indices[:nnz]
-    arr.indptr = indptr[:m-offset_rows+1]
-    arr._shape = (m - offset_rows, n)
+    return nnz
+
 
-def _filter(arr, ids, metadata, index, ids_to_keep, axis, invert):
+cdef _remove_rows_csr(arr, cnp.ndarray[cnp.uint8_t, ndim=1] booleans):
+    """Sparse equivalent of arr[booleans] for a dense array.
+    """
+    nnz = _compact_rows(arr.data, arr.indptr, arr.indices, booleans)
+    n_rows = np.count_nonzero(booleans)
+    arr.data = arr.data[:nnz]
+    arr.indices = arr.indices[:nnz]
+    arr.indptr = arr.indptr[:n_rows + 1]
+    arr._shape = (n_rows, arr.shape[1])
+
+def _filter(arr, ids, metadata, index, ids_to_keep, axis, invert,
+            vectorized=False, min_total=None, min_nnz=None, shared=False):
     """Filter row/columns of a sparse matrix according to the output of a
     boolean function.
 
@@ -97,9 +199,16 @@ def _filter(arr, ids, metadata, index, ids_to_keep, axis, invert):
     metadata : 1D array_like
     index : dict
         Maps id to index
-    ids_to_keep : function or iterable
+    ids_to_keep : function, iterable or None
     axis : int
     invert : bool
+    vectorized : bool, optional
+    min_total : number, optional
+    min_nnz : int, optional
+        See ``_filter_mask``
+    shared : bool, optional
+        Whether `arr` is shared with another table. If so, it is not filtered
+        in place, and the vectors kept are copied into a new matrix instead.
 
     Returns
     -------
@@ -107,43 +216,37 @@ def _filter(arr, ids, metadata, index, ids_to_keep, axis, invert):
     ids : 1D ndarray of dtype object
     metadata : tuple
     """
-    invert = bool(invert)
-    metadata_is_None = metadata is None
-
-    # General version (i.e., filter functions accepts values, ids and
-    # metadata) requires CSR for axis 0 and CSC for axis 1.
+    # The vectors to filter are the rows of a CSR matrix for axis 0 and the
+    # columns of a CSC matrix for axis 1.
+    original = arr
     if axis == 0:
         arr = arr.tocsr()
     elif axis == 1:
         arr = arr.tocsc()
-    fmt = arr.getformat()
-
-    cdef cnp.ndarray[cnp.uint8_t, ndim=1] bools
-
-    if metadata_is_None:
-        metadata = (None,) * len(ids)
 
-    if isinstance(ids_to_keep, Iterable):
-        idx = [index[id_] for id_ in ids_to_keep]
-        ids_to_keep = np.zeros(len(ids), dtype=bool)
-        ids_to_keep.put(idx, True)
-        bools = np.bitwise_xor(ids_to_keep, invert).view(np.uint8)
-    elif isinstance(ids_to_keep, FunctionType):
-        bools = _make_filter_array_general(arr, ids, metadata, ids_to_keep,
-                                           axis, invert)
-    else:
-        raise TypeError("ids_to_keep must be an iterable or a function")
-
-    if axis == 0:
+    keep = _filter_mask(arr, ids, metadata, index, ids_to_keep,
+                        vectorized=vectorized, min_total=min_total,
+                        min_nnz=min_nnz)
+    if invert:
+        keep = ~keep
+
+    cdef cnp.ndarray[cnp.uint8_t, ndim=1] bools = keep.view(np.uint8)
+
+    if shared and arr is original:
+        # only a converted matrix is our own to filter in place
+        if axis == 0:
+            arr = arr[np.flatnonzero(keep)]
+        elif axis == 1:
+            arr = arr[:, np.flatnonzero(keep)]
+    elif axis == 0:
         _remove_rows_csr(arr, bools)
     elif axis == 1:
         arr = arr.T  # arr was CSC, CSR after transposing
         _remove_rows_csr(arr, bools)
         arr = arr.T  # Back to CSC
 
-    ids = np.asarray(list(compress(ids, bools)), dtype=object)
-    metadata = tuple(compress(metadata, bools))
+    ids = np.asarray(ids, dtype=object)[keep]
+    if metadata is not None:
+        metadata = tuple(compress(metadata, bools))
 
-    if metadata_is_None:
-        metadata = None
     return arr, ids, metadata
@@ -8,60 +8,248 @@
 
 from __future__ import division
 
+import threading
+
 import numpy as np
 cimport numpy as cnp
+cimport cython
+from libc.stdint cimport uint64_t, int64_t, UINT64_MAX
+from libc.stdlib cimport malloc, free
+
+
+# the dtypes in which a table stores its values
+ctypedef fused storage_t:
+    cnp.uint32_t
+    cnp.int64_t
+    cnp.float32_t
+    cnp.float64_t
+
+
+# Each vector draws from its own SplitMix64 stream, which is keyed by the seed
+# of the subsample and the index of the vector. The result of a vector is thus
+# independent of the order in which, and of the thread on which, the vectors
+# are subsampled.
+
+cdef inline uint64_t _mix(uint64_t z) nogil:
+    z = (z ^ (z >> 30)) * 0xBF58476D1CE4E5B9ULL
+    z = (z ^ (z >> 27)) * 0x94D049BB133111EBULL
+    return z ^ (z >> 31)
+
+
+cdef inline uint64_t _next(uint64_t *state) nogil:
+    state[0] += 0x9E3779B97F4A7C15ULL
+    return _mix(state[0])
+
+
+cdef inline uint64_t _bounded(uint64_t *state, uint64_t bound) nogil:
+    """A uniform integer in [0, bound)"""
+    cdef uint64_t r, limit = UINT64_MAX - UINT64_MAX % bound
+    r = _next(state)
+    while r >= limit:
+        r = _next(state)
+    return r % bound
+
+
+cdef inline double _uniform(uint64_t *state) nogil:
+    """A uniform double in [0, 1)"""
+    return (_next(state) >> 11) * (1.0 / 9007199254740992.0)
+
+
+@cython.boundscheck(False)
+@cython.wraparound(False)
+cdef void _without_replacement(storage_t *data, Py_ssize_t length,
+                               int64_t n, uint64_t *state,
+                               int64_t *tree) nogil:
+    """Draw n items from the counts in data, in place
+
+    The items are drawn one at a time from the remaining items, whose counts
+    are held in a Fenwick tree, which gives an exact multivariate
+    hypergeometric draw in O(n log(length)) time and O(length) memory. If
+    more than half of the items are kept, the items to drop are drawn instead.
+    """
+    cdef:
+        int64_t total = 0, take, u, count
+        Py_ssize_t i, j, pos, step, top = 1
+        bint complement
+
+    for i in range(length):
+        total += <int64_t>data[i]
+
+    if total < n:
+        for i in range(length):
+            data[i] = 0
+        return
+
+    complement = n > total - n
+    take = total - n if complement else n
+
+    # build the tree, tree[1..length], from the counts
+    tree[0] = 0
+    for i in range(length):
+        tree[i + 1] = <int64_t>data[i]
+    for i in range(1, length + 1):
+        j = i + (i & -i)
+        if j <= length:
+            tree[j] += tree[i]
+    while top * 2 <= length:
+        top *= 2
+
+    for i in range(length):
+        data[i] = <int64_t>data[i] if complement else 0
+
+    for count in range(take):
+        # find the first position whose cumulative count exceeds u
+        u = <int64_t>_bounded(state, <uint64_t>(total - count))
+        pos = 0
+        step = top
+        while step:
+            j = pos + step
+            if j <= length and tree[j] <= u:
+                pos = j
+                u -= tree[j]
+            step >>= 1
 
+        if complement:
+            data[pos] -= 1
+        else:
+            data[pos] += 1
+
+        j = pos + 1
+        while j <= length:
+            tree[j] -= 1
+            j += j & -j
+
+
+@cython.boundscheck(False)
+@cython.wraparound(False)
+cdef void _with_replacement(storage_t *data, Py_ssize_t length, int64_t n,
+                            uint64_t *state, double *cumulative) nogil:
+    """Draw n items with probabilities proportional to data, in place"""
+    cdef:
+        double total = 0, u
+        int64_t count
+        Py_ssize_t i, lo, hi, mid
+
+    for i in range(length):
+        total += data[i]
+        cumulative[i] = total
+        data[i] = 0
 
-def _subsample(arr, n, with_replacement):
-    """Subsample non-zero values of a sparse array
+    if total <= 0:
+        return
+
+    for count in range(n):
+        u = _uniform(state) * total
+        lo = 0
+        hi = length - 1
+        while lo < hi:
+            mid = (lo + hi) // 2
+            if cumulative[mid] > u:
+                hi = mid
+            else:
+                lo = mid + 1
+        data[lo] += 1
+
+
+@cython.boundscheck(False)
+@cython.wraparound(False)
+def _subsample_block(storage_t[::1] data, cnp.int64_t[::1] indptr,
+                     Py_ssize_t first, Py_ssize_t last, int64_t n,
+                     bint with_replacement, uint64_t seed,
+                     Py_ssize_t max_length):
+    """Subsample the vectors [first, last) of a compressed matrix in place"""
+    cdef:
+        int64_t *tree
+        double *cumulative
+        uint64_t state
+        Py_ssize_t i, start, end
+
+    tree = <int64_t *>malloc((max_length + 1) * sizeof(int64_t))
+    cumulative = <double *>malloc((max_length + 1) * sizeof(double))
+    if tree == NULL or cumulative == NULL:
+        free(tree)
+        free(cumulative)
+        raise MemoryError()
+
+    with nogil:
+        for i in range(first, last):
+            start = indptr[i]
+            end = indptr[i + 1]
+            if start == end:
+                continue
+
+            state = _mix(seed ^ _mix(<uint64_t>i + 1))
+            if with_replacement:
+                _with_replacement(&data[start], end - start, n, &state,
+                                  cumulative)
+            else:
+                _without_replacement(&data[start], end - start, n, &state,
+                                     tree)
+
+    free(tree)
+    free(cumulative)
+
+
+def _subsample(arr, n, with_replacement, seed, n_threads=1):
+    """Subsample the vectors of a compressed sparse matrix in place
 
     Parameters
     ----------
     arr : {csr_matrix, csc_matrix}
-        A 1xM sparse vector
+        The matrix to subsample. The rows of a csr matrix, or the columns of
+        a csc matrix, are subsampled
     n : int
-        Number of items to subsample from `arr`
-    
-    Returns
-    -------
-    ndarray
-        Subsampled data
+        Number of items to subsample from each vector
+    with_replacement : bool
+        If ``False``, draw without replacement; a vector whose total is less
+        than `n` is zeroed. If ``True``, draw with replacement with
+        probabilities proportional to the values of the vector.
+    seed : int
+        The seed, in [0, 2 ** 64), from which the random stream of each vector
+        is derived
+    n_threads : int, optional
+        The number of threads over which the vectors are spread. The result
+        does not depend on it.
 
     Notes
     -----
-    This code was adapted from scikit-bio (`skbio.math._subsample`)
+    Without replacement, the values are truncated to integers and drawn from
+    a multivariate hypergeometric distribution, so memory does not depend on
+    the sum of the values.
 
+    The values are subsampled in the dtype of `arr`, which must be one of
+    uint32, int64, float32 or float64.
     """
-    cdef:
-        cnp.int64_t counts_sum
-        cnp.ndarray[cnp.float64_t, ndim=1] data = arr.data
-        cnp.ndarray[cnp.int32_t, ndim=1] data_i = arr.data.astype(np.int32)
-        cnp.ndarray[cnp.float64_t, ndim=1] result
-        cnp.ndarray[cnp.int32_t, ndim=1] indices = arr.indices
-        cnp.ndarray[cnp.int32_t, ndim=1] indptr = arr.indptr
-        cnp.ndarray[cnp.int32_t, ndim=1] permuted, unpacked, r
-        cnp.float64_t cnt
-        Py_ssize_t i, j, length
-
-    for i in range(indptr.shape[0] - 1):
-        start, end = indptr[i], indptr[i+1]
-        length = end - start
-        counts_sum = data[start:end].sum()
-        
-        if with_replacement:
-            pvals = data[start:end] / counts_sum
-            data[start:end] = np.random.multinomial(n, pvals)
-        else:
-            if counts_sum < n:
-                data[start:end] = 0
-                continue
+    arr.data = np.ascontiguousarray(arr.data)
+    indptr = np.asarray(arr.indptr, dtype=np.int64)
+    n_vectors = len(indptr) - 1
+    if n_vectors < 1 or not arr.nnz:
+        return
+
+    max_length = int(np.diff(indptr).max())
+    bounds = np.linspace(0, n_vectors, max(1, min(n_threads, n_vectors)) + 1)
+    bounds = bounds.astype(int)
+    args = (arr.data, indptr)
+    extra = (n, with_replacement, seed, max_length)
+
+    if len(bounds) == 2:
+        _subsample_block(*(args + (0, n_vectors) + extra))
+        return
+
+    errors = []
 
-            r = np.arange(length, dtype=np.int32)
-            unpacked = np.repeat(r, data_i[start:end])
-            permuted = np.random.permutation(unpacked)[:n]
+    def work(first, last):
+        try:
+            _subsample_block(*(args + (first, last) + extra))
+        except Exception as e:
+            errors.append(e)
 
-            result = np.zeros(length, dtype=np.float64)
-            for idx in range(permuted.shape[0]):
-                result[permuted[idx]] += 1
+    threads = [threading.Thread(target=work, args=(first, last))
+               for first, last in zip(bounds[:-1], bounds[1:])]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
 
-            data[start:end] = result
\ No newline at end of file
+    if errors:
+        raise errors[0]
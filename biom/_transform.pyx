@@ -37,9 +37,11 @@ def _transform(arr, ids, metadata, function, axis):
     cdef:
         Py_ssize_t n, row_or_col
         cnp.ndarray[cnp.int32_t, ndim=1] indptr = arr.indptr
-        cnp.ndarray[cnp.float64_t, ndim=1] data = arr.data
         cdef cnp.int32_t start, end
 
+    # the values are transformed in, and cast back to, the dtype of arr
+    data = arr.data
+
     if metadata is None:
         metadata = (None,) * len(ids)
 
@@ -0,0 +1,526 @@
+#!/usr/bin/env python
+r"""
+Benchmarks (:mod:`biom.bench`)
+==============================
+
+.. currentmodule:: biom.bench
+
+A small benchmark harness for timing common ``Table`` operations over the
+shape and density grid of tables shipped in ``tests/bench_tables``. The table
+files are named ``<n_obs>x<n_samp>x<density>_bench[_hdf5].biom.gz``.
+
+Results can be written as JSON or CSV, and a JSON results file from a previous
+run can be used as a baseline to flag regressions.
+
+Functions
+---------
+
+.. autosummary::
+   :toctree: generated/
+
+   find_bench_tables
+   run_benchmarks
+   write_results
+   load_results
+   compare_to_baseline
+
+Examples
+--------
+Run the suite from the command line over the tables with at most 1e6 cells,
+and compare against a previous run:
+
+$ python -m biom.bench -o results.json --max-size 1000000 \
+      --baseline-fp baseline.json
+
+"""
+
+# ----------------------------------------------------------------------------
+# Copyright (c) 2011-2017, The BIOM Format Development Team.
+#
+# Distributed under the terms of the Modified BSD License.
+#
+# The full license is in the file COPYING.txt, distributed with this software.
+# ----------------------------------------------------------------------------
+
+from __future__ import division
+
+import io
+import os
+import re
+import sys
+import csv
+import json
+import platform
+from collections import OrderedDict
+from datetime import datetime
+from shutil import rmtree
+from tempfile import NamedTemporaryFile, mkdtemp
+from timeit import default_timer
+
+import click
+import numpy as np
+import scipy
+import six
+
+from biom.table import Table
+from biom.parse import load_table
+from biom.util import HAVE_H5PY, __version__
+
+
+BENCH_TABLE_RE = re.compile(
+    r'^(\d+)x(\d+)x(\d*\.?\d+)_bench(_hdf5)?\.biom(\.gz)?$')
+DEFAULT_BENCH_DIR = os.path.join(
+    os.path.dirname(os.path.dirname(os.path.abspath(__file__))),
+    'tests', 'bench_tables')
+RESULT_FIELDS = ['benchmark', 'n_observations', 'n_samples', 'density',
+                 'repeat', 'min', 'median', 'max', 'error']
+
+
+def find_bench_tables(path=DEFAULT_BENCH_DIR, max_size=None):
+    """Locate the benchmark tables in a directory
+
+    Parameters
+    ----------
+    path : str, optional
+        The directory containing the benchmark tables.
+    max_size : int, optional
+        If provided, skip tables with more than ``max_size`` cells (i.e.,
+        observations * samples).
+
+    Returns
+    -------
+    list of dict
+        Each dict describes a single shape and density, and has the keys
+        ``n_observations``, ``n_samples``, ``density``, ``json`` and ``hdf5``
+        where the latter two are filepaths or ``None`` if the format is not
+        present. The list is sorted by size, and then by density.
+    """
+    tables = {}
+    for fname in os.listdir(path):
+        match = BENCH_TABLE_RE.match(fname)
+        if match is None:
+            continue
+
+        n_obs, n_samp, density, is_hdf5, _ = match.groups()
+        key = (int(n_obs), int(n_samp), float(density))
+        if key not in tables:
+            tables[key] = {'n_observations': key[0], 'n_samples': key[1],
+                           'density': key[2], 'json': None, 'hdf5': None}
+
+        fmt = 'hdf5' if is_hdf5 else 'json'
+        tables[key][fmt] = os.path.join(path, fname)
+
+    found = []
+    for key in sorted(tables, key=lambda k: (k[0] * k[1], k)):
+        if max_size is not None and key[0] * key[1] > max_size:
+            continue
+        found.append(tables[key])
+
+    return found
+
+
+def _bench_load_table_json(table, paths):
+    return lambda: load_table(paths['json'])
+
+
+def _bench_load_table_hdf5(table, paths):
+    return lambda: load_table(paths['hdf5'])
+
+
+def _bench_from_hdf5(table, paths):
+    import h5py
+
+    def f():
+        with h5py.File(paths['hdf5'], 'r') as fp:
+            Table.from_hdf5(fp)
+    return f
+
+
+def _bench_to_hdf5(table, paths):
+    import h5py
+
+    def f():
+        with NamedTemporaryFile(suffix='.biom') as tmp:
+            with h5py.File(tmp.name, 'w') as fp:
+                table.to_hdf5(fp, 'biom.bench')
+    return f
+
+
+def _bench_to_json(table, paths):
+    return lambda: table.to_json('biom.bench')
+
+
+def _bench_from_tsv(table, paths):
+    lines = table.to_tsv().splitlines()
+    return lambda: Table.from_tsv(lines, None, None, lambda x: x)
+
+
+def _bench_filter_ids(table, paths):
+    ids = table.ids()[::2]
+    return lambda: table.filter(ids, inplace=False)
+
+
+def _bench_filter_func(table, paths):
+    def f(values, id_, md):
+        return values.sum() > 1
+    return lambda: table.filter(f, axis='observation', inplace=False)
+
+
+def _bench_collapse(table, paths):
+    groups = {id_: i % 10 for i, id_ in enumerate(table.ids())}
+
+    def f(id_, md):
+        return groups[id_]
+    return lambda: table.collapse(f, norm=False)
+
+
+def _bench_merge(table, paths):
+    other = table.filter(table.ids()[::2], inplace=False)
+    return lambda: table.merge(other)
+
+
+def _bench_concat(table, paths):
+    ids = table.ids()
+    left = table.filter(ids[::2], inplace=False)
+    right = table.filter(ids[1::2], inplace=False)
+    return lambda: left.concat([right])
+
+
+def _bench_subsample(table, paths):
+    sums = table.sum('sample')
+    sums = sums[sums > 0]
+    n = int(np.median(sums)) if sums.size else 1
+    return lambda: table.subsample(n)
+
+
+def _bench_norm(table, paths):
+    return lambda: table.norm(inplace=False)
+
+
+def _bench_transform(table, paths):
+    def f(values, id_, md):
+        return values * 2
+    return lambda: table.transform(f, inplace=False)
+
+
+# Each benchmark is given the table and the paths for the shape/density, and
+# must return a callable to time. Any setup work done before returning is not
+# timed.
+BENCHMARKS = OrderedDict([
+    ('load_table_json', _bench_load_table_json),
+    ('load_table_hdf5', _bench_load_table_hdf5),
+    ('from_hdf5', _bench_from_hdf5),
+    ('to_hdf5', _bench_to_hdf5),
+    ('to_json', _bench_to_json),
+    ('from_tsv', _bench_from_tsv),
+    ('filter_ids', _bench_filter_ids),
+    ('filter_func', _bench_filter_func),
+    ('collapse', _bench_collapse),
+    ('merge', _bench_merge),
+    ('concat', _bench_concat),
+    ('subsample', _bench_subsample),
+    ('norm', _bench_norm),
+    ('transform', _bench_transform)])
+
+_REQUIRES_HDF5 = {'load_table_hdf5', 'from_hdf5', 'to_hdf5'}
+_REQUIRES_JSON = {'load_table_json'}
+
+
+def _time(f, repeat):
+    """Time a callable, returning (min, median, max) in seconds"""
+    times = []
+    for _ in range(repeat):
+        start = default_timer()
+        f()
+        times.append(default_timer() - start)
+    return min(times), float(np.median(times)), max(times)
+
+
+def run_benchmarks(path=DEFAULT_BENCH_DIR, benchmarks=None, max_size=None,
+                   repeat=3, log=None):
+    """Time benchmarks over the benchmark tables
+
+    Parameters
+    ----------
+    path : str, optional
+        The directory containing the benchmark tables.
+    benchmarks : iterable of str, optional
+        The names of the benchmarks to run (see ``BENCHMARKS``). Defaults to
+        all benchmarks.
+    max_size : int, optional
+        If provided, skip tables with more than ``max_size`` cells.
+    repeat : int, optional
+        The number of times to time each benchmark. Defaults to 3.
+    log : function, optional
+        If provided, called with a str describing each result as it
+        completes.
+
+    Returns
+    -------
+    list of dict
+        One dict per benchmark and table with the keys in ``RESULT_FIELDS``.
+        Times are in seconds. If a benchmark raised, the times are ``None``
+        and ``error`` holds the exception message.
+
+    Raises
+    ------
+    KeyError
+        If an unknown benchmark is requested.
+    """
+    if benchmarks is None:
+        benchmarks = list(BENCHMARKS)
+    else:
+        benchmarks = list(benchmarks)
+        for name in benchmarks:
+            if name not in BENCHMARKS:
+                raise KeyError("Unknown benchmark: %s" % name)
+
+    results = []
+    tmpdir = mkdtemp()
+    try:
+        for paths in find_bench_tables(path, max_size=max_size):
+            results.extend(_run_table(paths, benchmarks, repeat, tmpdir, log))
+    finally:
+        rmtree(tmpdir)
+
+    return results
+
+
+def _run_table(paths, benchmarks, repeat, tmpdir, log):
+    """Run the benchmarks for a single shape and density"""
+    if paths['json'] is not None:
+        table = load_table(paths['json'])
+    elif paths['hdf5'] is not None and HAVE_H5PY:
+        table = load_table(paths['hdf5'])
+    else:
+        return []
+
+    # the shipped HDF5 tables predate the 2.1 format, so the HDF5 benchmarks
+    # operate on a copy written with the current writer
+    paths = paths.copy()
+    if HAVE_H5PY:
+        import h5py
+        paths['hdf5'] = os.path.join(tmpdir, 'bench.biom')
+        with h5py.File(paths['hdf5'], 'w') as fp:
+            table.to_hdf5(fp, 'biom.bench')
+    else:
+        paths['hdf5'] = None
+
+    results = []
+    for name in benchmarks:
+        if name in _REQUIRES_HDF5 and paths['hdf5'] is None:
+            continue
+        if name in _REQUIRES_JSON and paths['json'] is None:
+            continue
+
+        result = OrderedDict([('benchmark', name),
+                              ('n_observations', paths['n_observations']),
+                              ('n_samples', paths['n_samples']),
+                              ('density', paths['density']),
+                              ('repeat', repeat),
+                              ('min', None),
+                              ('median', None),
+                              ('max', None),
+                              ('error', None)])
+        try:
+            f = BENCHMARKS[name](table, paths)
+            result['min'], result['median'], result['max'] = \
+                _time(f, repeat)
+        except Exception as e:
+            result['error'] = '%s: %s' % (e.__class__.__name__, e)
+
+        results.append(result)
+        if log is not None:
+            log(_format_result(result))
+
+    return results
+
+
+def _format_result(result):
+    shape = '%dx%dx%s' % (result['n_observations'], result['n_samples'],
+                          result['density'])
+    if result['error'] is not None:
+        return '%s %s: error (%s)' % (result['benchmark'], shape,
+                                      result['error'])
+    return '%s %s: %.6fs' % (result['benchmark'], shape, result['min'])
+
+
+def _environment():
+    """Describe the environment the benchmarks were run in"""
+    return OrderedDict([('biom', __version__),
+                        ('python', platform.python_version()),
+                        ('numpy', np.__version__),
+                        ('scipy', scipy.__version__),
+                        ('platform', platform.platform()),
+                        ('date', datetime.now().isoformat())])
+
+
+def write_results(results, fp, fmt=None):
+    """Write benchmark results to a file
+
+    Parameters
+    ----------
+    results : list of dict
+        The results from ``run_benchmarks``.
+    fp : str
+        The filepath to write to.
+    fmt : {'json', 'csv'}, optional
+        The output format. If not provided, it is inferred from the file
+        extension and defaults to 'json'.
+
+    Raises
+    ------
+    ValueError
+        If the format is not recognized.
+    """
+    if fmt is None:
+        fmt = 'csv' if fp.endswith('.csv') else 'json'
+
+    if fmt == 'json':
+        doc = OrderedDict([('environment', _environment()),
+                           ('results', results)])
+        with io.open(fp, 'w', encoding='utf-8') as f:
+            f.write(six.text_type(json.dumps(doc, indent=2)))
+    elif fmt == 'csv':
+        if six.PY3:
+            f = open(fp, 'w', newline='')
+        else:
+            f = open(fp, 'wb')
+        with f:
+            writer = csv.writer(f)
+            writer.writerow(RESULT_FIELDS)
+            for result in results:
+                writer.writerow(['' if result[k] is None else result[k]
+                                 for k in RESULT_FIELDS])
+    else:
+        raise ValueError("Unknown format: %s" % fmt)
+
+
+def load_results(fp):
+    """Load results previously written as JSON by ``write_results``
+
+    Parameters
+    ----------
+    fp : str
+        The filepath to read.
+
+    Returns
+    -------
+    list of dict
+        The benchmark results.
+    """
+    with io.open(fp, encoding='utf-8') as f:
+        return json.load(f)['results']
+
+
+def _result_key(result):
+    return (result['benchmark'], result['n_observations'],
+            result['n_samples'], float(result['density']))
+
+
+def compare_to_baseline(results, baseline, threshold=1.25, min_time=1e-3,
+                        stat='min'):
+    """Find results which are slower than a baseline
+
+    Parameters
+    ----------
+    results : list of dict
+        The results from ``run_benchmarks``.
+    baseline : list of dict
+        Baseline results, such as from ``load_results``.
+    threshold : float, optional
+        The ratio of current time to baseline time above which a result is
+        flagged. Defaults to 1.25.
+    min_time : float, optional
+        Results which take less than ``min_time`` seconds in the current run
+        are not flagged, as they are dominated by timer noise. Defaults to
+        1ms.
+    stat : {'min', 'median', 'max'}, optional
+        The statistic to compare. Defaults to 'min'.
+
+    Returns
+    -------
+    list of dict
+        The flagged results, each with the additional keys ``baseline`` and
+        ``ratio``. Results which errored but did not error in the baseline are
+        also flagged, with a ``ratio`` of ``None``.
+    """
+    lookup = {_result_key(r): r for r in baseline}
+
+    regressions = []
+    for result in results:
+        base = lookup.get(_result_key(result))
+        if base is None:
+            continue
+
+        if result['error'] is not None:
+            if base.get('error') is None:
+                flagged = result.copy()
+                flagged['baseline'] = base[stat]
+                flagged['ratio'] = None
+                regressions.append(flagged)
+            continue
+
+        if base.get(stat) is None or result[stat] < min_time:
+            continue
+
+        ratio = result[stat] / max(base[stat], np.finfo(float).eps)
+        if ratio > threshold:
+            flagged = result.copy()
+            flagged['baseline'] = base[stat]
+            flagged['ratio'] = ratio
+            regressions.append(flagged)
+
+    return regressions
+
+
+@click.command(context_settings=dict(help_option_names=['-h', '--help']))
+@click.option('-d', '--tables-dir', default=DEFAULT_BENCH_DIR,
+              type=click.Path(exists=True, file_okay=False),
+              help='The directory containing the benchmark tables.')
+@click.option('-b', '--benchmark', multiple=True,
+              type=click.Choice(list(BENCHMARKS)),
+              help='A benchmark to run, can be specified multiple times. '
+                   'Defaults to all benchmarks.')
+@click.option('--max-size', default=None, type=int,
+              help='Skip tables with more than this many cells.')
+@click.option('-r', '--repeat', default=3, type=int, show_default=True,
+              help='The number of times to time each benchmark.')
+@click.option('-o', '--output-fp', default=None,
+              type=click.Path(writable=True, dir_okay=False),
+              help='Where to write the results. The format is CSV if the '
+                   'path ends with .csv, otherwise JSON.')
+@click.option('--baseline-fp', default=None,
+              type=click.Path(exists=True, dir_okay=False),
+              help='A JSON results file to compare against.')
+@click.option('--threshold', default=1.25, type=float, show_default=True,
+              help='The slowdown ratio over the baseline to flag.')
+def main(tables_dir, benchmark, max_size, repeat, output_fp, baseline_fp,
+         threshold):
+    """Time Table operations over the benchmark tables.
+
+    Exits with a nonzero status if any regressions against the baseline are
+    found.
+    """
+    results = run_benchmarks(tables_dir, benchmark or None, max_size, repeat,
+                             log=click.echo)
+
+    if output_fp is not None:
+        write_results(results, output_fp)
+
+    if baseline_fp is not None:
+        regressions = compare_to_baseline(results, load_results(baseline_fp),
+                                          threshold=threshold)
+        for r in regressions:
+            if r['ratio'] is None:
+                click.echo('REGRESSION %s' % _format_result(r), err=True)
+            else:
+                click.echo('REGRESSION %s (baseline %.6fs, %.2fx)' %
+                           (_format_result(r), r['baseline'], r['ratio']),
+                           err=True)
+        if regressions:
+            sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
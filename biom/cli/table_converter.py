@@ -180,11 +180,10 @@ def _convert(table, output_filepath, sample_metadata=None,
         table.add_metadata(new_md, 'observation')
 
     if to_tsv:
-        result = table.to_tsv(header_key=header_key,
-                              header_value=output_metadata_id,
-                              metadata_formatter=obs_md_fmt_f)
         with open(output_filepath, 'w') as f:
-            f.write(result)
+            table.to_tsv(header_key=header_key,
+                         header_value=output_metadata_id,
+                         metadata_formatter=obs_md_fmt_f, direct_io=f)
         return
     elif to_json:
         fmt = 'json'
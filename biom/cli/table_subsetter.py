@@ -8,11 +8,14 @@
 
 from __future__ import division
 
+import io
+import mmap
+
 import click
+from future.utils import string_types
 
 from biom.cli import cli
-from biom.parse import (get_axis_indices, direct_slice_data, direct_parse_key,
-                        generatedby)
+from biom.parse import direct_subset_json, generatedby
 from biom.table import Table
 from biom.util import biom_open, HAVE_H5PY
 
@@ -59,23 +62,25 @@ def subset_table(input_hdf5_fp, input_json_fp, axis, ids, output_fp):
            -o subset.biom
 
     """
-    if input_json_fp is not None:
-        with open(input_json_fp, 'U') as f:
-            input_json_fp = f.read()
-
     with open(ids, 'U') as f:
         ids = []
         for line in f:
             if not line.startswith('#'):
                 ids.append(line.strip().split('\t')[0])
 
+    if input_json_fp is not None:
+        # the table is memory-mapped, and only read a chunk at a time
+        with open(input_json_fp, 'rb') as f:
+            input_json_fp = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+
     table, format_ = _subset_table(input_hdf5_fp, input_json_fp, axis, ids)
 
     if format_ == 'json':
-        with open(output_fp, 'w') as f:
+        with io.open(output_fp, 'w', encoding='utf-8') as f:
             for line in table:
                 f.write(line)
-                f.write('\n')
+                f.write(u'\n')
+        input_json_fp.close()
     else:
         if HAVE_H5PY:
             import h5py
@@ -98,42 +103,13 @@ def _subset_table(hdf5_biom, json_table_str, axis, ids):
         raise ValueError("Can only specify one input table")
 
     if json_table_str is not None:
-        idxs, new_axis_md = get_axis_indices(json_table_str, ids, axis)
-        new_data = direct_slice_data(json_table_str, idxs, axis)
-
-        # multiple walks over the string. bad form, but easy right now
-        # ...should add a yield_and_ignore parser or something.
-        def subset_generator():
-            yield "{"
-            yield direct_parse_key(json_table_str, "id")
-            yield ","
-            yield direct_parse_key(json_table_str, "format")
-            yield ","
-            yield direct_parse_key(json_table_str, "format_url")
-            yield ","
-            yield direct_parse_key(json_table_str, "type")
-            yield ","
-            yield direct_parse_key(json_table_str, "generated_by")
-            yield ","
-            yield direct_parse_key(json_table_str, "date")
-            yield ","
-            yield direct_parse_key(json_table_str, "matrix_type")
-            yield ","
-            yield direct_parse_key(json_table_str, "matrix_element_type")
-            yield ","
-            yield new_data
-            yield ","
-            yield new_axis_md
-            yield ","
-
-            if axis == "observation":
-                yield direct_parse_key(json_table_str, "columns")
-            else:
-                yield direct_parse_key(json_table_str, "rows")
-            yield "}"
+        if isinstance(json_table_str, string_types):
+            if not isinstance(json_table_str, bytes):
+                json_table_str = json_table_str.encode('utf-8')
+            json_table_str = io.BytesIO(json_table_str)
 
+        table = direct_subset_json(json_table_str, ids, axis)
         format_ = 'json'
-        table = subset_generator()
     else:
         with biom_open(hdf5_biom) as f:
             table = Table.from_hdf5(f, ids=ids, axis=axis)
@@ -23,7 +23,7 @@ def write_biom_table(table, fmt, filepath):
 
     if fmt == 'json':
         with open(filepath, 'w') as f:
-            f.write(table.to_json(biom.parse.generatedby()))
+            table.to_json(biom.parse.generatedby(), direct_io=f)
     elif fmt == 'tsv':
         with open(filepath, 'w') as f:
             f.write(table)
@@ -14,8 +14,10 @@ import numpy as np
 from future.utils import string_types
 
 from biom.exception import BiomParseException, UnknownAxisError
-from biom.table import Table
-from biom.util import biom_open, __version__
+from biom.table import (Table, LazyTable, coo_arrays_to_sparse,
+                        _format_json_triples)
+from biom.util import biom_open, is_hdf5_file, HAVE_H5PY, __version__
+import re
 import json
 from collections import defaultdict, OrderedDict
 
@@ -249,6 +251,168 @@ def get_axis_indices(biom_str, to_keep, axis):
     return idxs, json.dumps(subset)[1:-1]  # trim off { and }
 
 
+def direct_subset_json(fp, to_keep, axis, chunk_size=2 ** 20):
+    """Subset a sparse JSON BIOM table without parsing all of it
+
+    A single scan over the table locates the value of every top level key
+    and the entries of `axis` to keep. The subset is then generated by
+    seeking back to those values: the data are filtered a chunk at a time,
+    and all other values are copied verbatim.
+
+    Parameters
+    ----------
+    fp : file like
+        The UTF-8 encoded table, in a binary file alike object which can
+        seek, e.g. a memory-mapped file
+    to_keep : iterable of str
+        The ids to keep
+    axis : {'sample', 'observation'}
+        The axis to subset
+    chunk_size : int, optional
+        The number of bytes read at a time
+
+    Returns
+    -------
+    generator of str
+        The pieces of the JSON subset table
+
+    Raises
+    ------
+    ValueError
+        If the table does not appear to be a sparse BIOM table
+    KeyError
+        If not all of the `to_keep` ids are in the table
+    """
+    if axis == 'observation':
+        axis_key = 'rows'
+    elif axis == 'sample':
+        axis_key = 'columns'
+    else:
+        raise ValueError("Unknown axis!")
+
+    # JSON structure is ASCII, and no byte of a multibyte UTF-8 character
+    # is, so the text can be scanned one character per byte. The entries of
+    # the axis are then decoded from their UTF-8 text.
+    encoding = None if bytes is str else 'latin-1'
+
+    def scan(offset):
+        fp.seek(offset)
+        return _JSONBuffer(fp, chunk_size, encoding=encoding, offset=offset)
+
+    def span(start, end):
+        fp.seek(start)
+        return fp.read(end - start).decode('utf-8')
+
+    # locate the values of the top level keys and the entries to keep
+    to_keep = set(to_keep)
+    found = set()
+    kept = []
+    n_entries = 0
+    spans = OrderedDict()
+    values = {}
+
+    buf = scan(0)
+    buf.expect('{')
+    while buf.peek() != '}':
+        key_start = buf.tell()
+        key = buf.value()
+        buf.expect(':')
+        buf.peek()
+        start = buf.tell()
+
+        if key == 'data':
+            for _ in buf.numeric_chunks(parse=False):
+                pass
+        elif key == axis_key:
+            for entry, entry_start, entry_end in buf.items(spans=True):
+                if encoding is not None:
+                    entry = json.loads(buf.raw(entry_start, entry_end)
+                                       .encode(encoding).decode('utf-8'))
+                id_ = entry['id']
+                if id_ in to_keep:
+                    found.add(id_)
+                    kept.append((n_entries, entry_start, entry_end))
+                n_entries += 1
+        else:
+            values[key] = buf.value()
+
+        spans[key] = (key_start, start, buf.tell())
+        if buf.expect(',}') == '}':
+            break
+
+    for key in ('data', 'shape', 'rows', 'columns'):
+        if key not in spans:
+            raise ValueError("The table does not appear to be in BIOM "
+                             "format!")
+    if values.get('matrix_type', 'sparse') != 'sparse':
+        raise ValueError("Only sparse tables can be subset directly")
+    if found != to_keep:
+        raise KeyError("Not all of the to_keep ids are in the table!")
+
+    # new positions along the subset axis, -1 for the entries dropped
+    lookup = np.full(n_entries, -1, dtype=np.int64)
+    lookup[[index for index, _, _ in kept]] = np.arange(len(kept))
+    shape = list(values['shape'])
+    shape[0 if axis == 'observation' else 1] = len(kept)
+
+    def data():
+        buf = scan(spans['data'][1])
+        first = True
+        for chunk, n in buf.numeric_chunks():
+            if len(chunk) != 3 * n:
+                raise BiomParseException("Sparse data must be [row, col, "
+                                         "value] triples")
+            chunk = chunk.reshape(-1, 3)
+            rows = chunk[:, 0].astype(np.int64)
+            cols = chunk[:, 1].astype(np.int64)
+            if axis == 'observation':
+                rows = lookup[rows]
+                keep = rows >= 0
+            else:
+                cols = lookup[cols]
+                keep = cols >= 0
+
+            vals = chunk[keep, 2]
+            if not len(vals):
+                continue
+            if (vals % 1 == 0).all():
+                vals = vals.astype(np.int64)
+            if not first:
+                yield u','
+            yield _format_json_triples(rows[keep], cols[keep], vals)
+            first = False
+
+    def entries():
+        for start in range(0, len(kept), 10000):
+            yield u','.join([span(s, e) for _, s, e in
+                             kept[start:start + 10000]])
+
+    def subset():
+        yield u'{'
+        for i, (key, (key_start, start, end)) in enumerate(spans.items()):
+            if i:
+                yield u','
+            if key == 'data':
+                yield u'"data": ['
+                for piece in data():
+                    yield piece
+                yield u']'
+            elif key == 'shape':
+                yield u'"shape": [%d, %d]' % tuple(shape)
+            elif key == axis_key:
+                yield u'"%s": [' % axis_key
+                for j, piece in enumerate(entries()):
+                    if j:
+                        yield u','
+                    yield piece
+                yield u']'
+            else:
+                yield span(key_start, end)
+        yield u'}'
+
+    return subset()
+
+
 def parse_uc(fh):
     """ Create a Table object from a uclust/usearch/vsearch uc file.
 
@@ -341,7 +505,295 @@ def parse_uc(fh):
     return Table(data, observation_ids=observation_ids, sample_ids=sample_ids)
 
 
-def parse_biom_table(fp, ids=None, axis='sample', input_is_dense=False):
+_JSON_WHITESPACE = re.compile(r'[ \t\n\r]*')
+_JSON_NUMERIC = np.zeros(256, dtype=bool)
+_JSON_NUMERIC[np.frombuffer(b'0123456789+-.eE[], \t\n\r',
+                            dtype=np.uint8)] = True
+
+
+class _JSONBuffer(object):
+    """A window over a JSON document which is read a chunk at a time
+
+    If `encoding` is given, the chunks read from `fp` are decoded with it.
+    `offset` is the position of the start of the window in `fp`, which is
+    tracked by ``tell``.
+    """
+
+    def __init__(self, fp, chunk_size, encoding=None, offset=0):
+        self.fp = fp
+        self.chunk_size = chunk_size
+        self.encoding = encoding
+        self.buf = self._read(chunk_size)
+        self.pos = 0
+        self.offset = offset
+        self.eof = not self.buf
+        self.decoder = json.JSONDecoder(object_pairs_hook=OrderedDict)
+
+    def _read(self, size):
+        text = self.fp.read(size)
+        return text.decode(self.encoding) if self.encoding else text
+
+    def tell(self):
+        """The position of the next character in the document"""
+        return self.offset + self.pos
+
+    def raw(self, start, end):
+        """The text between two positions which are still in the window"""
+        return self.buf[start - self.offset:end - self.offset]
+
+    def fill(self, size=None):
+        """Drop the text already consumed and read more of the document"""
+        more = self._read(size or self.chunk_size)
+        self.buf = self.buf[self.pos:] + more
+        self.offset += self.pos
+        self.pos = 0
+        self.eof = not more
+
+    def peek(self):
+        """Skip whitespace and return the next character, '' at the end"""
+        while True:
+            self.pos = _JSON_WHITESPACE.match(self.buf, self.pos).end()
+            if self.pos < len(self.buf):
+                return self.buf[self.pos]
+            if self.eof:
+                return ''
+            self.fill()
+
+    def expect(self, chars):
+        """Consume the next character, which must be one of chars"""
+        c = self.peek()
+        if not c or c not in chars:
+            raise BiomParseException("Expected one of %r at %r" %
+                                     (chars, self.buf[self.pos:self.pos + 20]))
+        self.pos += 1
+        return c
+
+    def value(self):
+        """Decode the next JSON value"""
+        self.peek()
+        size = self.chunk_size
+        while True:
+            try:
+                value, end = self.decoder.raw_decode(self.buf, self.pos)
+            except ValueError:
+                if self.eof:
+                    raise
+            else:
+                # a number at the end of the buffer may be cut short
+                if end < len(self.buf) or self.eof:
+                    self.pos = end
+                    return value
+            self.fill(size)
+            size *= 2
+
+    def items(self, spans=False):
+        """Decode the values of the next JSON array one at a time
+
+        If `spans`, yield each value with its start and end positions.
+        """
+        self.expect('[')
+        if self.peek() == ']':
+            self.pos += 1
+            return
+        while True:
+            self.peek()
+            start = self.tell()
+            value = self.value()
+            yield (value, start, self.tell()) if spans else value
+            if self.expect(',]') == ']':
+                return
+
+    def numeric_arrays(self):
+        """Parse the next JSON array of arrays of numbers
+
+        Returns
+        -------
+        list of np.ndarray
+            The numbers, as float64, a chunk at a time
+        int
+            The number of inner arrays
+        int or None
+            The length of the inner arrays, ``None`` if there are none
+        """
+        chunks = []
+        n_arrays = 0
+        width = None
+        for values, n in self.numeric_chunks():
+            if width is None:
+                width = len(values) // n
+            n_arrays += n
+            chunks.append(values)
+        return chunks, n_arrays, width
+
+    def numeric_chunks(self, parse=True):
+        """Yield the next JSON array of arrays of numbers a chunk at a time
+
+        The text is scanned a chunk at a time, and the numbers of all the
+        complete inner arrays of a chunk are parsed at once by numpy.
+
+        Parameters
+        ----------
+        parse : bool, optional
+            If ``False``, the array is only validated and skipped over
+
+        Returns
+        -------
+        generator of (np.ndarray, int)
+            The numbers of a chunk, as float64, and how many inner arrays
+            they are from
+        """
+        self.expect('[')
+        width = None
+        size = self.chunk_size
+
+        while True:
+            # one character per code point, so positions match the buffer
+            text = self.buf[self.pos:]
+            if not isinstance(text, bytes):
+                text = text.encode('ascii', 'replace')
+            chars = np.frombuffer(text, dtype=np.uint8)
+
+            opening = chars == ord('[')
+            closing = chars == ord(']')
+            depth = np.cumsum(opening, dtype=np.int32) - \
+                np.cumsum(closing, dtype=np.int32) + 1
+
+            # parse up to the end of the data, or else up to the end of the
+            # last complete inner array
+            end = np.flatnonzero(depth == 0)
+            done = len(end) > 0
+            if done:
+                stop = int(end[0])
+            else:
+                stop = np.flatnonzero(closing & (depth == 1))
+                stop = int(stop[-1]) + 1 if len(stop) else 0
+
+            if not _JSON_NUMERIC[chars[:stop]].all():
+                raise BiomParseException("Non-numeric value in data")
+            if stop and depth[:stop].max() > 2:
+                raise BiomParseException("Data must be an array of arrays")
+
+            n = int(opening[:stop].sum())
+            if n and parse:
+                parsed = chars[:stop].copy()
+                parsed[opening[:stop] | closing[:stop] |
+                       (parsed == ord(','))] = ord(' ')
+                values = np.fromstring(parsed.tobytes(), sep=' ')
+                if len(values) % n or (width is not None and
+                                       len(values) // n != width):
+                    raise BiomParseException("Data arrays are not all of "
+                                             "the same length")
+                width = len(values) // n
+                yield values, n
+
+            self.pos += stop + 1 if done else stop
+            if done:
+                return
+            if self.eof:
+                raise BiomParseException("Unterminated data")
+
+            # an inner array longer than the buffer needs a larger read
+            self.fill(size if stop else 2 * len(self.buf) + size)
+
+
+def _matrix_from_arrays(chunks, n_arrays, width, dense, shape=None):
+    """Build the matrix of a table from the chunks of parsed data arrays
+
+    The chunks are released as they are copied, so memory peaks at about the
+    size of the parsed values plus the size of the final arrays.
+    """
+    if dense:
+        n_cols = width if width is not None else \
+            (shape[1] if shape is not None else 0)
+        values = np.empty(n_arrays * n_cols)
+        start = 0
+        while chunks:
+            chunk = chunks.pop(0)
+            values[start:start + len(chunk)] = chunk
+            start += len(chunk)
+        return values.reshape(n_arrays, n_cols)
+
+    if n_arrays and width != 3:
+        raise BiomParseException("Sparse data must be [row, col, value] "
+                                 "triples")
+
+    index_dtype = np.int32 if shape is not None and \
+        max(shape) < np.iinfo(np.int32).max else np.int64
+    rows = np.empty(n_arrays, dtype=index_dtype)
+    cols = np.empty(n_arrays, dtype=index_dtype)
+    values = np.empty(n_arrays, dtype=np.float64)
+    start = 0
+    while chunks:
+        chunk = chunks.pop(0).reshape(-1, 3)
+        stop = start + len(chunk)
+        rows[start:stop] = chunk[:, 0]
+        cols[start:stop] = chunk[:, 1]
+        values[start:stop] = chunk[:, 2]
+        start = stop
+
+    if shape is None and not n_arrays:
+        shape = (0, 0)
+    return coo_arrays_to_sparse((values, (rows, cols)), shape=shape)
+
+
+def _parse_json_table(fp, input_is_dense=False, chunk_size=2 ** 20):
+    """Parse a JSON BIOM table from a file, streaming its data
+
+    Equivalent to ``json.load``, except that "data" is parsed straight into
+    a sparse matrix (or a dense array for dense tables) without ever holding
+    the data as Python lists, and "rows" and "columns" are decoded one entry
+    at a time.
+
+    Parameters
+    ----------
+    fp : file like
+        File alike object storing the JSON BIOM table
+    input_is_dense : bool, optional
+        Whether the data are dense if the table does not state its
+        "matrix_type"
+    chunk_size : int, optional
+        The number of characters read at a time
+
+    Returns
+    -------
+    OrderedDict
+        The top level fields of the table
+    """
+    buf = _JSONBuffer(fp, chunk_size)
+    json_table = OrderedDict()
+    data = None
+
+    buf.expect('{')
+    if buf.peek() == '}':
+        return json_table
+
+    while True:
+        key = buf.value()
+        buf.expect(':')
+        if key == 'data' and \
+                json_table.get('matrix_element_type') != 'unicode':
+            data = buf.numeric_arrays()
+            json_table[key] = None
+        elif key in ('rows', 'columns'):
+            json_table[key] = list(buf.items())
+        else:
+            json_table[key] = buf.value()
+
+        if buf.expect(',}') == '}':
+            break
+
+    if data is not None:
+        if 'matrix_type' in json_table:
+            input_is_dense = json_table['matrix_type'] == 'dense'
+        shape = json_table.get('shape')
+        json_table['data'] = _matrix_from_arrays(*data, dense=input_is_dense,
+                                                 shape=shape)
+
+    return json_table
+
+
+def parse_biom_table(fp, ids=None, axis='sample', input_is_dense=False,
+                     metadata=None):
     r"""Parses the biom table stored in the filepath `fp`
 
     Parameters
@@ -356,6 +808,11 @@ def parse_biom_table(fp, ids=None, axis='sample', input_is_dense=False):
     input_is_dense : boolean
         Indicates if the BIOM table is dense or sparse. Valid only for JSON
         tables.
+    metadata : bool, Iterable of str or dict, optional
+        The metadata categories to load. ``None`` or ``True`` loads all of
+        them and ``False`` none, and a dict of ``{'sample': ...,
+        'observation': ...}`` selects them by axis. See
+        ``Table.from_hdf5``.
 
     Returns
     -------
@@ -391,7 +848,7 @@ def parse_biom_table(fp, ids=None, axis='sample', input_is_dense=False):
         UnknownAxisError(axis)
 
     try:
-        return Table.from_hdf5(fp, ids=ids, axis=axis)
+        return Table.from_hdf5(fp, ids=ids, axis=axis, metadata=metadata)
     except ValueError:
         pass
     except RuntimeError:
@@ -405,21 +862,25 @@ def parse_biom_table(fp, ids=None, axis='sample', input_is_dense=False):
             c = fp.read(1)
         if c == '{':
             fp.seek(old_pos)
-            t = Table.from_json(json.load(fp, object_pairs_hook=OrderedDict),
-                                input_is_dense=input_is_dense)
+            t = Table.from_json(_parse_json_table(fp, input_is_dense),
+                                input_is_dense=input_is_dense,
+                                metadata=metadata)
         else:
             fp.seek(old_pos)
-            t = Table.from_tsv(fp, None, None, lambda x: x)
+            t = Table.from_tsv(fp, None, None, lambda x: x,
+                               metadata=metadata)
     elif isinstance(fp, list):
         try:
             t = Table.from_json(json.loads(''.join(fp),
                                            object_pairs_hook=OrderedDict),
-                                input_is_dense=input_is_dense)
+                                input_is_dense=input_is_dense,
+                                metadata=metadata)
         except ValueError:
-            t = Table.from_tsv(fp, None, None, lambda x: x)
+            t = Table.from_tsv(fp, None, None, lambda x: x,
+                               metadata=metadata)
     else:
         t = Table.from_json(json.loads(fp, object_pairs_hook=OrderedDict),
-                            input_is_dense=input_is_dense)
+                            input_is_dense=input_is_dense, metadata=metadata)
 
     def subset_ids(data, id_, md):
         return id_ in ids
@@ -627,12 +1088,25 @@ def convert_biom_to_table(biom_f, header_key=None, header_value=None,
         return table.delimited_self()
 
 
-def load_table(f):
+def load_table(f, lazy=False, load_metadata=True):
     r"""Load a `Table` from a path
 
     Parameters
     ----------
     f : str
+    lazy : bool, optional
+        If ``True`` and `f` is an HDF5 file, return a ``LazyTable`` which
+        keeps the file open and only reads the matrix and metadata as they
+        are needed. The file is closed with ``LazyTable.close``. Tables in
+        other formats are always fully loaded. Defaults to ``False``.
+    load_metadata : bool, Iterable of str or dict, optional
+        The metadata categories to load. ``True``, the default, loads all of
+        them and ``False`` loads none, which is much faster for large tables
+        when only the counts and IDs are needed. An iterable of categories
+        loads those categories on both axes, and a dict of
+        ``{'sample': [...], 'observation': [...]}`` loads the categories of
+        each axis; an axis which is not in the dict has no metadata loaded.
+        Categories which a table does not have are ignored.
 
     Returns
     -------
@@ -654,10 +1128,25 @@ def load_table(f):
     >>> from biom import load_table
     >>> table = load_table('path/to/table.biom') # doctest: +SKIP
 
+    Lazily load an HDF5 table, reading only the samples which are needed:
+
+    >>> with load_table('table.biom', lazy=True) as table: # doctest: +SKIP
+    ...     table.data('S1') # doctest: +SKIP
+
+    Load only the counts and IDs of a table, or only its taxonomy:
+
+    >>> table = load_table('table.biom', load_metadata=False) # doctest: +SKIP
+    >>> md = {'observation': ['taxonomy']}
+    >>> table = load_table('table.biom', load_metadata=md) # doctest: +SKIP
+
     """
+    if lazy and HAVE_H5PY and is_hdf5_file(f):
+        import h5py
+        return LazyTable(h5py.File(f, 'r'), metadata=load_metadata)
+
     with biom_open(f) as fp:
         try:
-            table = parse_biom_table(fp)
+            table = parse_biom_table(fp, metadata=load_metadata)
         except (IndexError, TypeError):
             raise TypeError("%s does not appear to be a BIOM file!" % f)
     return table
@@ -17,6 +17,9 @@ Classes
    :toctree: generated/
 
    Table
+   LazyTable
+   ColumnarMetadata
+   MetadataRow
 
 Examples
 --------
@@ -149,8 +152,8 @@ we'll need to specify 'observation' as the axis.
 # Constructed from biom file
 #OTU ID S0  S1  S2  S3
 Bacteria; Firmicutes  7.2 6.6 7.2 8.4
-Bacteria; Bacteroidetes   12.0    10.5    0.0 13.5
 Bacteria; Proteobacteria  4.0 3.0 6.0 5.0
+Bacteria; Bacteroidetes   12.0    10.5    0.0 13.5
 
 Finally, let's convert the table to presence/absence data.
 
@@ -159,8 +162,8 @@ Finally, let's convert the table to presence/absence data.
 # Constructed from biom file
 #OTU ID S0  S1  S2  S3
 Bacteria; Firmicutes  1.0 1.0 1.0 1.0
-Bacteria; Bacteroidetes   1.0 1.0 0.0 1.0
 Bacteria; Proteobacteria  1.0 1.0 1.0 1.0
+Bacteria; Bacteroidetes   1.0 1.0 0.0 1.0
 
 """
 
@@ -173,16 +176,24 @@ Bacteria; Proteobacteria  1.0 1.0 1.0 1.0
 # -----------------------------------------------------------------------------
 
 from __future__ import division
+import warnings
+import zlib
 import numpy as np
 import scipy.stats
+from scipy.spatial.distance import cdist
 from copy import deepcopy
 from datetime import datetime
 from json import dumps
-from functools import reduce
-from operator import itemgetter, add
+from functools import reduce, partial
+from itertools import islice, chain
+from multiprocessing.pool import ThreadPool
+from io import StringIO
+from operator import itemgetter, add, mul
 from future.builtins import zip
 from future.utils import viewitems
-from collections import defaultdict, Hashable, Iterable
+from collections import (defaultdict, Hashable, Iterable, Sequence,
+                         OrderedDict)
+from types import FunctionType
 from numpy import ndarray, asarray, zeros, newaxis
 from scipy.sparse import (coo_matrix, csc_matrix, csr_matrix, isspmatrix,
                           vstack, hstack)
@@ -196,8 +207,8 @@ from biom.util import (get_biom_format_version_string,
                        get_biom_format_url_string, flatten, natsort,
                        prefer_self, index_list, H5PY_VLEN_STR, HAVE_H5PY,
                        __format_version__)
-from biom.err import errcheck
-from ._filter import _filter
+from biom.err import errcheck, OBSDUP, SAMPDUP
+from ._filter import _filter, _filter_mask
 from ._transform import _transform
 from ._subsample import _subsample
 
@@ -226,6 +237,73 @@ __email__ = "daniel.mcdonald@colorado.edu"
 MATRIX_ELEMENT_TYPE = {'int': int, 'float': float, 'unicode': str,
                        u'int': int, u'float': float, u'unicode': str}
 
+# the dtypes in which a table can store its values, see Table.astype
+STORAGE_DTYPES = (np.dtype(np.uint32), np.dtype(np.int64),
+                  np.dtype(np.float32), np.dtype(np.float64))
+
+
+def _storage_dtype(dtype):
+    """Resolve the dtype argument of a table to one of STORAGE_DTYPES
+
+    Parameters
+    ----------
+    dtype : np.dtype, type, str or None
+        ``None`` is resolved to float64
+
+    Returns
+    -------
+    np.dtype
+
+    Raises
+    ------
+    TableException
+        If `dtype` is not one of STORAGE_DTYPES
+    """
+    if dtype is None:
+        return np.dtype(np.float64)
+
+    try:
+        resolved = np.dtype(dtype)
+    except TypeError:
+        resolved = None
+
+    if resolved is None or resolved not in STORAGE_DTYPES:
+        raise TableException("Unsupported storage dtype %r, expected one of "
+                             "%s" % (dtype, ', '.join(str(d) for d in
+                                                      STORAGE_DTYPES)))
+    return resolved
+
+
+def _stored_dtype(dtype):
+    """The storage dtype of values read as dtype: dtype itself if it is one
+    of STORAGE_DTYPES, otherwise float64"""
+    dtype = np.dtype(dtype)
+    return dtype if dtype in STORAGE_DTYPES else np.dtype(np.float64)
+
+
+def _float_dtype(dtype):
+    """The dtype to compute fractions of values stored as dtype in"""
+    return dtype if dtype.kind == 'f' else np.dtype(np.float64)
+
+
+def _sum_dtype(dtype):
+    """The dtype to accumulate sums of values stored as dtype in, so that
+    sums of integers do not wrap around"""
+    return np.dtype(np.int64) if dtype.kind in 'iu' else dtype
+
+
+def _narrow_sums(matrix, dtype):
+    """Cast a matrix of sums accumulated in _sum_dtype(dtype) back to dtype,
+    unless one of the sums does not fit in it"""
+    if matrix.dtype == dtype or matrix.dtype != _sum_dtype(dtype):
+        return matrix
+
+    info = np.iinfo(dtype)
+    if matrix.nnz and (matrix.data.min() < info.min or
+                       matrix.data.max() > info.max):
+        return matrix
+    return matrix.astype(dtype)
+
 
 def _identify_bad_value(dtype, fields):
     """Identify the first value which cannot be cast
@@ -256,6 +334,93 @@ def _identify_bad_value(dtype, fields):
     return (badval, badidx)
 
 
+def _parse_tsv_block(block, delim, dtype, n_values, has_md):
+    """Parse a block of classic table lines
+
+    Parameters
+    ----------
+    block : list of (int, str)
+        The line numbers and the stripped lines of the block
+    delim : str
+        The delimiter of the fields
+    dtype : type
+        The type of the values
+    n_values : int
+        The number of values expected on each line
+    has_md : bool
+        Whether the last field of each line is metadata
+
+    Returns
+    -------
+    list
+        The ids of the lines
+    np.ndarray
+        The values, of shape ``(len(block), n_values)``
+    list or None
+        The last field of each line if `has_md`
+
+    Raises
+    ------
+    TypeError
+        If a value cannot be cast to `dtype`, or if a line does not have
+        `n_values` values
+
+    Notes
+    -----
+    The values of the whole block are parsed in a single call to
+    ``np.fromstring`` when `dtype` is numeric. If that fails, the block is
+    parsed again one value at a time so that the offending value can be
+    reported.
+    """
+    ids = []
+    md = [] if has_md else None
+    fields = []
+    for lineno, line in block:
+        id_, _, values = line.partition(delim)
+        if has_md:
+            values, _, value = values.rpartition(delim)
+            md.append(value)
+
+        n_found = values.count(delim) + 1 if values else 0
+        if n_found != n_values:
+            msg = "Expected %d values on line %d, found %d"
+            raise TypeError(msg % (n_values, lineno, n_found))
+
+        ids.append(id_)
+        fields.append(values)
+
+    data = None
+    try:
+        np_dtype = np.dtype(dtype)
+    except TypeError:
+        np_dtype = None
+
+    if np_dtype is not None and np_dtype.kind in 'biuf':
+        with warnings.catch_warnings():
+            warnings.simplefilter('ignore', DeprecationWarning)
+            try:
+                data = np.fromstring(delim.join(fields), dtype=np_dtype,
+                                     sep=delim)
+            except ValueError:
+                data = None
+        if data is not None and data.size != len(block) * n_values:
+            data = None
+
+    if data is None:
+        data = []
+        for (lineno, _), values in zip(block, fields):
+            values = values.split(delim) if n_values else []
+            try:
+                data.append(list(map(dtype, values)))
+            except ValueError:
+                badval, badidx = _identify_bad_value(dtype, values)
+                msg = "Invalid value on line %d, column %d, value %s"
+                raise TypeError(msg % (lineno, badidx+1, badval))
+
+    data = np.asarray(data).reshape(len(block), n_values)
+    return ids, data, md
+
+
 def general_parser(x):
     return x
 
@@ -272,24 +437,97 @@ def vlen_list_of_str_parser(value):
     return new_value if new_value else None
 
 
+def _decode_utf8(values):
+    """Decode the UTF-8 bytes of an object array, each distinct value once,
+    leaving other values as they are"""
+    values = _object_column(values)
+    codes, uniques = pd.factorize(values)
+    if (codes < 0).any():
+        # pandas does not give missing values a code
+        return _object_column([v.decode('utf8') if isinstance(v, bytes)
+                               else v for v in values])
+    return _object_column([v.decode('utf8') if isinstance(v, bytes) else v
+                           for v in uniques])[codes]
+
+
+def _parse_vlen_list_of_str(data):
+    """Parse a (N, ?) dataset with vlen_list_of_str_parser, decoding the
+    strings of all the rows together"""
+    data = np.asarray(data, dtype=object)
+    if data.ndim != 2 or not data.size:
+        return [vlen_list_of_str_parser(row) for row in data]
+
+    data = _decode_utf8(data.ravel()).reshape(data.shape)
+    present = data != ''
+    rows = data.tolist()
+    if (present[:, 1:] <= present[:, :-1]).all():
+        # the empty strings only pad the ends of the rows
+        lengths = present.sum(axis=1).tolist()
+        return [row[:n] if n else None for row, n in zip(rows, lengths)]
+    return [[v for v in row if v] or None for row in rows]
+
+
+def _parse_general(data):
+    return data
+
+
+# parsers of a whole metadata dataset which give the same values as the row
+# parsers
+_DATASET_PARSERS = {general_parser: _parse_general,
+                    vlen_list_of_str_parser: _parse_vlen_list_of_str}
+
+
+def _metadata_values(md, header):
+    """The values of a metadata category in index order"""
+    if isinstance(md, ColumnarMetadata):
+        return md.column(header)
+    return [m[header] for m in md]
+
+
+# the types of metadata values written as numeric datasets
+_NUMERIC_TYPES = six.integer_types + (float, bool, np.number, np.bool_)
+
+
+def _encode_utf8(values):
+    """Encode strings as UTF-8, each distinct string once
+
+    Parameters
+    ----------
+    values : list or np.ndarray of str
+
+    Returns
+    -------
+    np.ndarray
+        An object array of the encoded values
+    """
+    codes, uniques = pd.factorize(_object_column(values))
+    encoded = _object_column([v.encode('utf8') for v in uniques])
+    return encoded[codes]
+
+
 def general_formatter(grp, header, md, compression):
     """Creates a dataset for a general atomic type category"""
     shape = (len(md),)
     name = 'metadata/%s' % header
-    dtypes = [type(m[header]) for m in md]
+    values = _metadata_values(md, header)
+    dtypes = set(map(type, values))
 
-    if set(dtypes).issubset(set(string_types)):
+    if dtypes.issubset(set(string_types)):
         grp.create_dataset(name, shape=shape,
                            dtype=H5PY_VLEN_STR,
-                           data=[m[header].encode('utf8') for m in md],
+                           data=_encode_utf8(values),
                            compression=compression)
-    elif set(dtypes).issubset({list, tuple}):
+    elif dtypes.issubset({list, tuple}):
         vlen_list_of_str_formatter(grp, header, md, compression)
+    elif all(issubclass(dt, _NUMERIC_TYPES) for dt in dtypes):
+        grp.create_dataset(name, shape=shape,
+                           data=np.asarray(list(values)),
+                           compression=compression)
     else:
         formatted = []
         dtypes_used = []
-        for dt, m in zip(dtypes, md):
-            val = m[header]
+        for val in values:
+            dt = type(val)
             if val is None:
                 val = '\0'
                 dt = str
@@ -313,24 +551,23 @@ def general_formatter(grp, header, md, compression):
             compression=compression)
 
 
-def vlen_list_of_str_formatter(grp, header, md, compression):
-    """Creates a (N, ?) vlen str dataset"""
+def vlen_list_of_str_formatter(grp, header, md, compression,
+                               block_size=2**16):
+    """Creates a (N, ?) vlen str dataset
+
+    The strings of all the lists are encoded together, each distinct string
+    once, and the dataset is written `block_size` rows at a time.
+    """
     # It is possible that the value for some sample/observation
     # is None. In that case, we still need to see them as
     # iterables, but their length will be 0
-    iterable_checks = []
-    lengths = []
-    for m in md:
-        if m[header] is None:
-            iterable_checks.append(True)
-        elif isinstance(m.get(header), str):
-            iterable_checks.append(False)
-        else:
-            iterable_checks.append(
-                isinstance(m.get(header, []), Iterable))
-            lengths.append(len(m[header]))
+    values = _metadata_values(md, header)
+    types = set(map(type, values))
+    types.discard(type(None))
+    all_iterable = all(not issubclass(t, str) and issubclass(t, Iterable)
+                       for t in types)
 
-    if not np.all(iterable_checks):
+    if not all_iterable:
         if header == 'taxonomy':
             # attempt to handle the general case issue where the taxonomy
             # was not split on semicolons and represented as a flat string
@@ -339,13 +576,7 @@ def vlen_list_of_str_formatter(grp, header, md, compression):
                 parts = i.split(';')
                 return [p.strip() for p in parts]
             try:
-                new_md = []
-                lengths = []
-                for m in md:
-                    parts = split_and_strip(m[header])
-                    new_md.append({header: parts})
-                    lengths.append(len(parts))
-                md = new_md
+                values = [split_and_strip(value) for value in values]
             except:  # noqa
                 raise TypeError("Category '%s' is not formatted properly. The "
                                 "most common issue is when 'taxonomy' is "
@@ -354,7 +585,7 @@ def vlen_list_of_str_formatter(grp, header, md, compression):
                                 "field on a ';' to coerce it into a list but "
                                 "it failed. An example entry (which is not "
                                 "assured to be the problematic entry) is "
-                                "below:\n%s" % (header, md[0][header]))
+                                "below:\n%s" % (header, values[0]))
         else:
             raise TypeError(
                 "Category %s not formatted correctly. Did you pass"
@@ -362,20 +593,910 @@ def vlen_list_of_str_formatter(grp, header, md, compression):
                 " from tsv? Please see Table.to_hdf5 docstring for"
                 " more information" % header)
 
-    max_list_len = max(lengths)
+    lengths = np.fromiter((0 if v is None else len(v) for v in values),
+                          dtype=int, count=len(values))
+    max_list_len = max(l for v, l in zip(values, lengths) if v is not None)
+    flat = list(chain.from_iterable(v for v in values if v is not None))
+    flat = _encode_utf8(flat) if flat else _object_column(flat)
+
+    # the position of the first string of each row in flat
+    offsets = np.zeros(len(values) + 1, dtype=int)
+    np.cumsum(lengths, out=offsets[1:])
+
     shape = (len(md), max_list_len)
-    data = np.empty(shape, dtype=object)
-    for i, m in enumerate(md):
-        if m[header] is None:
-            continue
-        value = np.asarray(m[header])
-        data[i, :len(value)] = [v.encode('utf8') for v in value]
-    # Change the None entries on data to empty strings ""
-    data = np.where(data == np.array(None), "", data)
-    grp.create_dataset(
+    dset = grp.create_dataset(
         'metadata/%s' % header, shape=shape,
-        dtype=H5PY_VLEN_STR, data=data,
-        compression=compression)
+        dtype=H5PY_VLEN_STR, compression=compression)
+    for start in range(0, len(values), block_size):
+        stop = min(start + block_size, len(values))
+        block_lengths = lengths[start:stop]
+        rows = np.repeat(np.arange(stop - start), block_lengths)
+        cols = (np.arange(offsets[start], offsets[stop]) -
+                np.repeat(offsets[start:stop], block_lengths))
+
+        block = np.empty((stop - start, max_list_len), dtype=object)
+        block.fill(b'')
+        block[rows, cols] = flat[offsets[start]:offsets[stop]]
+        dset[start:stop] = block
+
+
+# marks the entries of a ColumnarMetadata column for rows which do not have
+# the category
+_MISSING_MD = object()
+
+
+def _object_column(values):
+    """Create a 1-D object array without numpy unpacking nested sequences"""
+    if isinstance(values, ndarray) and values.dtype == object and \
+            values.ndim == 1:
+        return values
+
+    column = np.empty(len(values), dtype=object)
+    for i, v in enumerate(values):
+        column[i] = v
+    return column
+
+
+class MetadataRow(dict):
+
+    """The metadata of a single sample or observation in ColumnarMetadata
+
+    A row is a ``dict`` of the categories the sample or observation has, and
+    like the ``defaultdict(lambda: None)`` used for row oriented metadata,
+    missing categories are ``None``. Changes to the row are written through
+    to the columns it was created from.
+    """
+
+    __slots__ = ('_store', '_idx')
+
+    def __init__(self, store, idx):
+        super(MetadataRow, self).__init__(
+            (k, col[idx]) for k, col in viewitems(store._columns)
+            if col[idx] is not _MISSING_MD)
+        self._store = store
+        self._idx = idx
+
+    def __missing__(self, key):
+        return None
+
+    def __setitem__(self, key, value):
+        super(MetadataRow, self).__setitem__(key, value)
+        self._store._set(self._idx, key, value)
+
+    def __delitem__(self, key):
+        super(MetadataRow, self).__delitem__(key)
+        self._store._set(self._idx, key, _MISSING_MD)
+
+    def update(self, *args, **kwargs):
+        for key, value in viewitems(dict(*args, **kwargs)):
+            self[key] = value
+
+    def setdefault(self, key, default=None):
+        if key not in self:
+            self[key] = default
+        return dict.__getitem__(self, key)
+
+    def pop(self, key, *default):
+        if key in self:
+            value = dict.__getitem__(self, key)
+            del self[key]
+            return value
+        elif default:
+            return default[0]
+        raise KeyError(key)
+
+    def clear(self):
+        for key in list(self):
+            del self[key]
+
+    def copy(self):
+        """Return a detached ``defaultdict`` copy of the row"""
+        md = defaultdict(lambda: None)
+        md.update(self)
+        return md
+
+    __copy__ = copy
+
+    def __deepcopy__(self, memo):
+        md = defaultdict(lambda: None)
+        md.update(deepcopy(dict(self), memo))
+        return md
+
+
+class ColumnarMetadata(Sequence):
+
+    """Metadata for an axis stored as one column per category
+
+    Row oriented metadata store a ``dict`` per sample or observation. For
+    axes with many IDs, the memory used by the dicts, and the time spent
+    copying them, can dominate. ``ColumnarMetadata`` instead stores a 1-D
+    object array per category, and can be used in place of the sequence of
+    dicts anywhere a ``Table`` accepts or returns metadata. Indexing with an
+    int returns a ``MetadataRow`` for that ID, while indexing with a slice,
+    a boolean mask or an array of positions returns a new
+    ``ColumnarMetadata`` for the subset.
+
+    Parameters
+    ----------
+    columns : dict of array_like
+        The values of each category, in index order with the IDs
+    n : int, optional
+        The number of IDs. Required if `columns` is empty.
+
+    Raises
+    ------
+    ValueError
+        If the columns are not all of the same length
+
+    See Also
+    --------
+    Table.from_hdf5
+
+    Examples
+    --------
+    >>> from biom.table import ColumnarMetadata, Table
+    >>> md = ColumnarMetadata({'env': ['gut', 'skin', 'gut']})
+    >>> t = Table([[1, 2, 3], [4, 5, 6]], ['O1', 'O2'], ['S1', 'S2', 'S3'],
+    ...           sample_metadata=md, input_is_dense=True)
+    >>> t.metadata('S2')['env']
+    'skin'
+    >>> t.filter(['S1', 'S3']).metadata().column('env')
+    array(['gut', 'gut'], dtype=object)
+    """
+
+    def __init__(self, columns, n=None):
+        self._columns = OrderedDict((k, _object_column(v))
+                                    for k, v in viewitems(columns))
+
+        lengths = {len(v) for v in self._columns.values()}
+        if n is not None:
+            lengths.add(n)
+        if len(lengths) != 1:
+            raise ValueError("Columns are not of equal length, or the length "
+                             "is unknown")
+        self._n = lengths.pop()
+
+    @classmethod
+    def from_rows(cls, rows):
+        """Create from row oriented metadata
+
+        Parameters
+        ----------
+        rows : iterable of dict or None
+            The metadata of each ID. ``None`` is treated as an empty dict.
+
+        Returns
+        -------
+        ColumnarMetadata
+        """
+        rows = list(rows)
+        columns = OrderedDict()
+        for i, row in enumerate(rows):
+            if not row:
+                continue
+            for key, value in viewitems(row):
+                if key not in columns:
+                    columns[key] = np.empty(len(rows), dtype=object)
+                    columns[key].fill(_MISSING_MD)
+                columns[key][i] = value
+        return cls(columns, len(rows))
+
+    @property
+    def categories(self):
+        """The metadata categories"""
+        return list(self._columns)
+
+    def column(self, category):
+        """Return the values of a category
+
+        Parameters
+        ----------
+        category : str
+            The metadata category
+
+        Returns
+        -------
+        np.ndarray
+            An object array of the values in index order, with ``None`` for
+            IDs which do not have the category
+
+        Raises
+        ------
+        KeyError
+            If the category does not exist
+        """
+        column = self._columns[category]
+        missing = self._missing(category)
+        if missing.any():
+            column = column.copy()
+            column[missing] = None
+        return column
+
+    def _missing(self, category):
+        """Boolean mask of the IDs which do not have a category"""
+        column = self._columns[category]
+        return np.fromiter((v is _MISSING_MD for v in column), dtype=bool,
+                           count=len(column))
+
+    def _set(self, idx, key, value):
+        if key not in self._columns:
+            column = np.empty(self._n, dtype=object)
+            column.fill(_MISSING_MD)
+            self._columns[key] = column
+        self._columns[key][idx] = value
+
+    def __len__(self):
+        return self._n
+
+    def __getitem__(self, idx):
+        if isinstance(idx, six.integer_types + (np.integer,)):
+            if idx < 0:
+                idx += self._n
+            if not 0 <= idx < self._n:
+                raise IndexError("metadata index out of range")
+            return MetadataRow(self, idx)
+
+        n = len(np.arange(self._n)[idx])
+        columns = OrderedDict((k, v[idx]) for k, v in viewitems(self._columns))
+        return self.__class__(columns, n)
+
+    def __eq__(self, other):
+        if not isinstance(other, Sequence) or len(self) != len(other):
+            return False
+        return all(a == b for a, b in zip(self, other))
+
+    def __ne__(self, other):
+        return not (self == other)
+
+    __hash__ = None
+
+    def copy(self):
+        """Return a copy with its own columns, sharing the values"""
+        columns = OrderedDict((k, v.copy())
+                              for k, v in viewitems(self._columns))
+        return self.__class__(columns, self._n)
+
+    __copy__ = copy
+
+    def __deepcopy__(self, memo):
+        memo[id(_MISSING_MD)] = _MISSING_MD
+        return self.__class__(deepcopy(self._columns, memo), self._n)
+
+    def __repr__(self):
+        return '%s with %d rows and categories %r' % (
+            self.__class__.__name__, self._n, self.categories)
+
+
+def _hdf5_table_attrs(h5grp):
+    """Read the table ID, type, creation date and generator of an HDF5 table
+    """
+    id_ = h5grp.attrs['id']
+    create_date = h5grp.attrs['creation-date']
+    generated_by = h5grp.attrs['generated-by']
+    type_ = None if h5grp.attrs['type'] == '' else h5grp.attrs['type']
+
+    if isinstance(id_, six.binary_type):
+        if six.PY3:
+            id_ = id_.decode('ascii')
+        else:
+            id_ = str(id_)
+
+    if isinstance(type_, six.binary_type):
+        if six.PY3:
+            type_ = type_.decode('ascii')
+        else:
+            type_ = str(type_)
+
+    return id_, type_, create_date, generated_by
+
+
+def _hdf5_ids(grp):
+    """Read the IDs of an axis group of an HDF5 BIOM table"""
+    ids = grp['ids'][:]
+
+    if ids.size > 0 and isinstance(ids[0], bytes):
+        ids = np.char.decode(ids.astype(np.bytes_), 'utf8')
+
+    return ids
+
+
+def _metadata_categories(metadata, axis):
+    """Resolve the metadata argument of Table.from_hdf5 into the categories
+    of an axis to read, ``None`` meaning all of them"""
+    if isinstance(metadata, dict):
+        metadata = metadata.get(axis, False)
+
+    if metadata is None or metadata is True:
+        return None
+    elif metadata is False:
+        return []
+    elif isinstance(metadata, string_types):
+        return [metadata]
+    else:
+        return list(metadata)
+
+
+def _select_metadata(md, categories):
+    """Keep only some categories of a list of metadata dicts
+
+    Parameters
+    ----------
+    md : list of dict or None
+        The metadata of an axis
+    categories : list of str or None
+        The categories to keep, ``None`` meaning all of them
+
+    Returns
+    -------
+    list of dict or None
+        The metadata, or ``None`` if no ID has any of the categories
+    """
+    if md is None or categories is None:
+        return md
+
+    categories = set(categories)
+    md = [None if m is None else
+          {k: v for k, v in viewitems(m) if k in categories} for m in md]
+    return md if any(md) else None
+
+
+def _hdf5_metadata(grp, n, parse_fs=None, columnar=False, categories=None):
+    """Parse the ID specific metadata of an axis group of an HDF5 BIOM table
+
+    Parameters
+    ----------
+    grp : h5py.Group
+        The axis group, e.g. ``h5grp['sample']``
+    n : int
+        The number of IDs on the axis
+    parse_fs : dict, optional
+        Custom parsing functions for metadata fields, see
+        ``Table.from_hdf5``
+    columnar : bool, optional
+        Whether to return ``ColumnarMetadata``, in which case each dataset is
+        read into a column without creating a dict per ID
+    categories : Iterable of str, optional
+        The categories to read. All categories are read if ``None``.
+        Categories which the axis does not have are ignored.
+
+    Returns
+    -------
+    list of dict, ColumnarMetadata or None
+        The metadata in index order, or ``None`` if the axis does not have
+        metadata
+    """
+    parser = defaultdict(lambda: general_parser)
+    parser['taxonomy'] = vlen_list_of_str_parser
+    parser['KEGG_Pathways'] = vlen_list_of_str_parser
+    parser['collapsed_ids'] = vlen_list_of_str_parser
+    if parse_fs is not None:
+        parser.update(parse_fs)
+
+    md_grp = grp['metadata']
+    if categories is None:
+        categories = list(md_grp)
+    else:
+        categories = set(categories)
+        categories = [c for c in md_grp if c in categories]
+
+    # each dataset is parsed whole into a column
+    columns = OrderedDict()
+    for category in categories:
+        parse_f = parser[category]
+        data = md_grp[category][:]
+        if parse_f in _DATASET_PARSERS:
+            data = _DATASET_PARSERS[parse_f](data)
+        else:
+            data = [parse_f(data_row) for data_row in data]
+        columns[category] = data
+
+    # If there was no metadata on the axis, set it up as none
+    if not columns:
+        return None
+
+    if columnar:
+        return ColumnarMetadata(OrderedDict(
+            (c, _object_column(v)) for c, v in viewitems(columns)), n)
+
+    md = [{} for i in range(n)]
+    for category, column in viewitems(columns):
+        for md_dict, value in zip(md, column):
+            md_dict[category] = value
+    return md if md else None
+
+
+def _hdf5_read_subset(grp, indptr, idx, max_gap=8192):
+    """Read a subset of the vectors of a compressed matrix stored in HDF5
+
+    Only the ``data`` and ``indices`` ranges of the requested vectors are
+    read. The ranges are sorted and coalesced into runs, where a run spans
+    vectors which are adjacent on disk or separated by at most `max_gap`
+    elements, and each run is read with a single contiguous slice. The
+    subset is then gathered from the runs in memory.
+
+    Parameters
+    ----------
+    grp : h5py.Group
+        The matrix group, e.g. ``h5grp['sample/matrix']``
+    indptr : np.ndarray
+        The in memory ``indptr`` of the matrix group
+    idx : array_like of int
+        The positions of the vectors to read, in the order to return them
+    max_gap : int, optional
+        The largest number of unrequested elements to read in order to join
+        two runs. Reading a small gap is cheaper than issuing another read.
+
+    Returns
+    -------
+    tuple of np.ndarray
+        The ``(data, indices, indptr)`` of the subset
+    """
+    idx = np.asarray(idx, dtype=int)
+    new_indptr = np.zeros(len(idx) + 1, dtype=indptr.dtype)
+    h5_data = grp['data']
+    dtype = _stored_dtype(h5_data.dtype)
+    if not len(idx):
+        return (np.array([], dtype=dtype), np.array([], dtype=np.int32),
+                new_indptr)
+
+    order = np.argsort(idx, kind='mergesort')
+    sorted_idx = idx[order]
+    starts = indptr[sorted_idx]
+    ends = indptr[sorted_idx + 1]
+
+    # as the vectors are sorted, ends is nondecreasing so a run ends with the
+    # end of its last vector
+    breaks = np.flatnonzero(starts[1:] - ends[:-1] > max_gap) + 1
+    run_first = np.concatenate(([0], breaks))
+    run_starts = starts[run_first]
+    run_ends = ends[np.concatenate((breaks - 1, [len(ends) - 1]))]
+
+    h5_indices = grp['indices']
+    data = [h5_data[s:e] for s, e in zip(run_starts, run_ends) if e > s]
+    indices = [h5_indices[s:e] for s, e in zip(run_starts, run_ends)
+               if e > s]
+    data = np.concatenate(data) if data else np.array([], dtype=dtype)
+    indices = (np.concatenate(indices) if indices
+               else np.array([], dtype=np.int32))
+
+    # the offset of each vector in the buffer of concatenated runs
+    run_offsets = np.concatenate(([0], (run_ends - run_starts).cumsum()))
+    run_of = np.repeat(np.arange(len(run_first)),
+                       np.diff(np.concatenate((run_first, [len(starts)]))))
+    offsets = run_offsets[run_of] + starts - run_starts[run_of]
+
+    lengths = ends - starts
+    in_order = not (order != np.arange(len(order))).any()
+    if in_order:
+        np.cumsum(lengths, out=new_indptr[1:])
+        if new_indptr[-1] == len(data):
+            # the runs hold exactly the requested vectors
+            return data.astype(dtype, copy=False), indices, new_indptr
+    else:
+        rank = np.argsort(order, kind='mergesort')
+        offsets = offsets[rank]
+        lengths = lengths[rank]
+        np.cumsum(lengths, out=new_indptr[1:])
+
+    gather = (np.repeat(offsets - new_indptr[:-1], lengths) +
+              np.arange(new_indptr[-1]))
+
+    data = data[gather].astype(dtype, copy=False)
+    return data, indices[gather], new_indptr
+
+
+def _hdf5_compression(compress):
+    """Resolve the compress argument of Table.to_hdf5
+
+    Returns
+    -------
+    str, int or None
+        The compression given to h5py for the datasets of the metadata
+    str or None
+        The filter of the matrix datasets, 'gzip' or 'lzf'
+    int or None
+        The gzip level of the matrix datasets
+    """
+    if compress is True:
+        return 'gzip', 'gzip', 4
+    elif compress is False or compress is None:
+        return None, None, None
+    elif compress == 'gzip':
+        return 'gzip', 'gzip', 4
+    elif compress == 'lzf':
+        return 'lzf', 'lzf', None
+    elif isinstance(compress, six.integer_types) and 0 <= compress <= 9:
+        return compress, 'gzip', compress
+    else:
+        raise ValueError("Unknown compression: %r" % (compress, ))
+
+
+def _deflate_chunk(values, level, shuffle):
+    """Apply the HDF5 shuffle and deflate filters to the values of a chunk"""
+    buf = values.view(np.uint8)
+    if shuffle and values.itemsize > 1:
+        # the shuffle filter stores the first byte of every value, then the
+        # second byte of every value, and so on
+        buf = buf.reshape(len(values), values.itemsize).T
+    return zlib.compress(np.ascontiguousarray(buf).tobytes(), level)
+
+
+def _hdf5_write_vector(grp, name, values, dtype, compression=None,
+                       level=None, shuffle=False, chunk_size=2**16,
+                       pool=None):
+    """Write a 1-D dataset
+
+    Parameters
+    ----------
+    grp : h5py.Group
+        The group in which to create the dataset
+    name : str
+        The name of the dataset
+    values : np.ndarray
+        The values to write
+    dtype : np.dtype
+        The type of the dataset
+    compression : {'gzip', 'lzf', None}, optional
+        The compression filter
+    level : int, optional
+        The gzip level
+    shuffle : bool, optional
+        Whether to apply the shuffle filter before compressing
+    chunk_size : int, optional
+        The number of values in a chunk of a compressed dataset
+    pool : multiprocessing.pool.ThreadPool, optional
+        If given, and `compression` is 'gzip', the chunks are compressed in
+        the pool with ``zlib``, which releases the GIL, and written as they
+        are with ``write_direct_chunk``. Otherwise h5py compresses the chunks
+        one at a time while writing.
+    """
+    values = np.ascontiguousarray(values, dtype=dtype)
+    n = len(values)
+    if compression is None or not n:
+        grp.create_dataset(name, shape=(n, ), dtype=dtype, data=values,
+                           compression=compression)
+        return
+
+    chunk_size = min(chunk_size, n)
+    kwargs = dict(shape=(n, ), dtype=dtype, chunks=(chunk_size, ),
+                  compression=compression, shuffle=shuffle)
+    if level is not None:
+        kwargs['compression_opts'] = level
+
+    if pool is None or compression != 'gzip':
+        grp.create_dataset(name, data=values, **kwargs)
+        return
+
+    dset = grp.create_dataset(name, **kwargs)
+    n_full = n // chunk_size
+    pieces = [values[i * chunk_size:(i + 1) * chunk_size]
+              for i in range(n_full)]
+    if n % chunk_size:
+        # chunks on the edge of a dataset are stored at full size
+        last = np.zeros(chunk_size, dtype=values.dtype)
+        last[:n % chunk_size] = values[n_full * chunk_size:]
+        pieces.append(last)
+
+    compressed = pool.imap(lambda piece: _deflate_chunk(piece, level,
+                                                        shuffle), pieces)
+    for i, chunk in enumerate(compressed):
+        dset.id.write_direct_chunk((i * chunk_size, ), chunk)
+
+
+# binary functions whose reduction does not depend on the order of the
+# values, and the ufunc which computes that reduction over an array
+_COMMUTATIVE_UFUNCS = {add: np.add, np.add: np.add,
+                       mul: np.multiply, np.multiply: np.multiply,
+                       max: np.maximum, np.maximum: np.maximum,
+                       np.fmax: np.fmax,
+                       min: np.minimum, np.minimum: np.minimum,
+                       np.fmin: np.fmin}
+
+
+def _cast_new_metadata(md):
+    """Cast the metadata of an axis like Table._cast_metadata, but use the
+    rows which are already defaultdicts as they are"""
+    if md is None:
+        return None
+    elif isinstance(md, ColumnarMetadata):
+        return md if md.categories else None
+
+    md = tuple(md)
+    if all(row is None for row in md):
+        return None
+
+    cast = []
+    for row in md:
+        if not isinstance(row, defaultdict):
+            item, row = row, defaultdict(lambda: None)
+            if isinstance(item, dict):
+                row.update(item)
+            elif item is not None:
+                raise TableException("Unable to cast metadata: %s" %
+                                     repr(item))
+        cast.append(row)
+    return tuple(cast)
+
+
+def _share_metadata(*tables):
+    """Mark the metadata of tables as shared, see Table._copy_on_write"""
+    for table in tables:
+        table._shared = table._shared.union(['sample', 'observation'])
+
+
+def _matrix_nbytes(matrix):
+    """The memory used by the arrays of a compressed sparse matrix"""
+    return matrix.data.nbytes + matrix.indices.nbytes + matrix.indptr.nbytes
+
+
+def _permute_compressed(matrix, order):
+    """Reorder the vectors along the major axis of a compressed sparse matrix
+
+    The vectors are the rows of a CSR matrix and the columns of a CSC matrix.
+    Their stored values are gathered by position from the index pointers, so
+    the values within each vector keep their order.
+
+    Parameters
+    ----------
+    matrix : csr_matrix or csc_matrix
+        The matrix to reorder
+    order : np.ndarray of int
+        The positions of the vectors, in their new order
+
+    Returns
+    -------
+    csr_matrix or csc_matrix
+        A new matrix of the same format as `matrix`
+    """
+    starts = matrix.indptr[order]
+    lengths = matrix.indptr[order + 1] - starts
+    indptr = np.zeros(len(order) + 1, dtype=matrix.indptr.dtype)
+    np.cumsum(lengths, out=indptr[1:])
+
+    positions = np.arange(indptr[-1], dtype=matrix.indptr.dtype)
+    positions += np.repeat(starts - indptr[:-1], lengths)
+
+    if matrix.format == 'csr':
+        shape = (len(order), matrix.shape[1])
+    else:
+        shape = (matrix.shape[0], len(order))
+    return matrix.__class__((matrix.data[positions],
+                             matrix.indices[positions], indptr), shape=shape)
+
+
+def _reduce_compressed(ufunc, matrix, implicit_zeros=True):
+    """Reduce each vector of a compressed sparse matrix with a ufunc
+
+    Parameters
+    ----------
+    ufunc : np.ufunc
+        A binary ufunc for which the order of reduction does not matter
+    matrix : scipy.sparse.csr_matrix or scipy.sparse.csc_matrix
+        The rows of a csr matrix, or the columns of a csc matrix, are reduced
+    implicit_zeros : bool, optional
+        If ``True``, the reduction includes the zeros which are not stored,
+        as if each vector were dense. If ``False``, only the stored values are
+        reduced and a vector without stored values reduces to 0.
+
+    Returns
+    -------
+    np.ndarray
+        The reduction of each vector. Sums and products of integers are
+        accumulated in int64.
+    """
+    if not matrix.has_canonical_format:
+        matrix = matrix.copy()
+        matrix.sum_duplicates()
+
+    if matrix.format == 'csr':
+        length = matrix.shape[1]
+    else:
+        length = matrix.shape[0]
+
+    dtype = matrix.dtype
+    if ufunc is np.add or ufunc is np.multiply:
+        dtype = _sum_dtype(dtype)
+
+    counts = np.diff(matrix.indptr)
+    result = zeros(len(counts), dtype=dtype)
+    stored = counts > 0
+
+    # reduceat reduces from each offset to the next one, so the offsets of
+    # the vectors without stored values have to be dropped
+    if stored.any():
+        data = matrix.data[:matrix.indptr[-1]]
+        result[stored] = ufunc.reduceat(data, matrix.indptr[:-1][stored],
+                                        dtype=dtype)
+
+    if implicit_zeros:
+        partial = counts < length
+        result[partial] = ufunc(result[partial], 0)
+
+    return result
+
+
+def _row_sums(matrix):
+    """The sums of the rows of a sparse matrix as a 1-D array"""
+    return np.asarray(matrix.sum(axis=1)).ravel()
+
+
+def _euclidean_block(a, b):
+    """Euclidean distances between the rows of CSR matrices `a` and `b`"""
+    dist = (a * b.T).toarray()
+    dist *= -2
+    dist += _row_sums(a.multiply(a))[:, newaxis]
+    dist += _row_sums(b.multiply(b))
+    # rounding can leave the squared distance of equal vectors below zero
+    np.maximum(dist, 0, out=dist)
+    return np.sqrt(dist, out=dist)
+
+
+def _cosine_block(a, b):
+    """Cosine distances between the rows of CSR matrices `a` and `b`"""
+    norms = np.outer(np.sqrt(_row_sums(a.multiply(a))),
+                     np.sqrt(_row_sums(b.multiply(b))))
+    with np.errstate(divide='ignore', invalid='ignore'):
+        return 1 - (a * b.T).toarray() / norms
+
+
+def _jaccard_block(a, b):
+    """Jaccard distances between the nonzero values of the rows of CSR
+    matrices `a` and `b`"""
+    a = (a != 0).astype(float)
+    b = (b != 0).astype(float)
+    shared = (a * b.T).toarray()
+    union = _row_sums(a)[:, newaxis] + _row_sums(b) - shared
+    with np.errstate(divide='ignore', invalid='ignore'):
+        return (union - shared) / union
+
+
+def _braycurtis_block(a, b):
+    """Bray-Curtis distances between the rows of CSR matrices `a` and `b`
+
+    sum(|u - v|) and sum(|u + v|) only differ from sum(|v|) where u is
+    nonzero, so each row of `a` only needs the columns of `b` it is stored in.
+    """
+    b = b.toarray()
+    b_abs = np.abs(b).sum(axis=1)
+    diff = np.empty((a.shape[0], b.shape[0]))
+    total = np.empty_like(diff)
+    for i in range(a.shape[0]):
+        start, stop = a.indptr[i], a.indptr[i + 1]
+        u = a.data[start:stop]
+        v = b[:, a.indices[start:stop]]
+        v_abs = np.abs(v)
+        diff[i] = b_abs + (np.abs(u - v) - v_abs).sum(axis=1)
+        total[i] = b_abs + (np.abs(u + v) - v_abs).sum(axis=1)
+    with np.errstate(divide='ignore', invalid='ignore'):
+        return diff / total
+
+
+_PAIRWISE_METRICS = {'braycurtis': _braycurtis_block,
+                     'cosine': _cosine_block,
+                     'euclidean': _euclidean_block,
+                     'jaccard': _jaccard_block}
+
+
+def _cdist_block(metric):
+    """Compute the distances between the rows of CSR matrices with cdist,
+    densifying as many rows of `a` at a time as `b` has"""
+    def f(a, b):
+        b = b.toarray()
+        step = max(b.shape[0], 1)
+        dist = np.empty((a.shape[0], b.shape[0]))
+        for start in range(0, a.shape[0], step):
+            stop = start + step
+            dist[start:stop] = cdist(a[start:stop].toarray(), b, metric)
+        return dist
+    return f
+
+
+def _random_state(seed):
+    """Resolve a seed argument to a source of random numbers
+
+    ``None`` resolves to numpy's global random state, an int to a new
+    ``np.random.RandomState`` and a ``np.random.RandomState`` to itself.
+    """
+    if seed is None:
+        return np.random
+    elif isinstance(seed, np.random.RandomState):
+        return seed
+    else:
+        return np.random.RandomState(seed)
+
+
+def _subsample_seed(rng):
+    """Draw the 64 bit seed from which each subsampled vector derives its
+    own random stream"""
+    high, low = rng.randint(0, 2 ** 31, size=2)
+    return (int(high) << 33) ^ int(low)
+
+
+def _write_json_items(write, items, chunk_size=10000):
+    """Write an iterable of JSON strings, separated by commas
+
+    The items are joined and written `chunk_size` at a time, so memory is
+    bounded by the chunk rather than the number of items.
+    """
+    items = iter(items)
+    first = True
+    while True:
+        chunk = list(islice(items, chunk_size))
+        if not chunk:
+            break
+        if not first:
+            write(u',')
+        write(u','.join(chunk))
+        first = False
+
+
+def _json_triples(mat, chunk_nnz=100000):
+    """Yield the nonzero values of a CSR matrix as JSON [row, col, value]
+    triples, formatted a chunk of about `chunk_nnz` values at a time"""
+    if not mat.has_sorted_indices:
+        mat = mat.sorted_indices()
+
+    indptr = mat.indptr
+    n_rows = mat.shape[0]
+
+    start = 0
+    while start < n_rows:
+        stop = np.searchsorted(indptr, indptr[start] + chunk_nnz,
+                               side='right') - 1
+        stop = min(max(stop, start + 1), n_rows)
+        lo, hi = indptr[start], indptr[stop]
+
+        values = mat.data[lo:hi]
+        nonzero = values != 0
+        rows = np.repeat(np.arange(start, stop),
+                         np.diff(indptr[start:stop + 1]))
+        start = stop
+
+        if nonzero.any():
+            yield _format_json_triples(rows[nonzero],
+                                       mat.indices[lo:hi][nonzero],
+                                       values[nonzero])
+
+
+def _format_json_triples(rows, cols, values):
+    """Format arrays of rows, columns and values as comma separated JSON
+    [row, col, value] triples"""
+    fmt = u'[%d,%d,%r]' if values.dtype.kind == 'f' else u'[%d,%d,%d]'
+
+    # a single format of all the triples keeps the formatting in C
+    fields = [None] * (3 * len(values))
+    fields[0::3] = rows.tolist()
+    fields[1::3] = cols.tolist()
+    fields[2::3] = values.tolist()
+    return u','.join([fmt] * len(values)) % tuple(fields)
+
+
+def _delimited_rows(mat, delim, chunk_cells=2**20):
+    """Yield lists of the delimited values of the rows of a sparse matrix, a
+    chunk of about `chunk_cells` values at a time
+
+    Each distinct value is formatted once with ``str``, as is zero,
+    and the rows of a chunk are filled in from those strings.
+    """
+    mat = mat.tocsr()
+    n_rows, n_cols = mat.shape
+    zero = str(mat.dtype.type(0))
+    unique, inverse = np.unique(mat.data, return_inverse=True)
+    tokens = np.array([str(v) for v in unique], dtype=object)
+
+    indptr = mat.indptr
+    block_size = max(1, chunk_cells // max(n_cols, 1))
+    cells = np.empty((min(block_size, n_rows), n_cols), dtype=object)
+    for start in range(0, n_rows, block_size):
+        stop = min(start + block_size, n_rows)
+        lo, hi = indptr[start], indptr[stop]
+        rows = np.repeat(np.arange(stop - start),
+                         np.diff(indptr[start:stop + 1]))
+
+        block = cells[:stop - start]
+        block.fill(zero)
+        block[rows, mat.indices[lo:hi]] = tokens[inverse[lo:hi]]
+        yield [delim.join(row) for row in block.tolist()]
 
 
 class Table(object):
@@ -430,6 +1551,9 @@ class Table(object):
     sample_group_metadata : list, optional
         group that contains sample specific group metadata information
         (e.g., relationships between samples)
+    dtype : {float64, float32, int64, uint32}, optional
+        The dtype in which the values are stored. Defaults to float64. Counts
+        below 2 ** 32 take half the memory as uint32.
 
     Attributes
     ----------
@@ -446,7 +1570,7 @@ class Table(object):
     Raises
     ------
     TableException
-        When an invalid table type is provided.
+        When an invalid table type or dtype is provided.
 
     References
     ----------
@@ -456,11 +1580,19 @@ class Table(object):
        GigaScience 2012 1:7
     """
 
+    # the parts of the table shared with a lazy copy, see _copy_on_write
+    _shared = frozenset()
+
+    # the memory budget of, and the (matrix, conversion) pair kept by, the
+    # layout cache, see cache_layouts
+    _layout_budget = 0
+    _layout_cache = None
+
     def __init__(self, data, observation_ids, sample_ids,
                  observation_metadata=None, sample_metadata=None,
                  table_id=None, type=None, create_date=None, generated_by=None,
                  observation_group_metadata=None, sample_group_metadata=None,
-                 **kwargs):
+                 dtype=None, **kwargs):
 
         self.type = type
         self.table_id = table_id
@@ -476,19 +1608,23 @@ class Table(object):
         else:
             self._data = data.tocsr()
 
-        self._data = self._data.astype(float)
+        self._data = self._data.astype(_storage_dtype(dtype))
 
         # using object to allow for variable length strings
         self._sample_ids = np.asarray(sample_ids, dtype=object)
         self._observation_ids = np.asarray(observation_ids, dtype=object)
 
         if sample_metadata is not None:
-            self._sample_metadata = tuple(sample_metadata)
+            if not isinstance(sample_metadata, ColumnarMetadata):
+                sample_metadata = tuple(sample_metadata)
+            self._sample_metadata = sample_metadata
         else:
             self._sample_metadata = None
 
         if observation_metadata is not None:
-            self._observation_metadata = tuple(observation_metadata)
+            if not isinstance(observation_metadata, ColumnarMetadata):
+                observation_metadata = tuple(observation_metadata)
+            self._observation_metadata = observation_metadata
         else:
             self._observation_metadata = None
 
@@ -504,6 +1640,128 @@ class Table(object):
         self._cast_metadata()
         self._index_ids()
 
+    @classmethod
+    def from_arrays(cls, data, observation_ids, sample_ids,
+                    observation_metadata=None, sample_metadata=None,
+                    table_id=None, type=None, create_date=None,
+                    generated_by=None, observation_group_metadata=None,
+                    sample_group_metadata=None, dtype=None, copy=False,
+                    validate=False):
+        """Create a table from a sparse matrix, trusting the input
+
+        The constructor converts its data to a CSR matrix of `dtype`, which
+        always copies it, casts the metadata of every sample and observation,
+        checks the table with ``errcheck`` and indexes the IDs. This
+        constructor instead uses a CSR or CSC matrix as is if its values are
+        stored in one of the supported dtypes, only casts the metadata which
+        are not already ``defaultdict``, indexes the IDs when they are first
+        looked up, and by default does not check the table, so it is much
+        cheaper for building many tables.
+
+        Parameters
+        ----------
+        data : csr_matrix, csc_matrix or tuple of np.ndarray
+            The matrix, with observations as rows and samples as columns, or
+            the ``(data, indices, indptr)`` arrays of a CSR matrix. Other
+            sparse formats are converted to CSR, and values are cast to
+            `dtype`.
+        observation_ids : array_like of str
+            The observation IDs
+        sample_ids : array_like of str
+            The sample IDs
+        observation_metadata : sequence of dict or ColumnarMetadata, optional
+            The metadata of each observation. The dicts which are
+            ``defaultdict`` are used, and shared, as is.
+        sample_metadata : sequence of dict or ColumnarMetadata, optional
+            The metadata of each sample, as for `observation_metadata`
+        table_id : str, optional
+            A field that can be used to identify the table
+        type : str, see notes, optional
+            The type of information contained in the table
+        create_date : str, optional
+            Date that this table was built
+        generated_by : str, optional
+            Individual who built the table
+        observation_group_metadata : list, optional
+            Group metadata on observations
+        sample_group_metadata : list, optional
+            Group metadata on sample
+        dtype : {float64, float32, int64, uint32}, optional
+            The dtype in which the values are stored. Defaults to the dtype
+            of `data` if it is one of these, and to float64 otherwise.
+        copy : bool, optional
+            Defaults to ``False``. If ``True``, the arrays of the matrix and
+            the IDs are copied, rather than shared with the input.
+        validate : bool, optional
+            Defaults to ``False``. If ``True``, the table is checked with
+            ``errcheck`` as by the constructor, e.g. for the shape of the
+            matrix and duplicate IDs.
+
+        Returns
+        -------
+        Table
+
+        Raises
+        ------
+        TableException
+            If `data` is not a sparse matrix or a tuple of arrays, if `dtype`
+            is not supported, if a metadata entry is not a dict or ``None``,
+            or if `validate` and the table fails a check
+
+        Examples
+        --------
+        >>> import numpy as np
+        >>> from scipy.sparse import csc_matrix
+        >>> from biom.table import Table
+        >>> data = csc_matrix(np.array([[0., 1.], [2., 3.]]))
+        >>> table = Table.from_arrays(data, ['O1', 'O2'], ['S1', 'S2'])
+        >>> table.matrix_data is data
+        True
+        >>> print table.data('O2', axis='observation')
+        [ 2.  3.]
+        """
+        shape = (len(observation_ids), len(sample_ids))
+        if isinstance(data, tuple):
+            data = csr_matrix(data, shape=shape, copy=copy)
+        elif isspmatrix(data):
+            if data.format not in ('csr', 'csc'):
+                data = data.tocsr()
+            elif copy:
+                data = data.copy()
+        else:
+            raise TableException("data must be a sparse matrix, or the data, "
+                                 "indices and indptr arrays of a CSR matrix")
+        if dtype is None:
+            dtype = _stored_dtype(data.dtype)
+        else:
+            dtype = _storage_dtype(dtype)
+        if data.dtype != dtype:
+            data = data.astype(dtype)
+
+        table = cls.__new__(cls)
+        table.type = type
+        table.table_id = table_id
+        table.create_date = create_date
+        table.generated_by = generated_by
+        table.format_version = __format_version__
+
+        table._data = data
+        table._observation_ids = np.array(observation_ids, dtype=object,
+                                          copy=copy)
+        table._sample_ids = np.array(sample_ids, dtype=object, copy=copy)
+        table._observation_metadata = _cast_new_metadata(observation_metadata)
+        table._sample_metadata = _cast_new_metadata(sample_metadata)
+        table._observation_group_metadata = observation_group_metadata or None
+        table._sample_group_metadata = sample_group_metadata or None
+
+        # indexed by _index when first needed
+        table._sample_index = None
+        table._obs_index = None
+
+        if validate:
+            errcheck(table)
+        return table
+
     def _index_ids(self):
         """Sets lookups {id:index in _data}.
 
@@ -531,12 +1789,42 @@ class Table(object):
             If provided an unrecognized axis.
         """
         if axis == 'sample':
+            if self._sample_index is None:
+                self._sample_index = index_list(self._sample_ids)
             return self._sample_index
         elif axis == 'observation':
+            if self._obs_index is None:
+                self._obs_index = index_list(self._observation_ids)
             return self._obs_index
         else:
             raise UnknownAxisError(axis)
 
+    def _copy_on_write(self, *parts):
+        """Take copies of the parts of the table shared with another table
+
+        ``_lazy_copy`` shares the matrix and metadata of a table with the
+        copy, so either table has to call this before modifying them in
+        place.
+
+        Parameters
+        ----------
+        parts : {'data', 'sample', 'observation'}
+            The matrix, or the metadata of an axis
+        """
+        for part in self._shared.intersection(parts):
+            if part == 'data':
+                self._data = self._data.copy()
+                self._layout_cache = None
+                continue
+
+            # the values, e.g. taxonomy lists, can be modified in place too
+            md = deepcopy(self._get_metadata(axis=part))
+            if part == 'sample':
+                self._sample_metadata = md
+            else:
+                self._observation_metadata = md
+        self._shared = self._shared.difference(parts)
+
     def _conv_to_self_type(self, vals, transpose=False, dtype=None):
         """For converting vectors to a compatible self type"""
         if dtype is None:
@@ -635,6 +1923,9 @@ class Table(object):
         """
         def cast_metadata(md):
             """Do the actual casting"""
+            if isinstance(md, ColumnarMetadata):
+                return md if md.categories else None
+
             default_md = []
             # if we have a list of [None], set to None
             if md is not None:
@@ -686,6 +1977,53 @@ class Table(object):
         """The sparse matrix object"""
         return self._data
 
+    @property
+    def _constructor(self):
+        """The class used for tables derived from this one"""
+        return self.__class__
+
+    def cache_layouts(self, max_bytes=None):
+        """Keep the matrix in both the CSR and CSC layouts
+
+        Access by observation is fast in the CSR layout, and access by sample
+        in the CSC layout, so by default the matrix is converted whenever the
+        axis accessed changes. With the layout cache, the matrix is kept as
+        is and its conversion to the other layout is kept alongside it, so
+        code which alternates between the axes only converts the matrix once.
+        The conversion is dropped whenever the table modifies its matrix.
+
+        Parameters
+        ----------
+        max_bytes : int or None, optional
+            The memory budget of the cached layout, in bytes. A conversion
+            larger than the budget is not cached, and the matrix is converted
+            as it is without the cache. ``None``, the default, is unlimited,
+            and ``0`` disables the cache and releases the cached layout.
+
+        Notes
+        -----
+        The cache doubles the memory used by the matrix. Changes made directly
+        to the object returned by ``matrix_data`` are not seen by the cache,
+        so the cache should be disabled before making them.
+
+        Examples
+        --------
+        >>> import numpy as np
+        >>> from biom.table import Table
+        >>> table = Table(np.array([[0, 1], [2, 3]]), ['O1', 'O2'],
+        ...               ['S1', 'S2'])
+        >>> table.cache_layouts()
+        >>> print table.data('S2'), table.data('O2', axis='observation')
+        [ 1.  3.] [ 2.  3.]
+        >>> print table.matrix_data.format
+        csr
+        """
+        self._layout_budget = max_bytes
+        cached = self._layout_cache
+        if cached is not None and max_bytes is not None and \
+                _matrix_nbytes(cached[1]) > max_bytes:
+            self._layout_cache = None
+
     def length(self, axis='sample'):
         """Return the length of an axis
 
@@ -793,6 +2131,7 @@ class Table(object):
             if self.metadata(axis=ax) is None:
                 continue
 
+            self._copy_on_write(ax)
             for i, md in zip(self.ids(axis=ax), self.metadata(axis=ax)):
                 for k in keys:
                     if k in md:
@@ -817,6 +2156,7 @@ class Table(object):
         axis : {'sample', 'observation'}, optional
             The axis to operate on
         """
+        self._copy_on_write(axis)
         metadata = self.metadata(axis=axis)
         if metadata is not None:
             for id_, md_entry in viewitems(md):
@@ -915,8 +2255,7 @@ class Table(object):
         expensive if done frequently.
 
         """
-        self._data = self._data.tocsr()
-        return self._data.getrow(row_idx)
+        return self._as_format('csr', inplace=True).getrow(row_idx)
 
     def _get_col(self, col_idx):
         """Return the column at ``col_idx``.
@@ -933,8 +2272,7 @@ class Table(object):
         expensive if done frequently.
 
         """
-        self._data = self._data.tocsc()
-        return self._data.getcol(col_idx)
+        return self._as_format('csc', inplace=True).getcol(col_idx)
 
     def reduce(self, f, axis):
         """Reduce over axis using function `f`
@@ -959,6 +2297,15 @@ class Table(object):
         TableException
             If the table's data matrix is empty
 
+        Notes
+        -----
+        If `f` is ``operator.add``, ``operator.mul``, the builtin ``min`` or
+        ``max``, or one of the ufuncs ``np.add``, ``np.multiply``,
+        ``np.minimum``, ``np.maximum``, ``np.fmin`` or ``np.fmax``, the
+        reduction is computed directly on the sparse matrix. Any other
+        function is called on each pair of values of each dense vector in
+        turn, which is far slower on large tables.
+
         Examples
         --------
         >>> import numpy as np
@@ -987,6 +2334,15 @@ class Table(object):
         if self.is_empty():
             raise TableException("Cannot reduce an empty table")
 
+        try:
+            ufunc = _COMMUTATIVE_UFUNCS.get(f)
+        except TypeError:
+            # f is not hashable
+            ufunc = None
+
+        if ufunc is not None:
+            return _reduce_compressed(ufunc, self._get_sparse_data(axis=axis))
+
         # np.apply_along_axis might reduce type conversions here and improve
         # speed. am opting for reduce right now as I think its more readable
         return asarray([reduce(f, v) for v in self.iter_data(axis=axis)])
@@ -1060,8 +2416,8 @@ class Table(object):
         Table
             Return a new table that is the transpose of caller table.
         """
-        sample_md_copy = deepcopy(self.metadata())
-        obs_md_copy = deepcopy(self.metadata(axis='observation'))
+        sample_md_copy = deepcopy(self._get_metadata())
+        obs_md_copy = deepcopy(self._get_metadata(axis='observation'))
 
         if self._data.getformat() == 'lil':
             # lil's transpose method doesn't have the copy kwarg, but all of
@@ -1069,9 +2425,11 @@ class Table(object):
             self._data = self._data.tocsr()
 
         # sample ids and observations are reversed becuase we trasposed
-        return self.__class__(self._data.transpose(copy=True),
-                              self.ids()[:], self.ids(axis='observation')[:],
-                              sample_md_copy, obs_md_copy, self.table_id)
+        return self._constructor(self._data.transpose(copy=True),
+                                 self.ids()[:],
+                                 self.ids(axis='observation')[:],
+                                 sample_md_copy, obs_md_copy, self.table_id,
+                                 dtype=self.dtype)
 
     def head(self, n=5, m=5):
         """Get the first n rows and m columns from self
@@ -1291,7 +2649,7 @@ class Table(object):
 
         # prepare the result object and update the ids along the specified
         # axis
-        result = self if inplace else self.copy()
+        result = self if inplace else self._lazy_copy()
         if axis == 'sample':
             result._sample_ids = updated_ids
         else:
@@ -1299,14 +2657,76 @@ class Table(object):
 
         result._index_ids()
 
-        # check for errors (specifically, we want to esnsure that duplicate
-        # ids haven't been introduced)
-        errcheck(result)
+        # check for errors (specifically, we want to esnsure that duplicate
+        # ids haven't been introduced)
+        errcheck(result)
+
+        return result
+
+    def _get_sparse_data(self, axis='sample'):
+        """Returns the internal data in the correct sparse representation
+
+        Parameters
+        ----------
+        axis : {'sample', 'observation'}, optional
+            Axis to search for `id`. Defaults to 'sample'
+
+        Returns
+        -------
+        sparse matrix
+            The data in csc (axis='sample') or csr (axis='observation')
+            representation
+        """
+        if axis == 'sample':
+            return self._as_format('csc')
+        elif axis == 'observation':
+            return self._as_format('csr')
+        else:
+            raise UnknownAxisError(axis)
+
+    def _as_format(self, format, inplace=False):
+        """Returns the matrix in a compressed sparse format
+
+        The conversion is served from, and kept in, the layout cache if it
+        is enabled and the conversion is within its budget.
+
+        Parameters
+        ----------
+        format : {'csr', 'csc'}
+            The format to return the matrix in
+        inplace : bool, optional
+            If ``True``, and the conversion is not cached, the matrix of the
+            table is replaced by it
+
+        Returns
+        -------
+        sparse matrix
+            The matrix in `format`
+        """
+        if self._data.format == format:
+            return self._data
+
+        cached = self._layout_cache
+        if cached is not None and cached[0] is self._data:
+            return cached[1]
+
+        converted = self._data.asformat(format)
+        budget = self._layout_budget
+        if budget is None or 0 < _matrix_nbytes(converted) <= budget:
+            self._layout_cache = (self._data, converted)
+        else:
+            self._layout_cache = None
+            if inplace:
+                self._data = converted
+        return converted
 
-        return result
+    def _get_writable_sparse_data(self, axis='sample'):
+        """Returns the internal data in the correct sparse representation, to
+        be modified in place
 
-    def _get_sparse_data(self, axis='sample'):
-        """Returns the internal data in the correct sparse representation
+        The matrix is converted to the representation of
+        ``_get_sparse_data``, and copied first if it is shared with another
+        table.
 
         Parameters
         ----------
@@ -1316,15 +2736,17 @@ class Table(object):
         Returns
         -------
         sparse matrix
-            The data in csc (axis='sample') or csr (axis='observation')
-            representation
+            The data of the table in csc (axis='sample') or csr
+            (axis='observation') representation
         """
-        if axis == 'sample':
-            return self._data.tocsc()
-        elif axis == 'observation':
-            return self._data.tocsr()
+        data = self._get_sparse_data(axis=axis)
+        if data is self._data:
+            self._copy_on_write('data')
         else:
-            raise UnknownAxisError(axis)
+            self._data = data
+            self._shared = self._shared.difference(['data'])
+        self._layout_cache = None
+        return self._data
 
     def metadata(self, id=None, axis='sample'):
         """Return the metadata of the identified sample/observation.
@@ -1340,7 +2762,9 @@ class Table(object):
         -------
         defaultdict or None
             The corresponding metadata ``defaultdict`` or ``None`` of that axis
-            does not have metadata.
+            does not have metadata. If the axis metadata are stored as
+            ``ColumnarMetadata``, a ``MetadataRow`` is returned instead, which
+            behaves the same way.
 
         Raises
         ------
@@ -1372,12 +2796,11 @@ class Table(object):
         >>> table.metadata('S1', 'sample') is None
         True
         """
-        if axis == 'sample':
-            md = self._sample_metadata
-        elif axis == 'observation':
-            md = self._observation_metadata
-        else:
-            raise UnknownAxisError(axis)
+        md = self._get_metadata(axis=axis)
+        if md is not None and axis in self._shared:
+            # the caller may modify what is returned in place
+            self._copy_on_write(axis)
+            md = self._get_metadata(axis=axis)
 
         if id is None:
             return md
@@ -1386,6 +2809,35 @@ class Table(object):
 
         return md[idx] if md is not None else None
 
+    def _get_metadata(self, axis='sample'):
+        """Returns the metadata of an axis, which may be shared with another
+        table
+
+        Unlike ``metadata``, no copy is taken of metadata shared by
+        ``_lazy_copy``, so what is returned must not be modified or handed
+        out.
+
+        Parameters
+        ----------
+        axis : {'sample', 'observation'}, optional
+            Axis to get the metadata of. Defaults to 'sample'
+
+        Returns
+        -------
+        tuple of defaultdict, ColumnarMetadata or None
+
+        Raises
+        ------
+        UnknownAxisError
+            If provided an unrecognized axis.
+        """
+        if axis == 'sample':
+            return self._sample_metadata
+        elif axis == 'observation':
+            return self._observation_metadata
+        else:
+            raise UnknownAxisError(axis)
+
     def index(self, id, axis):
         """Return the index of the identified sample/observation.
 
@@ -1537,7 +2989,7 @@ class Table(object):
 
     def delimited_self(self, delim=u'\t', header_key=None, header_value=None,
                        metadata_formatter=str,
-                       observation_column_name=u'#OTU ID'):
+                       observation_column_name=u'#OTU ID', direct_io=None):
         """Return self as a string in a delimited form
 
         Default str output for the Table is just row/col ids and table data
@@ -1560,6 +3012,10 @@ class Table(object):
             #OTU ID\tSample1\tSample2
             OTU1\t10\t2
             OTU2\t4\t8
+
+        ``direct_io``: a file-like object to write to. If it is not ``None``,
+        the rows are written as they are formatted, a chunk at a time, and
+        ``None`` is returned.
         """
         def to_utf8(i):
             if isinstance(i, bytes):
@@ -1582,28 +3038,42 @@ class Table(object):
                 raise TableException(
                     "You need to specify both header_key and header_value")
 
+        if direct_io is None:
+            output = []
+            write = output.append
+        else:
+            write = direct_io.write
+
         if header_value:
-            output = [u'# Constructed from biom file',
-                      u'%s%s%s\t%s' % (observation_column_name, delim,
-                                       samp_ids, header_value)]
+            write(u'# Constructed from biom file\n%s%s%s\t%s' %
+                  (observation_column_name, delim, samp_ids, header_value))
         else:
-            output = ['# Constructed from biom file',
-                      '%s%s%s' % (observation_column_name, delim, samp_ids)]
-        obs_metadata = self.metadata(axis='observation')
-        for obs_id, obs_values in zip(self.ids(axis='observation'),
-                                      self._iter_obs()):
-            str_obs_vals = delim.join(map(str, self._to_dense(obs_values)))
-            obs_id = to_utf8(obs_id)
-            if header_key and obs_metadata is not None:
-                md = obs_metadata[self._obs_index[obs_id]]
-                md_out = metadata_formatter(md.get(header_key, None))
-                output.append(
-                    u'%s%s%s\t%s' %
-                    (obs_id, delim, str_obs_vals, md_out))
-            else:
-                output.append(u'%s%s%s' % (obs_id, delim, str_obs_vals))
+            write(u'# Constructed from biom file\n%s%s%s' %
+                  (observation_column_name, delim, samp_ids))
 
-        return '\n'.join(output)
+        obs_ids = iter(self.ids(axis='observation'))
+        obs_metadata = self._get_metadata(axis='observation')
+        if header_key and obs_metadata is not None:
+            obs_metadata = iter(obs_metadata)
+        else:
+            obs_metadata = None
+
+        for rows in _delimited_rows(self._data, delim):
+            lines = []
+            for str_obs_vals, obs_id in zip(rows, obs_ids):
+                obs_id = to_utf8(obs_id)
+                if obs_metadata is not None:
+                    md = next(obs_metadata)
+                    md_out = metadata_formatter(md.get(header_key, None))
+                    lines.append(u'%s%s%s\t%s' %
+                                 (obs_id, delim, str_obs_vals, md_out))
+                else:
+                    lines.append(u'%s%s%s' % (obs_id, delim, str_obs_vals))
+            write(u'\n')
+            write(u'\n'.join(lines))
+
+        if direct_io is None:
+            return ''.join(output)
 
     def is_empty(self):
         """Check whether the table is empty
@@ -1653,7 +3123,7 @@ class Table(object):
 
     def descriptive_equality(self, other):
         """For use in testing, describe how the tables are not equal"""
-        if not isinstance(other, self.__class__):
+        if not isinstance(other, self._constructor):
             return "Tables are not of comparable classes"
         if not self.type == other.type:
             return "Tables are not the same type"
@@ -1662,10 +3132,10 @@ class Table(object):
             return "Observation IDs are not the same"
         if not np.array_equal(self.ids(), other.ids()):
             return "Sample IDs are not the same"
-        if not np.array_equal(self.metadata(axis='observation'),
-                              other.metadata(axis='observation')):
+        if not np.array_equal(self._get_metadata(axis='observation'),
+                              other._get_metadata(axis='observation')):
             return "Observation metadata are not the same"
-        if not np.array_equal(self.metadata(), other.metadata()):
+        if not np.array_equal(self._get_metadata(), other._get_metadata()):
             return "Sample metadata are not the same"
         if not self._data_equality(other._data):
             return "Data elements are not the same"
@@ -1674,7 +3144,7 @@ class Table(object):
 
     def __eq__(self, other):
         """Equality is determined by the data matrix, metadata, and IDs"""
-        if not isinstance(other, self.__class__):
+        if not isinstance(other, self._constructor):
             return False
         if self.type != other.type:
             return False
@@ -1683,10 +3153,10 @@ class Table(object):
             return False
         if not np.array_equal(self.ids(), other.ids()):
             return False
-        if not np.array_equal(self.metadata(axis='observation'),
-                              other.metadata(axis='observation')):
+        if not np.array_equal(self._get_metadata(axis='observation'),
+                              other._get_metadata(axis='observation')):
             return False
-        if not np.array_equal(self.metadata(), other.metadata()):
+        if not np.array_equal(self._get_metadata(), other._get_metadata()):
             return False
         if not self._data_equality(other._data):
             return False
@@ -1716,10 +3186,10 @@ class Table(object):
         if self._data.nnz != other.nnz:
             return False
 
-        self._data = self._data.tocsr()
+        data = self._as_format('csr', inplace=True)
         other = other.tocsr()
 
-        if (self._data != other).nnz > 0:
+        if (data != other).nnz > 0:
             return False
 
         return True
@@ -1774,13 +3244,88 @@ class Table(object):
 
     def copy(self):
         """Returns a copy of the table"""
-        return self.__class__(self._data.copy(),
-                              self.ids(axis='observation').copy(),
-                              self.ids().copy(),
-                              deepcopy(self.metadata(axis='observation')),
-                              deepcopy(self.metadata()),
-                              self.table_id,
-                              type=self.type)
+        return self._constructor(self._data.copy(),
+                                 self.ids(axis='observation').copy(),
+                                 self.ids().copy(),
+                                 deepcopy(self._get_metadata(
+                                     axis='observation')),
+                                 deepcopy(self._get_metadata()),
+                                 self.table_id,
+                                 type=self.type,
+                                 dtype=self.dtype)
+
+    def astype(self, dtype):
+        """Return a copy of the table storing its values as `dtype`
+
+        Parameters
+        ----------
+        dtype : {float64, float32, int64, uint32}
+            The dtype in which to store the values. Values are cast as by
+            ``numpy``, so fractional values are truncated by an integer dtype.
+
+        Returns
+        -------
+        biom.Table
+            A table which shares the IDs and metadata of this table
+
+        Raises
+        ------
+        TableException
+            If `dtype` is not supported
+
+        Examples
+        --------
+        >>> import numpy as np
+        >>> from biom.table import Table
+        >>> table = Table(np.array([[0, 2], [3, 4]]), ['O1', 'O2'],
+        ...               ['S1', 'S2'])
+        >>> counts = table.astype('uint32')
+        >>> print counts.dtype
+        uint32
+        >>> print counts.data('S2')
+        [2 4]
+        """
+        table = self._constructor.from_arrays(
+            self._data.astype(_storage_dtype(dtype)),
+            self._observation_ids, self._sample_ids,
+            self._observation_metadata, self._sample_metadata,
+            table_id=self.table_id, type=self.type,
+            create_date=self.create_date, generated_by=self.generated_by,
+            observation_group_metadata=self._observation_group_metadata,
+            sample_group_metadata=self._sample_group_metadata)
+        _share_metadata(self, table)
+        return table
+
+    def _lazy_copy(self):
+        """Returns a copy of the table which shares the matrix, IDs and
+        metadata of the table
+
+        This is the copy made by the operations which return a new table, so
+        that they only copy what they modify: ``_copy_on_write`` is called
+        before either table modifies the shared matrix or metadata in place,
+        and by ``metadata`` before either table hands out shared metadata.
+        Like ``copy``, the copy has no group metadata.
+        """
+        table = self._constructor.__new__(self._constructor)
+        table.type = self.type
+        table.table_id = self.table_id
+        table.create_date = None
+        table.generated_by = None
+        table.format_version = __format_version__
+
+        table._data = self._data
+        table._sample_ids = self._sample_ids
+        table._observation_ids = self._observation_ids
+        table._sample_metadata = self._sample_metadata
+        table._observation_metadata = self._observation_metadata
+        table._sample_group_metadata = None
+        table._observation_group_metadata = None
+        table._sample_index = self._sample_index
+        table._obs_index = self._obs_index
+
+        self._shared = table._shared = frozenset(['data', 'sample',
+                                                  'observation'])
+        return table
 
     def iter_data(self, dense=True, axis='sample'):
         """Yields axis values
@@ -1916,6 +3461,10 @@ class Table(object):
         ------
         UnknownAxisError
 
+        See Also
+        --------
+        Table.pairwise : compute the distances between all pairs at once
+
         Examples
         --------
         >>> from biom import example_table
@@ -1974,6 +3523,140 @@ class Table(object):
 
                 yield ((data_i, id_i, md_i), (data_j, id_j, md_j))
 
+    def pairwise(self, metric='braycurtis', axis='sample', block_size=256,
+                 n_threads=1, out=None):
+        """Compute the distances between each pair of samples or observations
+
+        The vectors are compared a block of `block_size` vectors at a time,
+        against all of the vectors before the end of the block. Bray-Curtis,
+        cosine, Euclidean and Jaccard distances are computed directly from
+        the sparse matrix; other metrics densify the vectors a block at a
+        time.
+
+        Parameters
+        ----------
+        metric : str or function, optional
+            Defaults to 'braycurtis'. One of 'braycurtis', 'cosine',
+            'euclidean' or 'jaccard', the name of another metric of
+            ``scipy.spatial.distance.cdist``, or a function which takes two
+            dense vectors and returns their distance. 'jaccard' compares
+            which values are nonzero, i.e. it is computed on presence/absence,
+            whereas the 'jaccard' of ``cdist`` compares the values themselves
+            and so differs for values other than 0 and 1.
+        axis : {'sample', 'observation'}, optional
+            The axis whose vectors are compared. Defaults to 'sample'.
+        block_size : int, optional
+            Defaults to 256. The number of vectors in a block. Bray-Curtis
+            and other metrics hold a block of dense vectors in memory, and
+            every metric holds the distances of a block to the vectors before
+            it.
+        n_threads : int, optional
+            Defaults to ``1``. The number of threads over which the blocks
+            are computed.
+        out : str, optional
+            The path of a file to write the distances to, which is memory
+            mapped. By default, the distances are returned in memory. If
+            there are fewer than two vectors, an empty file is written and an
+            empty array returned.
+
+        Returns
+        -------
+        np.ndarray or np.memmap
+            The condensed distance matrix, in the order of
+            ``scipy.spatial.distance.pdist``: the distances between the first
+            vector and each of the following vectors, then between the second
+            vector and each of the following vectors, and so on. The
+            distances between two vectors without nonzero values, and
+            distances which are otherwise undefined, are ``nan``.
+
+        Raises
+        ------
+        UnknownAxisError
+            If provided an unrecognized axis.
+        ValueError
+            If `metric` is not recognized, or `block_size` is not positive.
+
+        See Also
+        --------
+        scipy.spatial.distance.squareform
+
+        Examples
+        --------
+        >>> from scipy.spatial.distance import squareform
+        >>> from biom import example_table
+        >>> print squareform(example_table.pairwise('euclidean'))
+        [[ 0.          1.41421356  2.82842712]
+         [ 1.41421356  0.          1.41421356]
+         [ 2.82842712  1.41421356  0.        ]]
+        """
+        if axis == 'sample':
+            # the columns of a CSC matrix are the rows of its transpose
+            matrix = self._get_sparse_data(axis=axis).T
+        elif axis == 'observation':
+            matrix = self._get_sparse_data(axis=axis)
+        else:
+            raise UnknownAxisError(axis)
+
+        if block_size < 1:
+            raise ValueError("block_size must be positive")
+
+        if matrix.dtype != np.float64:
+            # e.g. u - v underflows for unsigned counts
+            matrix = matrix.astype(np.float64)
+
+        if callable(metric):
+            metric_f = _cdist_block(metric)
+        elif metric in _PAIRWISE_METRICS:
+            metric_f = _PAIRWISE_METRICS[metric]
+        else:
+            # let cdist reject the metric now, rather than in the first block
+            cdist(np.zeros((1, 1)), np.zeros((1, 1)), metric)
+            metric_f = _cdist_block(metric)
+
+        n = matrix.shape[0]
+        size = n * (n - 1) // 2
+        if out is None:
+            dist = np.empty(size)
+        elif size == 0:
+            # an empty file cannot be memory mapped
+            open(out, 'wb').close()
+            return np.empty(0)
+        else:
+            dist = np.memmap(out, dtype=float, mode='w+', shape=(size,))
+
+        # the distances of vector i to vectors j > i are stored from
+        # offsets[i] + j
+        rows = np.arange(n)
+        offsets = n * rows - rows * (rows + 1) // 2 - rows - 1
+
+        def block(start):
+            stop = min(start + block_size, n)
+            return start, stop, metric_f(matrix[:stop], matrix[start:stop])
+
+        starts = range(0, n, block_size)
+        pool = ThreadPool(n_threads) if n_threads > 1 else None
+        try:
+            if pool is None:
+                blocks = (block(start) for start in starts)
+            else:
+                blocks = pool.imap_unordered(block, starts)
+            for start, stop, values in blocks:
+                cols = np.arange(start, stop)
+                # the vectors before the block are compared with all of it
+                dist[(offsets[:start, newaxis] + cols).ravel()] = \
+                    values[:start].ravel()
+                # and the vectors in the block with those after them
+                i, j = np.triu_indices(stop - start, 1)
+                dist[offsets[start + i] + start + j] = values[start + i, j]
+        finally:
+            if pool is not None:
+                pool.close()
+                pool.join()
+
+        if out is not None:
+            dist.flush()
+        return dist
+
     def sort_order(self, order, axis='sample'):
         """Return a new table with `axis` in `order`
 
@@ -1990,6 +3673,13 @@ class Table(object):
             A table where the observations or samples are sorted according to
             `order`
 
+        Raises
+        ------
+        UnknownIDError
+            If an ID of `order` is not in the table
+        TableException
+            If an ID is in `order` more than once
+
         Examples
         --------
 
@@ -2026,27 +3716,45 @@ class Table(object):
         O2	1.0	0.0	4.0
 
         """
-        fancy = np.array([self.index(i, axis=axis) for i in order], dtype=int)
-        metadata = self.metadata(axis=axis)
-        if metadata is not None:
-            metadata = np.array(metadata)[fancy]
-
         if axis == 'sample':
-            mat = self.matrix_data[:, fancy]
-            return self.__class__(mat,
-                                  self.ids(axis='observation')[:], order[:],
-                                  self.metadata(axis='observation'), metadata,
-                                  self.table_id, self.type)
-
+            fmt = 'csc'
         elif axis == 'observation':
-            mat = self.matrix_data[fancy, :]
-            return self.__class__(mat,
-                                  order[:], self.ids()[:],
-                                  metadata, self.metadata(), self.table_id,
-                                  self.type)
+            fmt = 'csr'
         else:
             raise UnknownAxisError(axis)
 
+        index = self._index(axis=axis)
+        fancy = np.empty(len(order), dtype=int)
+        for position, id_ in enumerate(order):
+            if id_ not in index:
+                raise UnknownIDError(id_, axis)
+            fancy[position] = index[id_]
+
+        if len(np.unique(fancy)) != len(fancy):
+            raise TableException(SAMPDUP if axis == 'sample' else OBSDUP)
+
+        ids = self.ids(axis=axis)[fancy]
+        metadata = self._get_metadata(axis=axis)
+        if isinstance(metadata, ColumnarMetadata):
+            metadata = metadata[fancy]
+        elif metadata is not None:
+            # the rows are shared with self until either table modifies them
+            metadata = tuple(metadata[i] for i in fancy)
+
+        table = self._lazy_copy()
+        table._data = _permute_compressed(self._as_format(fmt), fancy)
+        table._shared = table._shared.difference(['data'])
+        if axis == 'sample':
+            table._sample_ids = ids
+            table._sample_metadata = metadata
+            table._sample_index = index_list(ids)
+        else:
+            table._observation_ids = ids
+            table._observation_metadata = metadata
+            table._obs_index = index_list(ids)
+
+        return table
+
     def sort(self, sort_f=natsort, axis='sample'):
         """Return a table sorted along axis
 
@@ -2111,7 +3819,8 @@ class Table(object):
         """
         return self.sort_order(sort_f(self.ids(axis=axis)), axis=axis)
 
-    def filter(self, ids_to_keep, axis='sample', invert=False, inplace=True):
+    def filter(self, ids_to_keep=None, axis='sample', invert=False,
+               inplace=True, vectorized=False, min_total=None, min_nnz=None):
         """Filter a table based on a function or iterable.
 
         Parameters
@@ -2121,16 +3830,29 @@ class Table(object):
             sample/observation, its id (a string) and the dictionary
             of metadata of each sample/observation, and must return a
             boolean. If it's an iterable, it must be a list of ids to
-            keep.
+            keep. If ``None``, only `min_total` and `min_nnz` are applied.
         axis : {'sample', 'observation'}, optional
             It controls whether to filter samples or observations and
             defaults to "sample".
         invert : bool, optional
             Defaults to ``False``. If set to ``True``, discard samples or
-            observations where `ids_to_keep` returns True
+            observations which would otherwise be kept
         inplace : bool, optional
             Defaults to ``True``. Whether to return a new table or modify
             itself.
+        vectorized : bool, optional
+            Defaults to ``False``. If ``True``, `ids_to_keep` must be a
+            function(data, ids, metadata) -> mask, which is called once with
+            the sparse data of the table (a ``csr_matrix`` whose rows are the
+            observations, or a ``csc_matrix`` whose columns are the samples),
+            the ids and the metadata of `axis`, and must return a boolean for
+            each sample/observation.
+        min_total : number, optional
+            Only keep the samples/observations whose values sum to at least
+            `min_total`.
+        min_nnz : int, optional
+            Only keep the samples/observations with at least `min_nnz`
+            nonzero values.
 
         Returns
         -------
@@ -2197,24 +3919,71 @@ class Table(object):
         >>> print table.ids(axis='observation')
         ['O1']
 
+        Vectorized functions and the built-in `min_total` and `min_nnz`
+        filters work on the sparse data directly, without building a dense
+        vector for each sample/observation, so they are much faster on
+        large tables. Keep the samples with a total of at least 3:
+
+        >>> table = Table(data, ['O1', 'O2'], ['S1', 'S2', 'S3'])
+        >>> new_table = table.filter(min_total=3, inplace=False)
+        >>> print new_table.ids()
+        ['S2' 'S3']
+
+        Keep the observations present in every sample:
+
+        >>> filter_fn = lambda data, ids, md: data.getnnz(axis=1) == 3
+        >>> new_table = table.filter(filter_fn, axis='observation',
+        ...                          vectorized=True, inplace=False)
+        >>> print new_table.ids(axis='observation')
+        ['O2']
+
+        Notes
+        -----
+        The values given to a non-vectorized function must not be modified,
+        as the same array is reused for each sample/observation.
+
         """
-        table = self if inplace else self.copy()
+        table = self if inplace else self._lazy_copy()
 
-        metadata = table.metadata(axis=axis)
+        # the metadata handed to a function may be modified by it
+        if callable(ids_to_keep):
+            metadata = table.metadata(axis=axis)
+        else:
+            metadata = table._get_metadata(axis=axis)
         ids = table.ids(axis=axis)
         index = self._index(axis=axis)
         axis = table._axis_to_num(axis=axis)
 
-        arr = table._data
+        # filtering in place is only safe for a matrix no other table has
+        arr = table._as_format('csr' if axis == 0 else 'csc')
+        shared = arr is table._data and 'data' in table._shared
+        columnar_md = None
+        if isinstance(metadata, ColumnarMetadata):
+            # the metadata are subset from the columns below, so only need to
+            # be seen by _filter if they are passed to a filter function
+            columnar_md = metadata
+            if not (vectorized or isinstance(ids_to_keep, FunctionType)):
+                metadata = None
+
         arr, ids, metadata = _filter(arr,
                                      ids,
                                      metadata,
                                      index,
                                      ids_to_keep,
                                      axis,
-                                     invert=invert)
+                                     invert=invert,
+                                     vectorized=vectorized,
+                                     min_total=min_total,
+                                     min_nnz=min_nnz,
+                                     shared=shared)
+
+        if columnar_md is not None:
+            metadata = columnar_md[np.array([index[i] for i in ids],
+                                            dtype=int)]
 
         table._data = arr
+        table._shared = table._shared.difference(['data'])
+        table._layout_cache = None
         if axis == 1:
             table._sample_ids = ids
             table._sample_metadata = metadata
@@ -2277,42 +4046,55 @@ class Table(object):
         O1  1.0
         O2  42.0
         """
-        partitions = {}
-        # conversion of vector types is not necessary, vectors are not
-        # being passed to an arbitrary function
-        for vals, id_, md in self.iter(dense=False, axis=axis):
+        if axis == 'sample':
+            fmt = 'csc'
+        elif axis == 'observation':
+            fmt = 'csr'
+        else:
+            raise UnknownAxisError(axis)
+
+        ids = self.ids(axis=axis)
+        metadata = self.metadata(axis=axis)
+        if metadata is None:
+            metadata = (None,) * len(ids)
+
+        # the vectors are only needed to build the partitions, so only the
+        # positions of the members of each partition are collected
+        partitions = OrderedDict()
+        for position, (id_, md) in enumerate(zip(ids, metadata)):
             part = f(id_, md)
 
             # try to make it hashable...
             if not isinstance(part, Hashable):
                 part = tuple(part)
 
-            if part not in partitions:
-                partitions[part] = [[], [], []]
+            partitions.setdefault(part, []).append(position)
 
-            partitions[part][0].append(id_)
-            partitions[part][1].append(vals)
-            partitions[part][2].append(md)
+        matrix = self._as_format(fmt)
+        md = self._get_metadata(axis=axis)
+        inv_md = self._get_metadata(axis=self._invert_axis(axis))
+        inv_ids = self.ids(axis=self._invert_axis(axis))
 
-        md = self.metadata(axis=self._invert_axis(axis))
+        for part, positions in viewitems(partitions):
+            positions = np.asarray(positions)
+            data = _permute_compressed(matrix, positions)
+            if md is None:
+                part_md = None
+            elif isinstance(md, ColumnarMetadata):
+                part_md = md[positions]
+            else:
+                part_md = tuple(md[i] for i in positions)
 
-        for part, (ids, values, metadata) in viewitems(partitions):
             if axis == 'sample':
-                data = self._conv_to_self_type(values, transpose=True)
-                samp_ids = ids
-                samp_md = metadata
-                obs_ids = self.ids(axis='observation')[:]
-                obs_md = md[:] if md is not None else None
-
-            elif axis == 'observation':
-                data = self._conv_to_self_type(values, transpose=False)
-                obs_ids = ids
-                obs_md = metadata
-                samp_ids = self.ids()[:]
-                samp_md = md[:] if md is not None else None
-
-            yield part, Table(data, obs_ids, samp_ids, obs_md, samp_md,
-                              self.table_id, type=self.type)
+                table = Table.from_arrays(data, inv_ids, ids[positions],
+                                          inv_md, part_md, self.table_id,
+                                          type=self.type)
+            else:
+                table = Table.from_arrays(data, ids[positions], inv_ids,
+                                          part_md, inv_md, self.table_id,
+                                          type=self.type)
+            _share_metadata(self, table)
+            yield part, table
 
     def collapse(self, f, collapse_f=None, norm=True, min_group_size=1,
                  include_collapsed_metadata=True, one_to_many=False,
@@ -2372,8 +4154,11 @@ class Table(object):
 
         `one_to_many` and `min_group_size` are not supported together.
 
-        A final note on space consumption. At present, the `one_to_many`
-        functionality requires a temporary dense matrix representation.
+        Unless `collapse_f` is given, the collapse is computed as the product
+        of the data with a sparse matrix indicating the partition(s) of each
+        vector, weighted for `norm` or ``divide``, so no dense representation
+        of the table or of the partitions is ever built. A custom
+        `collapse_f` is given each partition as a ``Table``.
 
         Parameters
         ----------
@@ -2461,44 +4246,30 @@ class Table(object):
             raise ValueError("Unrecognized one-to-many mode '%s'. Must be "
                              "either 'add' or 'divide'." % one_to_many_mode)
 
-        # transpose is only necessary in the one-to-one case
-        # new_data_shape is only necessary in the one-to-many case
-        # axis_slice is only necessary in the one-to-many case
-        def axis_ids_md(t):
-            return (t.ids(axis=axis), t.metadata(axis=axis))
-
-        if axis == 'sample':
-            transpose = True
-
-            def new_data_shape(ids, collapsed):
-                return (len(ids), len(collapsed))
-
-            def axis_slice(lookup, key):
-                return (slice(None), lookup[key])
-
-        elif axis == 'observation':
-            transpose = False
-
-            def new_data_shape(ids, collapsed):
-                return (len(collapsed), len(ids))
+        if axis not in ('sample', 'observation'):
+            raise UnknownAxisError(axis)
 
-            def axis_slice(lookup, key):
-                return (lookup[key], slice(None))
+        # transpose is only necessary when collapsing with collapse_f
+        transpose = axis == 'sample'
 
-        else:
-            raise UnknownAxisError(axis)
+        axis_ids = self.ids(axis=axis)
+        axis_md = self.metadata(axis=axis)
+        if axis_md is None:
+            axis_md = (None,) * len(axis_ids)
 
         if one_to_many:
             if norm:
                 raise AttributeError(
                     "norm and one_to_many are not supported together")
 
-            # determine the collapsed pathway
-            # we drop all other associated metadata
+            # determine the collapsed pathway and the partitions of each
+            # vector. we drop all other associated metadata
             new_md = {}
-            md_count = {}
+            vector_idx = []
+            partitions = []
+            weights = []
 
-            for id_, md in zip(*axis_ids_md(self)):
+            for idx, (id_, md) in enumerate(zip(axis_ids, axis_md)):
                 md_iter = f(id_, md)
                 num_md = 0
                 while True:
@@ -2518,9 +4289,14 @@ class Table(object):
                         break
 
                     new_md[partition] = pathway
+                    vector_idx.append(idx)
+                    partitions.append(partition)
                     num_md += 1
 
-                md_count[id_] = num_md
+                if one_to_many_mode == 'add':
+                    weights.extend([1] * num_md)
+                elif num_md:
+                    weights.extend([1. / num_md] * num_md)
 
             idx_lookup = {part: i for i, part in enumerate(sorted(new_md))}
 
@@ -2528,36 +4304,12 @@ class Table(object):
             # evenly.
             dtype = float if one_to_many_mode == 'divide' else self.dtype
 
-            new_data = zeros(new_data_shape(self.ids(self._invert_axis(axis)),
-                                            new_md),
-                             dtype=dtype)
-
-            # for each vector
-            # for each bin in the metadata
-            # for each partition associated with the vector
-            for vals, id_, md in self.iter(axis=axis):
-                md_iter = f(id_, md)
-
-                while True:
-                    try:
-                        pathway, part = next(md_iter)
-                    except IndexError:
-                        # if a pathway is incomplete
-                        if strict:
-                            # bail if strict, should never get here...
-                            err = "Incomplete pathway, ID: %s, metadata: %s" %\
-                                  (id_, md)
-                            raise IndexError(err)
-                        else:
-                            # otherwise ignore
-                            continue
-                    except StopIteration:
-                        break
-                    if one_to_many_mode == 'add':
-                        new_data[axis_slice(idx_lookup, part)] += vals
-                    else:
-                        new_data[axis_slice(idx_lookup, part)] += \
-                            vals / md_count[id_]
+            # a vector which maps to the same partition multiple times is
+            # counted multiple times, as the duplicate entries are summed
+            indicator = coo_matrix(
+                (np.asarray(weights, dtype=dtype),
+                 ([idx_lookup[part] for part in partitions], vector_idx)),
+                shape=(len(idx_lookup), len(axis_ids)), dtype=dtype)
 
             if include_collapsed_metadata:
                 # reassociate pathway information
@@ -2568,40 +4320,72 @@ class Table(object):
             collapsed_ids = [k for k, i in sorted(viewitems(idx_lookup),
                                                   key=itemgetter(1))]
 
-            # convert back to self type
-            data = self._conv_to_self_type(new_data)
-        else:
-            if collapse_f is None:
-                def collapse_f(t, axis):
-                    return t.reduce(add, axis)
+            data = self._collapse_data(indicator, axis)
+        elif collapse_f is None:
+            # determine the partition of each vector, keeping the partitions
+            # in the order they are first seen
+            partitions = OrderedDict()
+            groups = np.empty(len(axis_ids), dtype=int)
+            for idx, (id_, md) in enumerate(zip(axis_ids, axis_md)):
+                part = f(id_, md)
+
+                # try to make it hashable...
+                if not isinstance(part, Hashable):
+                    part = tuple(part)
+
+                groups[idx] = partitions.setdefault(part, len(partitions))
+
+            sizes = np.bincount(groups, minlength=len(partitions))
+            keep = sizes >= min_group_size
+            new_groups = np.cumsum(keep) - 1
+            new_groups[~keep] = -1
+            members = np.flatnonzero(keep[groups])
+
+            if norm:
+                weights = 1. / sizes[groups[members]]
+            else:
+                weights = np.ones(len(members), dtype=self.dtype)
 
+            indicator = coo_matrix(
+                (weights, (new_groups[groups[members]], members)),
+                shape=(keep.sum(), len(axis_ids)))
+
+            collapsed_ids = [part for part, kept in zip(partitions, keep)
+                             if kept]
+
+            if include_collapsed_metadata:
+                # retain metadata but store by original id
+                order = np.argsort(groups, kind='mergesort')
+                bounds = np.cumsum(sizes)[:-1]
+                for ids, kept in zip(np.split(axis_ids[order], bounds), keep):
+                    if kept:
+                        collapsed_md.append({'collapsed_ids': ids.tolist()})
+
+            data = self._collapse_data(indicator, axis)
+        else:
             for part, table in self.partition(f, axis=axis):
-                axis_ids, axis_md = axis_ids_md(table)
+                part_ids = table.ids(axis=axis)
 
-                if len(axis_ids) < min_group_size:
+                if len(part_ids) < min_group_size:
                     continue
 
                 redux_data = collapse_f(table, self._invert_axis(axis))
                 if norm:
-                    redux_data /= len(axis_ids)
+                    redux_data /= len(part_ids)
 
                 collapsed_data.append(self._conv_to_self_type(redux_data))
                 collapsed_ids.append(part)
 
                 if include_collapsed_metadata:
                     # retain metadata but store by original id
-                    collapsed_md.append({'collapsed_ids': axis_ids.tolist()})
-                    # tmp_md = {}
-                    # for id_, md in izip(axis_ids, axis_md):
-                    #     tmp_md[id_] = md
-                    # collapsed_md.append(tmp_md)
+                    collapsed_md.append({'collapsed_ids': part_ids.tolist()})
 
             data = self._conv_to_self_type(collapsed_data, transpose=transpose)
 
         # if the table is empty
         errcheck(self, 'empty')
 
-        md = self.metadata(axis=self._invert_axis(axis))
+        md = self._get_metadata(axis=self._invert_axis(axis))
         if axis == 'sample':
             sample_ids = collapsed_ids
             sample_md = collapsed_md
@@ -2613,8 +4397,35 @@ class Table(object):
             obs_md = collapsed_md
             sample_md = md if md is not None else None
 
-        return Table(data, obs_ids, sample_ids, obs_md, sample_md,
-                     self.table_id, type=self.type)
+        table = Table.from_arrays(data, obs_ids, sample_ids, obs_md,
+                                  sample_md, self.table_id, type=self.type,
+                                  validate=True)
+        _share_metadata(self, table)
+        return table
+
+    def _collapse_data(self, indicator, axis):
+        """Collapse the vectors of an axis with an indicator matrix
+
+        `indicator` is a sparse matrix of shape (partitions, vectors) which
+        holds the weight of each vector in each partition. The collapsed data
+        are its product with the data, so no dense intermediate is needed.
+
+        Integer values are summed in int64, and the sums are only kept in the
+        dtype of the table if they all fit in it.
+        """
+        indicator = indicator.tocsr()
+        data = self._data
+        if data.dtype != _sum_dtype(data.dtype):
+            data = data.astype(_sum_dtype(data.dtype))
+
+        if axis == 'sample':
+            data = data.dot(indicator.T)
+        else:
+            data = indicator.dot(data)
+
+        data = data.tocsr()
+        data.eliminate_zeros()
+        return _narrow_sums(data, self.dtype)
 
     def _invert_axis(self, axis):
         """Invert an axis"""
@@ -2645,6 +4456,9 @@ class Table(object):
         Returns
         -------
         scalar of self.dtype or np.array of self.dtype
+            The minimum of the stored values. A vector without stored values,
+            or a table without stored values if `axis` is "whole", has a
+            minimum of 0.
 
         Raises
         ------
@@ -2661,18 +4475,7 @@ class Table(object):
         if axis not in ['sample', 'observation', 'whole']:
             raise UnknownAxisError(axis)
 
-        if axis == 'whole':
-            min_val = np.inf
-            for data in self.iter_data(dense=False):
-                # only min over the actual nonzero values
-                min_val = min(min_val, data.data.min())
-        else:
-            min_val = zeros(len(self.ids(axis=axis)), dtype=self.dtype)
-
-            for idx, data in enumerate(self.iter_data(dense=False, axis=axis)):
-                min_val[idx] = data.data.min()
-
-        return min_val
+        return self._reduce_stored(np.minimum, axis)
 
     def max(self, axis='sample'):
         """Get the maximum nonzero value over an axis
@@ -2685,6 +4488,9 @@ class Table(object):
         Returns
         -------
         scalar of self.dtype or np.array of self.dtype
+            The maximum of the stored values. A vector without stored values,
+            or a table without stored values if `axis` is "whole", has a
+            maximum of 0.
 
         Raises
         ------
@@ -2701,20 +4507,30 @@ class Table(object):
         if axis not in ['sample', 'observation', 'whole']:
             raise UnknownAxisError(axis)
 
+        return self._reduce_stored(np.maximum, axis)
+
+    def _reduce_stored(self, ufunc, axis):
+        """Reduce the stored values of each vector, or of the whole table
+
+        Vectors without stored values, and a whole table without stored
+        values, reduce to 0.
+        """
         if axis == 'whole':
-            max_val = -np.inf
-            for data in self.iter_data(dense=False):
-                # only min over the actual nonzero values
-                max_val = max(max_val, data.data.max())
-        else:
-            max_val = np.empty(len(self.ids(axis=axis)), dtype=self.dtype)
+            # only reduce over the actual nonzero values
+            matrix = self._as_format('csr')
+            if not matrix.has_canonical_format:
+                matrix = matrix.copy()
+                matrix.sum_duplicates()
 
-            for idx, data in enumerate(self.iter_data(dense=False, axis=axis)):
-                max_val[idx] = data.data.max()
+            if not matrix.nnz:
+                return self.dtype.type(0)
+            return ufunc.reduce(matrix.data)
 
-        return max_val
+        return _reduce_compressed(ufunc, self._get_sparse_data(axis=axis),
+                                  implicit_zeros=False)
 
-    def subsample(self, n, axis='sample', by_id=False, with_replacement=False):
+    def subsample(self, n, axis='sample', by_id=False, with_replacement=False,
+                  seed=None, n_threads=1):
         """Randomly subsample without replacement.
 
         Parameters
@@ -2732,6 +4548,14 @@ class Table(object):
             If `False` (default), subsample without replacement. If `True`,
             resample with replacement via the multinomial distribution.
             Should not be `True` if `by_id` is `True`.
+        seed : int or np.random.RandomState, optional
+            The seed of, or the random state from which to seed, the
+            subsampling. Defaults to numpy's global random state. Each vector
+            is subsampled from its own random stream derived from this seed,
+            so the result for a given seed does not depend on `n_threads`.
+        n_threads : int, optional
+            Defaults to ``1``. The number of threads over which the vectors
+            are subsampled when `by_id` is ``False``.
 
         Returns
         -------
@@ -2749,8 +4573,9 @@ class Table(object):
         Subsampling is performed without replacement. If `n` is greater than
         the sum of a given vector, that vector is omitted from the result.
 
-        Adapted from `skbio.math.subsample`, see biom-format/licenses for more
-        information about scikit-bio.
+        Without replacement, the counts of each vector are drawn from a
+        multivariate hypergeometric distribution, so memory use does not grow
+        with the sum of the vector.
 
         This code assumes absolute abundance if `by_id` is False.
 
@@ -2790,24 +4615,157 @@ class Table(object):
         if with_replacement and by_id:
             raise ValueError("by_id and with_replacement cannot both be True")
 
-        table = self.copy()
+        rng = _random_state(seed)
+        table = self._lazy_copy()
+
+        if by_id:
+            ids = table.ids(axis=axis).copy()
+            rng.shuffle(ids)
+            table.filter(ids[:n], axis=axis)
+        else:
+            data = table._get_writable_sparse_data(axis=axis)
+            _subsample(data, n, with_replacement, _subsample_seed(rng),
+                       n_threads)
+            data.eliminate_zeros()
+            table._data = data
+
+            table.filter(table.ids(axis=axis)[table.sum(axis=axis) > 0],
+                         axis=axis)
+
+        inv_axis = self._invert_axis(axis)
+        table.filter(table.ids(axis=inv_axis)[table.sum(axis=inv_axis) > 0],
+                     axis=inv_axis)
+
+        return table
+
+    def rarefy_many(self, depths, iterations=1, axis='sample',
+                    with_replacement=False, seed=None, n_threads=1):
+        """Subsample the table at many depths, many times over
+
+        This is a batched ``Table.subsample`` (by value) for, e.g.,
+        rarefaction curves. The data are put in the compressed layout of
+        `axis` once, and each subsample only copies the values before drawing
+        from them. The table and its metadata are never copied: the metadata
+        of the yielded tables are references to the metadata of this table.
+
+        Parameters
+        ----------
+        depths : int or iterable of int
+            The number of items to subsample from each vector
+        iterations : int, optional
+            Defaults to ``1``. The number of subsamples at each depth
+        axis : {'sample', 'observation'}, optional
+            The axis to sample over
+        with_replacement : bool, optional
+            If `False` (default), subsample without replacement. If `True`,
+            resample with replacement via the multinomial distribution.
+        seed : int or np.random.RandomState, optional
+            The seed of, or the random state from which to seed, the
+            subsamples. Defaults to numpy's global random state.
+        n_threads : int, optional
+            Defaults to ``1``. The number of threads over which the vectors
+            are subsampled.
+
+        Returns
+        -------
+        GeneratorType
+            A generator that yields ``(depth, iteration, Table)`` for each
+            depth in turn, and each iteration at that depth
+
+        Raises
+        ------
+        ValueError
+            If a depth is less than zero.
+
+        See Also
+        --------
+        subsample
+
+        Notes
+        -----
+        Vectors whose sum is less than the depth are omitted from the
+        subsample at that depth, as are the vectors of the other axis which
+        are emptied. With the same `seed`, each yielded table is equal to the
+        table which ``Table.subsample`` would return at that point.
+
+        As the metadata are shared, modifying the metadata of a yielded table
+        modifies the metadata of this table. ``Table.copy`` a yielded table
+        before modifying its metadata.
+
+        Examples
+        --------
+        >>> import numpy as np
+        >>> from biom.table import Table
+        >>> table = Table(np.array([[0, 2, 3], [1, 0, 2]]), ['O1', 'O2'],
+        ...               ['S1', 'S2', 'S3'])
+
+        Subsample the table twice at depths of 1 and 2:
+
+        >>> for depth, i, t in table.rarefy_many([1, 2], 2, seed=42):
+        ...     print depth, i, t.ids(), t.sum(axis='sample')
+        1 0 ['S1' 'S2' 'S3'] [ 1.  1.  1.]
+        1 1 ['S1' 'S2' 'S3'] [ 1.  1.  1.]
+        2 0 ['S2' 'S3'] [ 2.  2.]
+        2 1 ['S2' 'S3'] [ 2.  2.]
 
-        if by_id:
-            ids = table.ids(axis=axis).copy()
-            np.random.shuffle(ids)
-            subset = set(ids[:n])
-            table.filter(lambda v, i, md: i in subset, axis=axis)
+        """
+        if isinstance(depths, Iterable):
+            depths = list(depths)
         else:
-            data = table._get_sparse_data()
-            _subsample(data, n, with_replacement)
-            table._data = data
+            depths = [depths]
 
-            table.filter(lambda v, i, md: v.sum() > 0, axis=axis)
+        if any(depth < 0 for depth in depths):
+            raise ValueError("n cannot be negative.")
 
+        rng = _random_state(seed)
         inv_axis = self._invert_axis(axis)
-        table.filter(lambda v, i, md: v.sum() > 0, axis=inv_axis)
-
-        return table
+        matrix = self._get_sparse_data(axis=axis)
+        axis_ids = self.ids(axis=axis)
+        inv_ids = self.ids(axis=inv_axis)
+        axis_md = self._get_metadata(axis=axis)
+        inv_md = self._get_metadata(axis=inv_axis)
+
+        def subset_md(md, idx):
+            if md is None:
+                return None
+            elif isinstance(md, ColumnarMetadata):
+                return md[idx]
+            return tuple(md[i] for i in idx)
+
+        for depth in depths:
+            for iteration in range(iterations):
+                data = matrix.copy()
+                _subsample(data, depth, with_replacement,
+                           _subsample_seed(rng), n_threads)
+                data.eliminate_zeros()
+
+                keep = np.flatnonzero(np.diff(data.indptr))
+                inv_keep = np.flatnonzero(
+                    np.bincount(data.indices, minlength=len(inv_ids)))
+
+                # the vectors of a compressed matrix are its major axis
+                if axis == 'sample':
+                    data = data[:, keep][inv_keep, :]
+                    obs_ids, samp_ids = inv_ids[inv_keep], axis_ids[keep]
+                    obs_md = subset_md(inv_md, inv_keep)
+                    samp_md = subset_md(axis_md, keep)
+                else:
+                    data = data[keep, :][:, inv_keep]
+                    obs_ids, samp_ids = axis_ids[keep], inv_ids[inv_keep]
+                    obs_md = subset_md(axis_md, keep)
+                    samp_md = subset_md(inv_md, inv_keep)
+
+                table = self._constructor.from_arrays(
+                    data, obs_ids, samp_ids, obs_md, samp_md,
+                    table_id=self.table_id, type=self.type,
+                    create_date=self.create_date,
+                    generated_by=self.generated_by,
+                    observation_group_metadata=self.group_metadata(
+                        axis='observation'),
+                    sample_group_metadata=self.group_metadata())
+                _share_metadata(self, table)
+
+                yield depth, iteration, table
 
     def pa(self, inplace=True):
         """Convert the table to presence/absence data
@@ -2846,7 +4804,7 @@ class Table(object):
 
         return self.transform(transform_f, inplace=inplace)
 
-    def transform(self, f, axis='sample', inplace=True):
+    def transform(self, f, axis='sample', inplace=True, dtype=None):
         """Iterate over `axis`, applying a function `f` to each vector.
 
         Only non null values can be modified and the density of the
@@ -2865,6 +4823,10 @@ class Table(object):
         inplace : bool, optional
             Defaults to ``True``. Whether to return a new table or modify
             itself.
+        dtype : {float64, float32, int64, uint32}, optional
+            The dtype in which the values are stored before `f` is applied,
+            and so the dtype of the values it returns. Defaults to the dtype
+            of the table.
 
         Returns
         -------
@@ -2934,11 +4896,17 @@ class Table(object):
         O2  0.5 1.5 21.0
 
         """
-        table = self if inplace else self.copy()
+        table = self if inplace else self._lazy_copy()
 
         metadata = table.metadata(axis=axis)
         ids = table.ids(axis=axis)
-        arr = table._get_sparse_data(axis=axis)
+        if dtype is None or _storage_dtype(dtype) == table.dtype:
+            arr = table._get_writable_sparse_data(axis=axis)
+        else:
+            # casting copies the matrix, so it is no longer shared
+            arr = table._get_sparse_data(axis=axis).astype(dtype)
+            table._shared = table._shared.difference(['data'])
+            table._layout_cache = None
 
         axis = table._axis_to_num(axis)
 
@@ -3000,7 +4968,8 @@ class Table(object):
         """
         def f(val, id_, _):
             return scipy.stats.rankdata(val, method=method)
-        return self.transform(f, axis=axis, inplace=inplace)
+        return self.transform(f, axis=axis, inplace=inplace,
+                              dtype=_float_dtype(self.dtype))
 
     def norm(self, axis='sample', inplace=True):
         """Normalize in place sample values by an observation, or vice versa.
@@ -3017,7 +4986,8 @@ class Table(object):
         Returns
         -------
         biom.Table
-            The normalized table
+            The normalized table. Values stored as integers are upcast to
+            float64.
 
         Examples
         --------
@@ -3072,7 +5042,8 @@ class Table(object):
         def f(val, id_, _):
             return val / float(val.sum())
 
-        return self.transform(f, axis=axis, inplace=inplace)
+        return self.transform(f, axis=axis, inplace=inplace,
+                              dtype=_float_dtype(self.dtype))
 
     def nonzero(self):
         """Yields locations of nonzero elements within the data matrix
@@ -3082,7 +5053,7 @@ class Table(object):
         generator
             Yields ``(observation_id, sample_id)`` for each nonzero element
         """
-        csr = self._data.tocsr()
+        csr = self._as_format('csr')
         samp_ids = self.ids()
         obs_ids = self.ids(axis='observation')
 
@@ -3112,48 +5083,41 @@ class Table(object):
         numpy.array
             Counts in index order to the axis
         """
-        if binary:
-            dtype = 'int'
+        dtype = 'int' if binary else self.dtype
 
-            def op(x):
-                return x.nonzero()[0].size
+        coo = self._data.tocoo()
+        if axis in ('sample', 'observation'):
+            bins = coo.col if axis == 'sample' else coo.row
+            n = len(self.ids(axis=axis))
         else:
-            dtype = self.dtype
-
-            def op(x):
-                return x.sum()
+            bins = zeros(coo.nnz, dtype=int)
+            n = 1
 
-        if axis in ('sample', 'observation'):
-            # can use np.bincount for CSMat or ScipySparse
-            result = zeros(len(self.ids(axis=axis)), dtype=dtype)
-            for idx, vals in enumerate(self.iter_data(axis=axis)):
-                result[idx] = op(vals)
+        if binary:
+            result = np.bincount(bins[coo.data != 0], minlength=n)
         else:
-            result = zeros(1, dtype=dtype)
-            for vals in self.iter_data():
-                result[0] += op(vals)
+            result = np.bincount(bins, weights=coo.data, minlength=n)
 
-        return result
+        return result.astype(dtype)
 
-    def _union_id_order(self, a, b):
-        """Determines merge order for id lists A and B"""
-        all_ids = list(a[:])
-        all_ids.extend(b[:])
+    def _union_id_order(self, *id_lists):
+        """Determines merge order for id lists A, B, ..."""
         new_order = {}
-        idx = 0
-        for id_ in all_ids:
-            if id_ not in new_order:
-                new_order[id_] = idx
-                idx += 1
+        for ids in id_lists:
+            for id_ in ids:
+                if id_ not in new_order:
+                    new_order[id_] = len(new_order)
         return new_order
 
-    def _intersect_id_order(self, a, b):
-        """Determines the merge order for id lists A and B"""
-        all_b = set(b[:])
+    def _intersect_id_order(self, a, *id_lists):
+        """Determines the merge order for id lists A, B, ..."""
+        common = set(a)
+        for ids in id_lists:
+            common.intersection_update(ids)
         new_order = {}
         idx = 0
         for id_ in a:
-            if id_ in all_b:
+            if id_ in common:
                 new_order[id_] = idx
                 idx += 1
         return new_order
@@ -3186,7 +5150,7 @@ class Table(object):
         if inplace:
             table = self
         else:
-            table = self.copy()
+            table = self._lazy_copy()
 
         if axis == 'whole':
             axes = ['sample', 'observation']
@@ -3194,7 +5158,8 @@ class Table(object):
             axes = [axis]
 
         for ax in axes:
-            table.filter(lambda v, i, md: (v > 0).sum(), axis=ax)
+            table.filter(lambda data, ids, md: np.diff((data > 0).indptr) > 0,
+                         axis=ax, vectorized=True)
 
         return table
 
@@ -3355,8 +5320,10 @@ class Table(object):
             axis_ids.update(table_axis_ids)
 
             if set(table_invaxis) - invaxis_ids:
+                inv_md = table._get_metadata(axis=invaxis)
                 for i in (set(table_invaxis) - invaxis_ids):
-                    invaxis_metadata[i] = table.metadata(i, axis=invaxis)
+                    invaxis_metadata[i] = (None if inv_md is None else
+                                           inv_md[table.index(i, invaxis)])
 
                 # add to our perspective all inv axis IDs
                 invaxis_ids.update(table_invaxis)
@@ -3379,13 +5346,13 @@ class Table(object):
                     shape = (n_axis, n_invaxis)
 
                 # create the padded matrix
-                zerod = csr_matrix(shape)
+                zerod = csr_matrix(shape, dtype=table.dtype)
                 tmp_mat = invstack([table.matrix_data, zerod])
 
                 # resolve invert axis ids and metadata
                 tmp_inv_ids = list(table.ids(axis=invaxis))
                 tmp_inv_ids.extend(missing_ids)
-                tmp_inv_md = table.metadata(axis=invaxis)
+                tmp_inv_md = table._get_metadata(axis=invaxis)
                 if tmp_inv_md is None:
                     tmp_inv_md = [None] * len(table.ids(axis=invaxis))
                 else:
@@ -3394,16 +5361,16 @@ class Table(object):
 
                 # resolve axis ids and metadata
                 tmp_ids = list(table.ids(axis=axis))
-                tmp_md = table.metadata(axis=axis)
+                tmp_md = table._get_metadata(axis=axis)
 
                 # resolve construction based off axis. This really should be
                 # pushed to a classmethod.
                 if axis == 'sample':
-                    tmp_table = self.__class__(tmp_mat, tmp_inv_ids, tmp_ids,
-                                               tmp_inv_md, tmp_md)
+                    tmp_table = self._constructor.from_arrays(
+                        tmp_mat, tmp_inv_ids, tmp_ids, tmp_inv_md, tmp_md)
                 else:
-                    tmp_table = self.__class__(tmp_mat, tmp_ids, tmp_inv_ids,
-                                               tmp_md, tmp_inv_md)
+                    tmp_table = self._constructor.from_arrays(
+                        tmp_mat, tmp_ids, tmp_inv_ids, tmp_md, tmp_inv_md)
             else:
                 tmp_table = table
 
@@ -3419,19 +5386,22 @@ class Table(object):
         concat_ids = np.concatenate([t.ids(axis=axis) for t in padded_tables])
         concat_md = []
         for table in padded_tables:
-            metadata = table.metadata(axis=axis)
+            metadata = table._get_metadata(axis=axis)
             if metadata is None:
                 metadata = [None] * dim_getter(table.shape)
             concat_md.extend(metadata)
 
         # inverse axis sourced from whatever is in the first table
-        inv_md = padded_tables[0].metadata(axis=invaxis)
+        inv_md = padded_tables[0]._get_metadata(axis=invaxis)
         if axis == 'sample':
-            concat = self.__class__(concat_mat, invaxis_order, concat_ids,
-                                    inv_md, concat_md, type=self.type)
+            concat = self._constructor.from_arrays(
+                concat_mat, invaxis_order, concat_ids, inv_md, concat_md,
+                type=self.type)
         else:
-            concat = self.__class__(concat_mat, concat_ids, invaxis_order,
-                                    concat_md, inv_md, type=self.type)
+            concat = self._constructor.from_arrays(
+                concat_mat, concat_ids, invaxis_order, concat_md, inv_md,
+                type=self.type)
+        _share_metadata(concat, *padded_tables)
 
         return concat
 
@@ -3469,7 +5439,12 @@ class Table(object):
 
         Notes
         -----
-        - There is an implicit type conversion to ``float``.
+        - The values are stored in ``np.result_type`` of the dtypes of the
+          tables, one of float64, float32, int64 and uint32: e.g. merging
+          uint32 tables gives a uint32 table, and merging a uint32 and a
+          float32 table gives a float64 table. Integers are summed in int64,
+          and uint32 tables give an int64 table if a sum does not fit in
+          uint32.
         - The return type is always that of ``self``
 
         Examples
@@ -3498,177 +5473,196 @@ class Table(object):
         O3	10.0	10.0
 
         """
-        # determine the sample order in the resulting table
-        if sample is 'union':
-            new_samp_order = self._union_id_order(self.ids(), other.ids())
-        elif sample is 'intersection':
-            new_samp_order = self._intersect_id_order(self.ids(), other.ids())
-        else:
-            raise TableException("Unknown sample merge type: %s" % sample)
-
-        # determine the observation order in the resulting table
-        if observation is 'union':
-            new_obs_order = self._union_id_order(
-                self.ids(axis='observation'), other.ids(axis='observation'))
-        elif observation is 'intersection':
-            new_obs_order = self._intersect_id_order(
-                self.ids(axis='observation'), other.ids(axis='observation'))
-        else:
-            raise TableException(
-                "Unknown observation merge type: %s" %
-                observation)
-
-        # convert these to lists, no need to be dictionaries and reduces
-        # calls to items() and allows for pre-caluculating insert order
-        new_samp_order = sorted(new_samp_order.items(), key=itemgetter(1))
-        new_obs_order = sorted(new_obs_order.items(), key=itemgetter(1))
-
-        # if we don't have any samples, complain loudly. This is likely from
-        # performing an intersection without overlapping ids
-        if not new_samp_order:
-            raise TableException("No samples in resulting table!")
-        if not new_obs_order:
-            raise TableException("No observations in resulting table!")
-
-        # helper index lookups
-        other_obs_idx = other._obs_index
-        self_obs_idx = self._obs_index
-        other_samp_idx = other._sample_index
-        self_samp_idx = self._sample_index
-
-        # pre-calculate sample order from each table. We only need to do this
-        # once which dramatically reduces the number of dict lookups necessary
-        # within the inner loop
-        other_samp_order = []
-        self_samp_order = []
-        for samp_id, nsi in new_samp_order:  # nsi -> new_sample_index
-            other_samp_order.append((nsi, other_samp_idx.get(samp_id, None)))
-            self_samp_order.append((nsi, self_samp_idx.get(samp_id, None)))
-
-        # pre-allocate the a list for placing the resulting vectors as the
-        # placement id is not ordered
-        vals = [None for i in range(len(new_obs_order))]
-
-        # POSSIBLE DECOMPOSITION
-        # resulting sample ids and sample metadata
-        sample_ids = []
-        sample_md = []
-        self_sample_md = self.metadata()
-        other_sample_md = other.metadata()
-        for id_, idx in new_samp_order:
-            sample_ids.append(id_)
-
-            # if we have sample metadata, grab it
-            if self_sample_md is None or not self.exists(id_):
-                self_md = None
-            else:
-                self_md = self_sample_md[self_samp_idx[id_]]
+        return self.merge_many([other], sample=sample,
+                               observation=observation,
+                               sample_metadata_f=sample_metadata_f,
+                               observation_metadata_f=observation_metadata_f)
+
+    def merge_many(self, others, sample='union', observation='union',
+                   sample_metadata_f=prefer_self,
+                   observation_metadata_f=prefer_self):
+        """Merge many tables together in a single pass
+
+        This is equivalent to merging ``self`` with each of `others` in turn
+        using ``Table.merge``, but each table is only visited once and no
+        intermediate tables are built. The values of each table are remapped
+        into the coordinates of the resulting table, and the remapped sparse
+        matrices are summed together.
+
+        The metadata functions are applied to the tables in order. Unlike a
+        chain of ``Table.merge`` calls, an ID without metadata in the tables
+        merged so far is passed to them as ``None`` rather than as an empty
+        dict, so with the default ``prefer_self`` the metadata of a later
+        table is kept.
 
-            # if we have sample metadata, grab it
-            if other_sample_md is None or not other.exists(id_):
-                other_md = None
-            else:
-                other_md = other_sample_md[other_samp_idx[id_]]
+        Parameters
+        ----------
+        others : iterable of biom.Table
+            The tables to merge with this one
+        sample : {'union', 'intersection'}, optional
+        observation : {'union', 'intersection'}, optional
+        sample_metadata_f : function, optional
+            Defaults to ``biom.util.prefer_self``. Defines how to handle sample
+            metadata during merge. It is applied to the tables in order, as
+            ``Table.merge`` would be.
+        observation_metadata_f : function, optional
+            Defaults to ``biom.util.prefer_self``. Defines how to handle
+            observation metdata during merge. It is applied to the tables in
+            order, as ``Table.merge`` would be.
 
-            sample_md.append(sample_metadata_f(self_md, other_md))
+        Returns
+        -------
+        biom.Table
+            The merged table
 
-        # POSSIBLE DECOMPOSITION
-        # resulting observation ids and sample metadata
-        obs_ids = []
-        obs_md = []
-        self_obs_md = self.metadata(axis='observation')
-        other_obs_md = other.metadata(axis='observation')
-        for id_, idx in new_obs_order:
-            obs_ids.append(id_)
-
-            # if we have observation metadata, grab it
-            if self_obs_md is None or not self.exists(id_, axis="observation"):
-                self_md = None
-            else:
-                self_md = self_obs_md[self_obs_idx[id_]]
+        Raises
+        ------
+        TableException
+            If a merge type is unknown, or if the resulting table would not
+            have any samples or observations
 
-            # if we have observation metadata, grab it
-            if other_obs_md is None or \
-                    not other.exists(id_, axis="observation"):
-                other_md = None
-            else:
-                other_md = other_obs_md[other_obs_idx[id_]]
+        Notes
+        -----
+        - The values are stored in ``np.result_type`` of the dtypes of the
+          tables, one of float64, float32, int64 and uint32: e.g. merging
+          uint32 tables gives a uint32 table, and merging a uint32 and a
+          float32 table gives a float64 table. Integers are summed in int64,
+          and uint32 tables give an int64 table if a sum does not fit in
+          uint32.
+        - The return type is always that of ``self``
+
+        See Also
+        --------
+        merge
 
-            obs_md.append(observation_metadata_f(self_md, other_md))
+        Examples
+        --------
+        >>> import numpy as np
+        >>> from biom.table import Table
 
-        # length used for construction of new vectors
-        vec_length = len(new_samp_order)
+        Create three tables, such as the tables of three sequencing runs:
 
-        # walk over observations in our new order
-        for obs_id, new_obs_idx in new_obs_order:
-            # create new vector for matrix values
-            new_vec = zeros(vec_length, dtype='float')
+        >>> t_a = Table(np.asarray([[2, 0], [6, 1]]), ['O1', 'O2'],
+        ...             ['S1', 'S2'])
+        >>> t_b = Table(np.asarray([[4, 5], [0, 3]]), ['O1', 'O3'],
+        ...             ['S1', 'S3'])
+        >>> t_c = Table(np.asarray([[1], [1]]), ['O2', 'O3'], ['S2'])
 
-            # This method allows for the creation of a matrix of self type.
-            # See note above
-            # new_vec = data_f()
+        Merge them, summing the values of the shared samples and observations:
 
-            # see if the observation exists in other, if so, pull it out.
-            # if not, set to the placeholder missing
-            if other.exists(obs_id, axis="observation"):
-                other_vec = other.data(obs_id, 'observation')
-            else:
-                other_vec = None
+        >>> merged_table = t_a.merge_many([t_b, t_c])
+        >>> print merged_table  # doctest: +NORMALIZE_WHITESPACE
+        # Constructed from biom file
+        #OTU ID	S1	S2	S3
+        O1	6.0	0.0	5.0
+        O2	6.0	2.0	0.0
+        O3	0.0	1.0	3.0
 
-            # see if the observation exists in self, if so, pull it out.
-            # if not, set to the placeholder missing
-            if self.exists(obs_id, axis="observation"):
-                self_vec = self.data(obs_id, 'observation')
+        """
+        tables = [self] + list(others)
+
+        # determine the sample and observation order in the resulting table
+        orders = []
+        for axis, how in (('sample', sample), ('observation', observation)):
+            id_lists = [t.ids(axis=axis) for t in tables]
+            if how == 'union':
+                order = self._union_id_order(*id_lists)
+            elif how == 'intersection':
+                order = self._intersect_id_order(*id_lists)
             else:
-                self_vec = None
-
-            # short circuit. If other doesn't have any values, then we can just
-            # take all values from self
-            if other_vec is None:
-                for (n_idx, s_idx) in self_samp_order:
-                    if s_idx is not None:
-                        new_vec[n_idx] = self_vec[s_idx]
-
-            # short circuit. If self doesn't have any values, then we can just
-            # take all values from other
-            elif self_vec is None:
-                for (n_idx, o_idx) in other_samp_order:
-                    if o_idx is not None:
-                        new_vec[n_idx] = other_vec[o_idx]
+                raise TableException("Unknown %s merge type: %s"
+                                     % (axis, how))
 
-            else:
-                # NOTE: DM 7.5.12, no observed improvement at the profile level
-                # was made on this inner loop by using self_samp_order and
-                # other_samp_order lists.
-
-                # walk over samples in our new order
-                for samp_id, new_samp_idx in new_samp_order:
-                    # pull out each individual sample value. This is expensive,
-                    # but the vectors are in a different alignment. It is
-                    # possible that this could be improved with numpy take but
-                    # needs to handle missing values appropriately
-                    if samp_id not in self_samp_idx:
-                        self_vec_value = 0
-                    else:
-                        self_vec_value = self_vec[self_samp_idx[samp_id]]
+            # if we don't have any ids, complain loudly. This is likely from
+            # performing an intersection without overlapping ids
+            if not order:
+                raise TableException("No %ss in resulting table!" % axis)
 
-                    if samp_id not in other_samp_idx:
-                        other_vec_value = 0
-                    else:
-                        other_vec_value = other_vec[other_samp_idx[samp_id]]
+            new_ids = np.empty(len(order), dtype=object)
+            for id_, idx in viewitems(order):
+                new_ids[idx] = id_
+
+            # the position of each id of each table in the resulting table,
+            # or -1 if it is not kept
+            positions = [np.array([order.get(id_, -1) for id_ in ids],
+                                  dtype=int) for ids in id_lists]
+            orders.append((new_ids, positions))
+
+        (samp_ids, samp_pos), (obs_ids, obs_pos) = orders
+
+        # remap the coordinates of each table and sum them together
+        rows = []
+        cols = []
+        data = []
+        for table, t_obs_pos, t_samp_pos in zip(tables, obs_pos, samp_pos):
+            coo = table._data.tocoo()
+            t_rows = t_obs_pos[coo.row]
+            t_cols = t_samp_pos[coo.col]
+            keep = (t_rows >= 0) & (t_cols >= 0)
+            rows.append(t_rows[keep])
+            cols.append(t_cols[keep])
+            data.append(coo.data[keep])
+
+        # the values are summed without wrapping around, and the sums kept in
+        # the dtype which holds the values of every table if they fit in it
+        dtype = np.result_type(*[table.dtype for table in tables])
+        data = np.concatenate(data).astype(_sum_dtype(dtype), copy=False)
+        matrix = coo_matrix((data,
+                             (np.concatenate(rows), np.concatenate(cols))),
+                            shape=(len(obs_ids), len(samp_ids))).tocsr()
+        matrix.eliminate_zeros()
+        matrix = _narrow_sums(matrix, dtype)
+
+        sample_md = self._merge_metadata(tables, 'sample', samp_pos,
+                                         len(samp_ids), sample_metadata_f)
+        obs_md = self._merge_metadata(tables, 'observation', obs_pos,
+                                      len(obs_ids), observation_metadata_f)
+
+        merged = self._constructor.from_arrays(matrix, obs_ids, samp_ids,
+                                               obs_md, sample_md)
+        _share_metadata(merged, *tables)
+        return merged
+
+    def _merge_metadata(self, tables, axis, positions, n, f):
+        """Merge the metadata of tables in order with f
+
+        ``positions`` are the positions of the ids of each table in the
+        merged table, or -1 for the ids which are not kept.
+        """
+        merged = [None] * n
+        seen = np.zeros(n, dtype=bool)
+        for i, (table, pos) in enumerate(zip(tables, positions)):
+            metadata = table.metadata(axis=axis)
+            kept = np.flatnonzero(pos >= 0)
+
+            if i == 0 or f is prefer_self:
+                # prefer_self keeps the first metadata which is not None, so
+                # only the ids of this table can change
+                if metadata is not None:
+                    for idx in kept:
+                        if merged[pos[idx]] is None:
+                            merged[pos[idx]] = metadata[idx]
+                seen[pos[kept]] = True
+                continue
+
+            values = {}
+            if metadata is not None:
+                values = dict((pos[idx], metadata[idx]) for idx in kept)
+            seen[pos[kept]] = True
 
-                    new_vec[new_samp_idx] = self_vec_value + other_vec_value
+            for new_idx in np.flatnonzero(seen):
+                merged[new_idx] = f(merged[new_idx], values.get(new_idx))
 
-            # convert our new vector to self type as to make sure we don't
-            # accidently force a dense representation in memory
-            vals[new_obs_idx] = self._conv_to_self_type(new_vec)
+        # keep columnar metadata columnar
+        if isinstance(self._get_metadata(axis=axis), ColumnarMetadata):
+            merged = ColumnarMetadata.from_rows(merged)
 
-        return self.__class__(self._conv_to_self_type(vals), obs_ids[:],
-                              sample_ids[:], obs_md, sample_md)
+        return merged
 
     @classmethod
     def from_hdf5(cls, h5grp, ids=None, axis='sample', parse_fs=None,
-                  subset_with_metadata=True):
+                  subset_with_metadata=True, columnar_metadata=False,
+                  metadata=None, dtype=None):
         """Parse an HDF5 formatted BIOM table
 
         If ids is provided, only the samples/observations listed in ids
@@ -3706,7 +5700,7 @@ int64, number of non zero elems
  of str or vlen str
         - ./observation/matrix                                  : Group
         - ./observation/matrix/data                             : (nnz,) \
-dataset of float64
+dataset of float64, float32, int64 or uint32
         - ./observation/matrix/indices                          : (nnz,) \
 dataset of int32
         - ./observation/matrix/indptr                           : (M+1,) \
@@ -3724,7 +5718,7 @@ dataset of int32
  of str or vlen str
         - ./sample/matrix                                       : Group
         - ./sample/matrix/data                                  : (nnz,) \
-dataset of float64
+dataset of float64, float32, int64 or uint32
         - ./sample/matrix/indices                               : (nnz,) \
 dataset of int32
         - ./sample/matrix/indptr                                : (N+1,) \
@@ -3770,6 +5764,21 @@ dataset of int32
             the metadata. By default, the metadata are also subset. The reason
             for exposing this functionality is that, for large tables, there
             exists a very large overhead for this metadata manipulation.
+        columnar_metadata : bool, optional
+            Whether to store the metadata as ``ColumnarMetadata``, which reads
+            each metadata dataset into a single column rather than creating a
+            dict per sample or observation. Defaults to ``False``.
+        metadata : bool, Iterable of str or dict, optional
+            The metadata categories to load on both axes. ``None`` or
+            ``True``, the default, loads all of them and ``False`` loads
+            none. Categories which an axis does not have are ignored. A dict
+            of ``{'sample': ..., 'observation': ...}`` selects the categories
+            of each axis, and an axis which is not in the dict has no
+            metadata loaded.
+        dtype : {float64, float32, int64, uint32}, optional
+            The dtype in which the values are stored. Defaults to the dtype
+            of the values in the file if it is one of these, and to float64
+            otherwise.
 
         Returns
         -------
@@ -3782,6 +5791,8 @@ dataset of int32
             If `ids` are not a subset of the samples or observations ids
             present in the hdf5 biom table
             If h5grp is not a HDF5 file or group
+        TableException
+            If `dtype` is not supported
 
         References
         ----------
@@ -3830,19 +5841,13 @@ html
         if not subset_with_metadata and ids is not None:
             ids = set(ids)
 
-            raw_indices = h5grp['%s/matrix/indices' % axis]
-            raw_indptr = h5grp['%s/matrix/indptr' % axis]
-            raw_data = h5grp['%s/matrix/data' % axis]
             axis_ids = h5grp['%s/ids' % axis][:]
 
             to_keep = np.array([i for i, id_ in enumerate(axis_ids)
                                 if id_ in ids], dtype=int)
-            start_end = [(raw_indptr[i], raw_indptr[i+1]) for i in to_keep]
-            indptr = np.empty(len(to_keep) + 1, dtype=np.int32)
-            indptr[0] = 0
-            indptr[1:] = np.array([e - s for s, e in start_end]).cumsum()
-            data = np.concatenate([raw_data[s:e] for s, e in start_end])
-            indices = np.concatenate([raw_indices[s:e] for s, e in start_end])
+            data, indices, indptr = _hdf5_read_subset(
+                h5grp['%s/matrix' % axis],
+                h5grp['%s/matrix/indptr' % axis][:], to_keep)
 
             if axis == 'sample':
                 obs_ids = h5grp['observation/ids'][:]
@@ -3855,65 +5860,30 @@ html
                 shape = (len(to_keep), len(samp_ids))
                 mat = csr_matrix((data, indices, indptr), shape=shape)
 
-            return Table(mat, obs_ids, samp_ids)
-
-        id_ = h5grp.attrs['id']
-        create_date = h5grp.attrs['creation-date']
-        generated_by = h5grp.attrs['generated-by']
+            if dtype is None:
+                dtype = data.dtype
+            return Table(mat, obs_ids, samp_ids, dtype=dtype)
 
+        id_, type_, create_date, generated_by = _hdf5_table_attrs(h5grp)
         shape = h5grp.attrs['shape']
-        type_ = None if h5grp.attrs['type'] == '' else h5grp.attrs['type']
 
-        if isinstance(id_, six.binary_type):
-            if six.PY3:
-                id_ = id_.decode('ascii')
-            else:
-                id_ = str(id_)
-
-        if isinstance(type_, six.binary_type):
-            if six.PY3:
-                type_ = type_.decode('ascii')
-            else:
-                type_ = str(type_)
-
-        def axis_load(grp):
+        def axis_load(grp, axis):
             """Loads all the data of the given group"""
-            # fetch all of the IDs
-            ids = grp['ids'][:]
-
-            if ids.size > 0 and isinstance(ids[0], bytes):
-                ids = np.array([i.decode('utf8') for i in ids])
-
-            parser = defaultdict(lambda: general_parser)
-            parser['taxonomy'] = vlen_list_of_str_parser
-            parser['KEGG_Pathways'] = vlen_list_of_str_parser
-            parser['collapsed_ids'] = vlen_list_of_str_parser
-            parser.update(parse_fs)
-
-            # fetch ID specific metadata
-            md = [{} for i in range(len(ids))]
-            for category, dset in viewitems(grp['metadata']):
-                parse_f = parser[category]
-                data = dset[:]
-                for md_dict, data_row in zip(md, data):
-                    md_dict[category] = parse_f(data_row)
-
-            # If there was no metadata on the axis, set it up as none
-            md = md if any(md) else None
+            ids = _hdf5_ids(grp)
+            md = _hdf5_metadata(grp, len(ids), parse_fs, columnar_metadata,
+                                _metadata_categories(metadata, axis))
 
             # Fetch the group metadata
             grp_md = {cat: val
                       for cat, val in grp['group-metadata'].items()}
             return ids, md, grp_md
 
-        obs_ids, obs_md, obs_grp_md = axis_load(h5grp['observation'])
-        samp_ids, samp_md, samp_grp_md = axis_load(h5grp['sample'])
+        obs_ids, obs_md, obs_grp_md = axis_load(h5grp['observation'],
+                                                'observation')
+        samp_ids, samp_md, samp_grp_md = axis_load(h5grp['sample'], 'sample')
 
         # load the data
         data_grp = h5grp[axis]['matrix']
-        h5_data = data_grp["data"]
-        h5_indices = data_grp["indices"]
-        h5_indptr = data_grp["indptr"]
 
         # Check if we need to subset the biom table
         if ids is not None:
@@ -3951,7 +5921,9 @@ html
             def _subset_metadata(md, idx):
                 """If md has data, returns the subset indicated by idx, a
                 boolean array"""
-                if md:
+                if isinstance(md, ColumnarMetadata):
+                    md = md[idx]
+                elif md:
                     md = list(np.asarray(md)[np.where(idx)])
                 return md
 
@@ -3960,25 +5932,15 @@ html
 
             # load the subset of the data
             idx = samp_idx if axis == 'sample' else obs_idx
-            keep = np.where(idx)[0]
-            indptr_indices = sorted([(h5_indptr[i], h5_indptr[i+1])
-                                     for i in keep])
-            # Create the new indptr
-            indptr_subset = np.array([end - start
-                                     for start, end in indptr_indices])
-            indptr = np.empty(len(keep) + 1, dtype=np.int32)
-            indptr[0] = 0
-            indptr[1:] = indptr_subset.cumsum()
-
-            data = np.hstack(h5_data[start:end]
-                             for start, end in indptr_indices)
-            indices = np.hstack(h5_indices[start:end]
-                                for start, end in indptr_indices)
+            data, indices, indptr = _hdf5_read_subset(
+                data_grp, data_grp['indptr'][:], np.flatnonzero(idx))
         else:
-            # no subset need, just pass all data to scipy
-            data = h5_data
-            indices = h5_indices
-            indptr = h5_indptr
+            # no subset need, so read the CSR matrix which the table holds
+            axis = 'observation'
+            data_grp = h5grp['observation/matrix']
+            data = data_grp['data'][:]
+            indices = data_grp['indices'][:]
+            indptr = data_grp['indptr'][:]
 
         cs = (data, indices, indptr)
 
@@ -3991,16 +5953,17 @@ html
                   samp_md or None, type=type_, create_date=create_date,
                   generated_by=generated_by, table_id=id_,
                   observation_group_metadata=obs_grp_md,
-                  sample_group_metadata=samp_grp_md)
+                  sample_group_metadata=samp_grp_md,
+                  dtype=_stored_dtype(data.dtype) if dtype is None else dtype)
 
         if ids is not None:
             # filter out any empty samples or observations which may exist due
             # to subsetting
-            def any_value(vals, id_, md):
-                return np.any(vals)
-
-            axis = 'observation' if axis == 'sample' else 'sample'
-            t.filter(any_value, axis=axis)
+            other = 'observation' if axis == 'sample' else 'sample'
+            nonzero = np.bincount(indices[data != 0],
+                                  minlength=t.length(axis=other))
+            if not nonzero.all():
+                t.filter(t.ids(axis=other)[nonzero > 0], axis=other)
 
         return t
 
@@ -4074,7 +6037,7 @@ html
         O1   Bacteria     Firmicutes
         O2   Bacteria  Bacteroidetes
         """
-        md = self.metadata(axis=axis)
+        md = self._get_metadata(axis=axis)
         if md is None:
             raise KeyError("%s does not have metadata" % axis)
 
@@ -4104,7 +6067,8 @@ html
 
         return pd.DataFrame(rows, index=self.ids(axis=axis), columns=columns)
 
-    def to_hdf5(self, h5grp, generated_by, compress=True, format_fs=None):
+    def to_hdf5(self, h5grp, generated_by, compress=True, format_fs=None,
+                shuffle=False, chunk_size=2**16, n_threads=1):
         """Store CSC and CSR in place
 
         The resulting structure of this group is below. A few basic
@@ -4139,7 +6103,7 @@ int64, number of non zero elems
  of str or vlen str
         - ./observation/matrix                                  : Group
         - ./observation/matrix/data                             : (nnz,) \
-dataset of float64
+dataset of float64, float32, int64 or uint32
         - ./observation/matrix/indices                          : (nnz,) \
 dataset of int32
         - ./observation/matrix/indptr                           : (M+1,) \
@@ -4157,7 +6121,7 @@ dataset of int32
  of str or vlen str
         - ./sample/matrix                                       : Group
         - ./sample/matrix/data                                  : (nnz,) \
-dataset of float64
+dataset of float64, float32, int64 or uint32
         - ./sample/matrix/indices                               : (nnz,) \
 dataset of int32
         - ./sample/matrix/indptr                                : (N+1,) \
@@ -4190,9 +6154,10 @@ dataset of int32
             The HDF5 entity in which to write the BIOM formatted data.
         generated_by : str
             A description of what generated the table
-        compress : bool, optional
+        compress : bool, int or str, optional
             Defaults to ``True`` means fields will be compressed with gzip,
-            ``False`` means no compression
+            ``False`` means no compression. An int from 0 to 9 compresses
+            with gzip at that level, and 'gzip' or 'lzf' selects the filter.
         format_fs : dict, optional
             Specify custom formatting functions for metadata fields. This dict
             is expected to be {'metadata_field': function}, where the function
@@ -4201,10 +6166,28 @@ dataset of int32
             the category being operated on, the metadata for the entire axis
             being operated on, and whether to enable compression on the
             dataset.  Anything returned by this function is ignored.
+        shuffle : bool, optional
+            Defaults to ``False``. Whether the matrix datasets are shuffled
+            before they are compressed, which often compresses the data and
+            indices better.
+        chunk_size : int, optional
+            Defaults to 2 ** 16. The number of values in a chunk of the
+            compressed matrix datasets. A vector is read by decompressing the
+            chunks it spans, so smaller chunks favour reading a few vectors
+            and larger chunks favour compression.
+        n_threads : int, optional
+            Defaults to 1. If greater than 1, the CSR and CSC matrices are
+            built in a pool of `n_threads` threads while the other datasets
+            are written, and gzip compressed matrix chunks are compressed in
+            the pool and written as they are.
 
         Notes
         -----
         This method does not return anything and operates in place on h5grp.
+        The table itself is not modified.
+
+        The values are written in the dtype of the table, see ``astype``.
+        Readers which predate the other storage dtypes read them as float64.
 
         See Also
         --------
@@ -4245,9 +6228,7 @@ html
         h5grp.attrs['shape'] = self.shape
         h5grp.attrs['nnz'] = self.nnz
 
-        compression = None
-        if compress is True:
-            compression = 'gzip'
+        compression, matrix_compression, level = _hdf5_compression(compress)
 
         formatter = defaultdict(lambda: general_formatter)
         formatter['taxonomy'] = vlen_list_of_str_formatter
@@ -4255,32 +6236,70 @@ html
         formatter['collapsed_ids'] = vlen_list_of_str_formatter
         formatter.update(format_fs)
 
-        for axis, order in zip(['observation', 'sample'], ['csr', 'csc']):
-            grp = h5grp.create_group(axis)
+        pool = ThreadPool(n_threads) if n_threads > 1 else None
+        try:
+            self._to_hdf5(h5grp, compression, formatter, pool,
+                          matrix_compression, level, shuffle, chunk_size)
+        finally:
+            if pool is not None:
+                pool.close()
+                pool.join()
+
+    def _to_hdf5(self, h5grp, compression, formatter, pool,
+                 matrix_compression, level, shuffle, chunk_size):
+        """Write the axes of the table, see Table.to_hdf5"""
+        as_csr = partial(self._as_format, 'csr')
+        as_csc = partial(self._as_format, 'csc')
+        if pool is None:
+            matrices = [as_csr, as_csc]
+        else:
+            # the matrices are built in the pool while the ids and metadata
+            # are written
+            matrices = [pool.apply_async(as_csr).get,
+                        pool.apply_async(as_csc).get]
 
-            self._data = self._data.asformat(order)
+        for axis, get_matrix in zip(['observation', 'sample'], matrices):
+            grp = h5grp.create_group(axis)
 
             ids = self.ids(axis=axis)
             len_ids = len(ids)
-            len_indptr = len(self._data.indptr)
-            len_data = self.nnz
 
-            md = self.metadata(axis=axis)
+            md = self._get_metadata(axis=axis)
+
+            def inconsistent(other_id, other_md):
+                return ValueError("%s has inconsistent metadata "
+                                  "categories with %s:\n"
+                                  "%s: %s\n"
+                                  "%s: %s" % (other_id, ids[0],
+                                              other_id, list(other_md),
+                                              ids[0], list(md[0])))
 
             # Create the group for the metadata
             grp.create_group('metadata')
-            if md:
+            if isinstance(md, ColumnarMetadata) and md:
+                # a category is consistent if no ID, or every ID, has it
+                categories = []
+                consistent = np.ones(len(ids), dtype=bool)
+                for category in md.categories:
+                    missing = md._missing(category)
+                    consistent &= missing == missing[0]
+                    if not missing[0]:
+                        categories.append(category)
+
+                if not consistent.all():
+                    idx = np.flatnonzero(~consistent)[0]
+                    raise inconsistent(ids[idx], md[idx])
+            elif md:
                 exp = set(md[0])
-                for other_id, other_md in zip(ids[1:], md[1:]):
-                    if set(other_md) != exp:
-                        raise ValueError("%s has inconsistent metadata "
-                                         "categories with %s:\n"
-                                         "%s: %s\n"
-                                         "%s: %s" % (other_id, ids[0],
-                                                     other_id, list(other_md),
-                                                     ids[0], list(exp)))
-
-                for category in md[0]:
+                consistent = np.fromiter(map(exp.__eq__, map(set, md)),
+                                         dtype=bool, count=len(md))
+                if not consistent.all():
+                    idx = np.flatnonzero(~consistent)[0]
+                    raise inconsistent(ids[idx], md[idx])
+                categories = list(md[0])
+
+            if md:
+                for category in categories:
                     # Create the dataset for the current category,
                     # putting values in id order
                     formatter[category](grp, category, md, compression)
@@ -4299,20 +6318,6 @@ html
                         data=val, compression=compression)
                     grp_dataset.attrs['data_type'] = datatype
 
-            grp.create_group('matrix')
-            grp.create_dataset('matrix/data', shape=(len_data,),
-                               dtype=np.float64,
-                               data=self._data.data,
-                               compression=compression)
-            grp.create_dataset('matrix/indices', shape=(len_data,),
-                               dtype=np.int32,
-                               data=self._data.indices,
-                               compression=compression)
-            grp.create_dataset('matrix/indptr', shape=(len_indptr,),
-                               dtype=np.int32,
-                               data=self._data.indptr,
-                               compression=compression)
-
             if len_ids > 0:
                 # if we store IDs in the table as numpy arrays then this store
                 # is cleaner, as is the parse
@@ -4325,9 +6330,17 @@ html
                 grp.create_dataset('ids', shape=(0, ), data=[],
                                    compression=compression)
 
+            matrix = get_matrix()
+            matrix_grp = grp.create_group('matrix')
+            for name, dtype in (('data', self.dtype), ('indices', np.int32),
+                                ('indptr', np.int32)):
+                _hdf5_write_vector(matrix_grp, name, getattr(matrix, name),
+                                   dtype, matrix_compression, level, shuffle,
+                                   chunk_size, pool)
+
     @classmethod
     def from_json(self, json_table, data_pump=None,
-                  input_is_dense=False):
+                  input_is_dense=False, metadata=None):
         """Parse a biom otu table type
 
         Parameters
@@ -4338,6 +6351,8 @@ html
             A secondary source of data
         input_is_dense : bool
             If `True`, the data contained will be interpretted as dense
+        metadata : bool, Iterable of str or dict, optional
+            The metadata categories to keep, see ``Table.from_hdf5``
 
         Returns
         -------
@@ -4385,10 +6400,18 @@ html
 
         """
         sample_ids = [col['id'] for col in json_table['columns']]
-        sample_metadata = [col['metadata'] for col in json_table['columns']]
         obs_ids = [row['id'] for row in json_table['rows']]
-        obs_metadata = [row['metadata'] for row in json_table['rows']]
-        dtype = MATRIX_ELEMENT_TYPE[json_table['matrix_element_type']]
+
+        sample_metadata = obs_metadata = None
+        categories = _metadata_categories(metadata, 'sample')
+        if categories is None or categories:
+            sample_metadata = _select_metadata(
+                [col['metadata'] for col in json_table['columns']],
+                categories)
+        categories = _metadata_categories(metadata, 'observation')
+        if categories is None or categories:
+            obs_metadata = _select_metadata(
+                [row['metadata'] for row in json_table['rows']], categories)
         if 'matrix_type' in json_table:
             if json_table['matrix_type'] == 'dense':
                 input_is_dense = True
@@ -4400,7 +6423,6 @@ html
             table_obj = Table(json_table['data'], obs_ids, sample_ids,
                               obs_metadata, sample_metadata,
                               shape=json_table['shape'],
-                              dtype=dtype,
                               type=type_,
                               generated_by=json_table['generated_by'],
                               input_is_dense=input_is_dense)
@@ -4408,7 +6430,6 @@ html
             table_obj = Table(data_pump, obs_ids, sample_ids,
                               obs_metadata, sample_metadata,
                               shape=json_table['shape'],
-                              dtype=dtype,
                               type=type_,
                               generated_by=json_table['generated_by'],
                               input_is_dense=input_is_dense)
@@ -4429,30 +6450,34 @@ html
         Returns
         -------
         str
-            A JSON-formatted string representing the biom table
+            A JSON-formatted string representing the biom table, or ``None``
+            if it was written to `direct_io`
+
+        Notes
+        -----
+        The table is written in pieces as it is formatted, with the data
+        taken a chunk at a time from the sparse matrix, so writing to a file
+        (e.g. a gzip file opened in text mode) needs memory proportional to a
+        chunk rather than to the table.
         """
         if not isinstance(generated_by, string_types):
             raise TableException("Must specify a generated_by string")
 
+        if direct_io is None:
+            direct_io = StringIO()
+            self.to_json(generated_by, direct_io=direct_io)
+            return direct_io.getvalue()
+
+        write = direct_io.write
+
         # Fill in top-level metadata.
-        if direct_io:
-            direct_io.write(u'{')
-            direct_io.write(u'"id": "%s",' % str(self.table_id))
-            direct_io.write(
-                u'"format": "%s",' %
-                get_biom_format_version_string((1, 0)))  # JSON table -> 1.0.0
-            direct_io.write(
-                u'"format_url": "%s",' %
-                get_biom_format_url_string())
-            direct_io.write(u'"generated_by": "%s",' % generated_by)
-            direct_io.write(u'"date": "%s",' % datetime.now().isoformat())
-        else:
-            id_ = u'"id": "%s",' % str(self.table_id)
-            format_ = u'"format": "%s",' % get_biom_format_version_string(
-                (1, 0))  # JSON table -> 1.0.0
-            format_url = u'"format_url": "%s",' % get_biom_format_url_string()
-            generated_by = u'"generated_by": "%s",' % generated_by
-            date = u'"date": "%s",' % datetime.now().isoformat()
+        write(u'{')
+        write(u'"id": "%s",' % str(self.table_id))
+        write(u'"format": "%s",' %
+              get_biom_format_version_string((1, 0)))  # JSON table -> 1.0.0
+        write(u'"format_url": "%s",' % get_biom_format_url_string())
+        write(u'"generated_by": "%s",' % generated_by)
+        write(u'"date": "%s",' % datetime.now().isoformat())
 
         # Determine if we have any data in the matrix, and what the shape of
         # the matrix is.
@@ -4469,9 +6494,9 @@ html
             test_element = self[0, 0]
 
         # Determine the type of elements the matrix is storing.
-        if isinstance(test_element, int):
+        if self.dtype.kind in 'iu' or isinstance(test_element, int):
             matrix_element_type = u"int"
-        elif isinstance(test_element, float):
+        elif self.dtype.kind == 'f' or isinstance(test_element, float):
             matrix_element_type = u"float"
         elif isinstance(test_element, string_types):
             matrix_element_type = u"str"
@@ -4479,107 +6504,43 @@ html
             raise TableException("Unsupported matrix data type.")
 
         # Fill in details about the matrix.
-        if direct_io:
-            direct_io.write(
-                u'"matrix_element_type": "%s",' %
-                matrix_element_type)
-            direct_io.write(u'"shape": [%d, %d],' % (num_rows, num_cols))
-        else:
-            matrix_element_type = u'"matrix_element_type": "%s",' % \
-                matrix_element_type
-            shape = u'"shape": [%d, %d],' % (num_rows, num_cols)
+        write(u'"matrix_element_type": "%s",' % matrix_element_type)
+        write(u'"shape": [%d, %d],' % (num_rows, num_cols))
 
         # Fill in the table type
         if self.type is None:
-            type_ = u'"type": null,'
+            write(u'"type": null,')
         else:
-            type_ = u'"type": "%s",' % self.type
-
-        if direct_io:
-            direct_io.write(type_)
-
-        # Fill in details about the rows in the table and fill in the matrix's
-        # data. BIOM 2.0+ is now only sparse
-        if direct_io:
-            direct_io.write(u'"matrix_type": "sparse",')
-            direct_io.write(u'"data": [')
-        else:
-            matrix_type = u'"matrix_type": "sparse",'
-            data = [u'"data": [']
-
-        max_row_idx = len(self.ids(axis='observation')) - 1
-        max_col_idx = len(self.ids()) - 1
-        rows = [u'"rows": [']
-        have_written = False
-        for obs_index, obs in enumerate(self.iter(axis='observation')):
-            # i'm crying on the inside
-            if obs_index != max_row_idx:
-                rows.append(u'{"id": %s, "metadata": %s},' % (dumps(obs[1]),
-                                                              dumps(obs[2])))
-            else:
-                rows.append(u'{"id": %s, "metadata": %s}],' % (dumps(obs[1]),
-                                                               dumps(obs[2])))
-
-            # turns out its a pain to figure out when to place commas. the
-            # simple work around, at the expense of a little memory
-            # (bound by the number of samples) is to build of what will be
-            # written, and then add in the commas where necessary.
-            built_row = []
-            for col_index, val in enumerate(obs[0]):
-                if float(val) != 0.0:
-                    built_row.append(u"[%d,%d,%r]" % (obs_index, col_index,
-                                                      val))
-            if built_row:
-                # if we have written a row already, its safe to add a comma
-                if have_written:
-                    if direct_io:
-                        direct_io.write(u',')
-                    else:
-                        data.append(u',')
-                if direct_io:
-                    direct_io.write(u','.join(built_row))
-                else:
-                    data.append(u','.join(built_row))
+            write(u'"type": "%s",' % self.type)
 
-                have_written = True
-
-        # finalize the data block
-        if direct_io:
-            direct_io.write(u"],")
-        else:
-            data.append(u"],")
-
-        # Fill in details about the columns in the table.
-        columns = [u'"columns": [']
-        for samp_index, samp in enumerate(self.iter()):
-            if samp_index != max_col_idx:
-                columns.append(u'{"id": %s, "metadata": %s},' % (
-                    dumps(samp[1]), dumps(samp[2])))
-            else:
-                columns.append(u'{"id": %s, "metadata": %s}]' % (
-                    dumps(samp[1]), dumps(samp[2])))
+        # Fill in the matrix's data straight from the CSR arrays. BIOM 2.0+
+        # is now only sparse
+        write(u'"matrix_type": "sparse",')
+        write(u'"data": [')
+        if has_data:
+            _write_json_items(write, _json_triples(self._as_format('csr')),
+                              chunk_size=1)
+        write(u'],')
 
-        if rows[0] == u'"rows": [' and len(rows) == 1:
-            # empty table case
-            rows = [u'"rows": [],']
-            columns = [u'"columns": []']
+        # Fill in details about the rows and the columns in the table.
+        for axis, key, end in (('observation', u'rows', u'],'),
+                               ('sample', u'columns', u']')):
+            ids = self.ids(axis=axis)
+            md = self._get_metadata(axis=axis)
+            if md is None:
+                md = (None,) * len(ids)
 
-        rows = u''.join(rows)
-        columns = u''.join(columns)
+            write(u'"%s": [' % key)
+            _write_json_items(write, (u'{"id": %s, "metadata": %s}' %
+                                      (dumps(id_), dumps(md_))
+                                      for id_, md_ in zip(ids, md)))
+            write(end)
 
-        if direct_io:
-            direct_io.write(rows)
-            direct_io.write(columns)
-            direct_io.write(u'}')
-        else:
-            return u"{%s}" % ''.join([id_, format_, format_url, matrix_type,
-                                      generated_by, date, type_,
-                                      matrix_element_type, shape,
-                                      u''.join(data), rows, columns])
+        write(u'}')
 
     @staticmethod
     def from_tsv(lines, obs_mapping, sample_mapping,
-                 process_func, **kwargs):
+                 process_func, metadata=None, **kwargs):
         """Parse a tab separated (observation x sample) formatted BIOM table
 
         Parameters
@@ -4592,12 +6553,26 @@ html
             The corresponding sample metadata
         process_func : function
             A function to transform the observation metadata
+        metadata : bool, Iterable of str or dict, optional
+            The metadata categories to keep from the metadata column of the
+            table, see ``Table.from_hdf5``. `obs_mapping` and
+            `sample_mapping` are always used.
+        kwargs : dict, optional
+            Passed on to the parser: ``delim``, ``dtype``, ``md_parse``,
+            ``chunk_size`` and ``progress``, a function called with the
+            number of observations parsed so far after each chunk
 
         Returns
         -------
         biom.Table
             A BIOM ``Table`` object
 
+        Notes
+        -----
+        The input is read once, a chunk at a time, and is never densified as
+        a whole, so `lines` may be any iterable of lines, such as a gzipped
+        file opened with ``biom.util.biom_open``.
+
         Examples
         --------
         Parse tab separated data into a table:
@@ -4609,11 +6584,14 @@ html
         >>> func = lambda x : x
         >>> test_table = Table.from_tsv(tsv_fh, None, None, func)
         """
+        kwargs['sparse'] = True
         (sample_ids, obs_ids, data, t_md,
             t_md_name) = Table._extract_data_from_tsv(lines, **kwargs)
 
-        # if we have it, keep it
-        if t_md is None:
+        # if we have it, and it is wanted, keep it
+        categories = _metadata_categories(metadata, 'observation')
+        if t_md is None or \
+                (categories is not None and t_md_name not in categories):
             obs_metadata = None
         else:
             obs_metadata = [{t_md_name: process_func(v)} for v in t_md]
@@ -4631,7 +6609,8 @@ html
         return Table(data, obs_ids, sample_ids, obs_metadata, sample_metadata)
 
     @staticmethod
-    def _extract_data_from_tsv(lines, delim='\t', dtype=float, md_parse=None):
+    def _extract_data_from_tsv(lines, delim='\t', dtype=float, md_parse=None,
+                               sparse=False, chunk_size=2**20, progress=None):
         """Parse a classic table into (sample_ids, obs_ids, data, metadata,
         name)
 
@@ -4644,6 +6623,14 @@ html
         dtype: type
         md_parse:  function or None
             funtion used to parse metdata
+        sparse: bool, optional
+            If ``True``, data is returned as a ``csr_matrix`` rather than as
+            a list of ``[row, column, value]``
+        chunk_size: int, optional
+            The approximate number of values parsed at a time
+        progress: function or None, optional
+            Called with the number of observations parsed so far after each
+            chunk
 
         Returns
         -------
@@ -4651,7 +6638,7 @@ html
             sample_ids
         list
             observation_ids
-        array
+        list or csr_matrix
             data
         list
             metadata
@@ -4663,6 +6650,11 @@ html
         This is intended to be close to how QIIME classic OTU tables are parsed
         with the exception of the additional md_name field
 
+        The lines are read once, in chunks. The values of a chunk are parsed
+        together and only its nonzero values are kept, so the peak memory
+        depends on the number of nonzero values and the chunk size rather
+        than on the size of the table.
+
         This function is ported from QIIME (http://www.qiime.org), previously
         named parse_classic_otu_table. QIIME is a GPL project, but we obtained
         permission from the authors of this function to port it to the BIOM
@@ -4670,55 +6662,46 @@ html
 
         .. shownumpydoc
         """
-        if not isinstance(lines, list):
-            try:
-                hasattr(lines, 'seek')
-            except AttributeError:
-                raise RuntimeError(
-                    "Input needs to support seek or be indexable")
-
-        # find header, the first line that is not empty and does not start
-        # with a #
-        header = False
-        list_index = 0
-        for line in lines:
-            if not line.strip():
+        if not hasattr(lines, '__iter__'):
+            raise RuntimeError("Input needs to be a list or file-like object")
+
+        # find header, the last comment line before the data, or the first
+        # line if there are no comment lines. The first data line is held
+        # on to so the input does not need to be read twice.
+        header = None
+        first = None
+        numbered = enumerate(lines)
+        for lineno, line in numbered:
+            line = line.strip()
+            if not line:
                 continue
-            if not line.startswith('#'):
+            if line.startswith('#'):
+                header = line.split(delim)[1:]
+            elif header is None:
                 # Covers the case where the first line is the header
                 # and there is no indication of it (no comment character)
-                if not header:
-                    header = line.strip().split(delim)[1:]
-                    data_start = list_index + 1
-                else:
-                    data_start = list_index
+                header = line.split(delim)[1:]
+            else:
+                first = (lineno, line)
                 break
-            list_index += 1
-            header = line.strip().split(delim)[1:]
-        # If the first line is the header, then we need to get the next
-        # line for the "last column" check
-        if isinstance(lines, list):
-            line = lines[data_start]
-        else:
-            lines.seek(0)
-            for index in range(0, data_start + 1):
-                line = lines.readline()
+
+        if header is None:
+            header = []
 
         # attempt to determine if the last column is non-numeric, ie, metadata
-        first_values = line.strip().split(delim)
-        last_value = first_values[-1]
         last_column_is_numeric = True
-
-        if '.' in last_value:
-            try:
-                float(last_value)
-            except ValueError:
-                last_column_is_numeric = False
-        else:
-            try:
-                int(last_value)
-            except ValueError:
-                last_column_is_numeric = False
+        if first is not None:
+            last_value = first[1].split(delim)[-1]
+            if '.' in last_value:
+                try:
+                    float(last_value)
+                except ValueError:
+                    last_column_is_numeric = False
+            else:
+                try:
+                    int(last_value)
+                except ValueError:
+                    last_column_is_numeric = False
 
         # determine sample ids
         if last_column_is_numeric:
@@ -4730,56 +6713,69 @@ html
             metadata = []
             samp_ids = header[:-1]
 
-        data = []
+        n_values = len(samp_ids)
+        block_size = max(1, chunk_size // max(n_values, 1))
         obs_ids = []
-        row_number = 0
-
-        # Go back to the beginning if it is a file:
-        if hasattr(lines, 'seek'):
-            lines.seek(0)
-            for index in range(0, data_start):
-                line = lines.readline()
-        else:
-            lines = lines[data_start:]
-
-        for lineno, line in enumerate(lines, data_start):
-            line = line.strip()
-            if not line:
-                continue
-            if line.startswith('#'):
-                continue
+        rows = []
+        cols = []
+        values = []
+
+        def blocks():
+            if first is None:
+                return
+            block = [first]
+            for lineno, line in numbered:
+                line = line.strip()
+                if not line or line.startswith('#'):
+                    continue
+                if len(block) == block_size:
+                    yield block
+                    block = []
+                block.append((lineno, line))
+            yield block
+
+        for block in blocks():
+            ids, block_data, md = _parse_tsv_block(
+                block, delim, dtype, n_values, not last_column_is_numeric)
+
+            # only the nonzero values of a block are kept, so memory scales
+            # with the number of nonzero values rather than the table size
+            block_rows, block_cols = np.nonzero(block_data)
+            rows.append(block_rows + len(obs_ids))
+            cols.append(block_cols)
+            values.append(block_data[block_rows, block_cols])
+
+            obs_ids.extend(ids)
+            if md is not None:
+                if md_parse is not None:
+                    md = [md_parse(v) for v in md]
+                metadata.extend(md)
 
-            fields = line.strip().split(delim)
-            obs_ids.append(fields[0])
+            if progress is not None:
+                progress(len(obs_ids))
 
-            if last_column_is_numeric:
-                try:
-                    values = list(map(dtype, fields[1:]))
-                except ValueError:
-                    badval, badidx = _identify_bad_value(dtype, fields[1:])
-                    msg = "Invalid value on line %d, column %d, value %s"
-                    raise TypeError(msg % (lineno, badidx+1, badval))
-            else:
-                try:
-                    values = list(map(dtype, fields[1:-1]))
-                except ValueError:
-                    badval, badidx = _identify_bad_value(dtype, fields[1:])
-                    msg = "Invalid value on line %d, column %d, value %s"
-                    raise TypeError(msg % (lineno, badidx+1, badval))
+        if values:
+            values = np.concatenate(values)
+            rows = np.concatenate(rows)
+            cols = np.concatenate(cols)
+        else:
+            values = np.array([], dtype=float)
+            rows = np.array([], dtype=int)
+            cols = np.array([], dtype=int)
+
+        data = coo_arrays_to_sparse((values, (rows, cols)), dtype=values.dtype,
+                                    shape=(len(obs_ids), n_values))
+        if not sparse:
+            data = data.tocoo()
+            data = [[r, c, v] for r, c, v in zip(data.row.tolist(),
+                                                 data.col.tolist(),
+                                                 data.data.tolist())]
 
-                if md_parse is not None:
-                    metadata.append(md_parse(fields[-1]))
-                else:
-                    metadata.append(fields[-1])
-            for column_number in range(0, len(values)):
-                if values[column_number] != dtype(0):
-                    data.append([row_number, column_number,
-                                 values[column_number]])
-            row_number += 1
         return samp_ids, obs_ids, data, metadata, md_name
 
     def to_tsv(self, header_key=None, header_value=None,
-               metadata_formatter=str, observation_column_name='#OTU ID'):
+               metadata_formatter=str, observation_column_name='#OTU ID',
+               direct_io=None):
         """Return self as a string in tab delimited form
 
         Default ``str`` output for the ``Table`` is just row/col ids and table
@@ -4797,11 +6793,16 @@ html
         observation_column_name : str, optional
             Defaults to "#OTU ID". The name of the first column in the output
             table, corresponding to the observation IDs.
+        direct_io : file or file-like object, optional
+            Defaults to ``None``. If `direct_io` is not ``None``, the table is
+            written to `direct_io` a chunk of rows at a time rather than
+            returned, so the whole text is never held in memory.
 
         Returns
         -------
-        str
-            tab delimited representation of the Table
+        str or None
+            tab delimited representation of the Table, or ``None`` if it was
+            written to `direct_io`
 
         Examples
         --------
@@ -4823,7 +6824,338 @@ html
         """
         return self.delimited_self(u'\t', header_key, header_value,
                                    metadata_formatter,
-                                   observation_column_name)
+                                   observation_column_name, direct_io)
+
+
+class LazyTable(Table):
+
+    """A Table backed by an open HDF5 BIOM file
+
+    IDs are read when the table is constructed, but the matrix and metadata
+    are only read from the file when they are needed. Sample vectors are
+    read from the compressed sparse column copy of the matrix stored under
+    ``sample/matrix`` and observation vectors from the compressed sparse row
+    copy under ``observation/matrix``, so that ``data``, ``iter``,
+    ``iter_data``, ``__getitem__`` and ``filter`` only read the parts of the
+    file they need.
+
+    Any other operation which needs the full matrix reads it into memory,
+    after which the table behaves as a regular ``Table``. Tables derived from
+    a ``LazyTable``, e.g. by ``copy`` or ``filter(..., inplace=False)``, are
+    regular in memory ``Table`` objects.
+
+    The file must remain open for as long as the table needs to read from
+    it. ``LazyTable`` can be used as a context manager, in which case the
+    file is closed on exit.
+
+    Parameters
+    ----------
+    h5grp : a h5py ``Group`` or an open h5py ``File``
+        The HDF5 BIOM table to read from
+    parse_fs : dict, optional
+        Specify custom parsing functions for metadata fields, see
+        ``Table.from_hdf5``
+    columnar_metadata : bool, optional
+        Whether to store the metadata as ``ColumnarMetadata`` once read.
+        Defaults to ``False``.
+    metadata : bool or Iterable of str, optional
+        The metadata categories to read, see ``Table.from_hdf5``
+    chunk_size : int, optional
+        The number of vectors to read at a time when iterating over an axis.
+        Defaults to 1024.
+
+    Raises
+    ------
+    RuntimeError
+        If h5py is not in the environment
+    ValueError
+        If h5grp is not a HDF5 file or group
+
+    See Also
+    --------
+    biom.load_table
+    Table.from_hdf5
+
+    Examples
+    --------
+    >>> from biom import load_table
+    >>> with load_table('table.biom', lazy=True) as t: # doctest: +SKIP
+    ...     t.data('S1') # doctest: +SKIP
+    """
+
+    def __init__(self, h5grp, parse_fs=None, columnar_metadata=False,
+                 chunk_size=1024, metadata=None):
+        if not HAVE_H5PY:
+            raise RuntimeError("h5py is not in the environment, HDF5 support "
+                               "is not available")
+
+        import h5py
+        if not isinstance(h5grp, (h5py.Group, h5py.File)):
+            raise ValueError("h5grp does not appear to be an HDF5 file or "
+                             "group")
+
+        self._h5grp = h5grp
+        self._parse_fs = parse_fs
+        self._columnar_metadata = columnar_metadata
+        self._metadata = metadata
+        self._chunk_size = chunk_size
+        self._indptr = {}
+
+        (self.table_id, self.type, self.create_date,
+         self.generated_by) = _hdf5_table_attrs(h5grp)
+        self.format_version = __format_version__
+
+        self._observation_ids = np.asarray(
+            _hdf5_ids(h5grp['observation']), dtype=object)
+        self._sample_ids = np.asarray(_hdf5_ids(h5grp['sample']),
+                                      dtype=object)
+
+        self._observation_group_metadata = dict(
+            h5grp['observation/group-metadata'].items()) or None
+        self._sample_group_metadata = dict(
+            h5grp['sample/group-metadata'].items()) or None
+
+        self._index_ids()
+
+    def __getattr__(self, name):
+        # only called when an attribute is not set, which for the matrix and
+        # the metadata means they have not been read yet
+        if name == '_data':
+            value = self._read_matrix()
+        elif name == '_sample_metadata':
+            value = self._read_metadata('sample')
+        elif name == '_observation_metadata':
+            value = self._read_metadata('observation')
+        else:
+            raise AttributeError(name)
+
+        setattr(self, name, value)
+        return value
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
+
+    def close(self):
+        """Close the underlying HDF5 file"""
+        self._h5grp.file.close()
+
+    @property
+    def _constructor(self):
+        return Table
+
+    @property
+    def _is_loaded(self):
+        """Whether the matrix has been read into memory"""
+        return '_data' in self.__dict__
+
+    @property
+    def shape(self):
+        if self._is_loaded:
+            return self._data.shape
+        return (len(self._observation_ids), len(self._sample_ids))
+
+    @property
+    def dtype(self):
+        if self._is_loaded:
+            return self._data.dtype
+        return _stored_dtype(self._h5grp['observation/matrix/data'].dtype)
+
+    @property
+    def nnz(self):
+        if self._is_loaded:
+            return super(LazyTable, self).nnz
+        return self._h5grp['observation/matrix/data'].shape[0]
+
+    def _read_matrix(self):
+        """Read the full matrix in CSR format"""
+        grp = self._h5grp['observation/matrix']
+        data = grp['data'][:].astype(self.dtype, copy=False)
+        return csr_matrix((data, grp['indices'][:], grp['indptr'][:]),
+                          shape=self.shape)
+
+    def _read_metadata(self, axis):
+        """Read and cast the metadata of an axis"""
+        md = _hdf5_metadata(self._h5grp[axis], len(self.ids(axis=axis)),
+                            self._parse_fs, self._columnar_metadata,
+                            _metadata_categories(self._metadata, axis))
+        if md is None or self._columnar_metadata:
+            return md
+
+        default_md = []
+        for item in md:
+            d = defaultdict(lambda: None)
+            d.update(item)
+            default_md.append(d)
+        return tuple(default_md)
+
+    def _read(self, axis, idx):
+        """Read the vectors at positions idx of axis as a sparse matrix
+
+        Sample vectors are returned as columns of a CSC matrix, observation
+        vectors as rows of a CSR matrix.
+        """
+        if axis not in self._indptr:
+            self._indptr[axis] = self._h5grp['%s/matrix/indptr' % axis][:]
+
+        cs = _hdf5_read_subset(self._h5grp['%s/matrix' % axis],
+                               self._indptr[axis], idx)
+        if axis == 'sample':
+            return csc_matrix(cs, shape=(self.shape[0], len(idx)))
+        else:
+            return csr_matrix(cs, shape=(len(idx), self.shape[1]))
+
+    def _read_vector(self, axis, idx):
+        """Read a single vector, checking the position is valid"""
+        n = self.length(axis=axis)
+        if idx < 0:
+            idx += n
+        if not 0 <= idx < n:
+            raise IndexError("index out of bounds")
+        return self._read(axis, [idx])
+
+    def __getitem__(self, args):
+        if not self._is_loaded and not self.is_empty():
+            try:
+                row, col = args
+            except:  # noqa
+                row = col = slice(None)
+
+            if not isinstance(row, slice) and not isinstance(col, slice):
+                return self._get_row(row)[0, col]
+
+        return super(LazyTable, self).__getitem__(args)
+
+    def _get_row(self, row_idx):
+        if self._is_loaded:
+            return super(LazyTable, self)._get_row(row_idx)
+        return self._read_vector('observation', row_idx)
+
+    def _get_col(self, col_idx):
+        if self._is_loaded:
+            return super(LazyTable, self)._get_col(col_idx)
+        return self._read_vector('sample', col_idx)
+
+    def _iter_chunks(self, axis):
+        """Yield the vectors of axis, reading them a chunk at a time"""
+        n = self.length(axis=axis)
+        for start in range(0, n, self._chunk_size):
+            idx = np.arange(start, min(start + self._chunk_size, n))
+            chunk = self._read(axis, idx)
+            for i in range(len(idx)):
+                if axis == 'sample':
+                    yield chunk.getcol(i).transpose(copy=True)
+                else:
+                    yield chunk.getrow(i)
+
+    def _iter_samp(self):
+        if self._is_loaded:
+            return super(LazyTable, self)._iter_samp()
+        return self._iter_chunks('sample')
+
+    def _iter_obs(self):
+        if self._is_loaded:
+            return super(LazyTable, self)._iter_obs()
+        return self._iter_chunks('observation')
+
+    def copy(self):
+        """Returns an in memory copy of the table"""
+        data = self._data.copy() if self._is_loaded else self._read_matrix()
+        return Table(data,
+                     self.ids(axis='observation').copy(),
+                     self.ids().copy(),
+                     deepcopy(self._get_metadata(axis='observation')),
+                     deepcopy(self._get_metadata()),
+                     self.table_id,
+                     type=self.type,
+                     dtype=data.dtype)
+
+    def filter(self, ids_to_keep=None, axis='sample', invert=False,
+               inplace=True, vectorized=False, min_total=None, min_nnz=None):
+        """Filter a table based on a function or iterable.
+
+        Only the vectors which are kept are read from the file. If
+        `ids_to_keep` is a function, or `min_total` or `min_nnz` are set, the
+        vectors are read a chunk at a time to evaluate them; a vectorized
+        function is given all the vectors at once. See ``Table.filter`` for a
+        description of the parameters.
+
+        Returns
+        -------
+        biom.Table
+            Returns itself if `inplace`, else returns a new, in memory,
+            filtered table.
+        """
+        if self._is_loaded:
+            return super(LazyTable, self).filter(ids_to_keep, axis=axis,
+                                                 invert=invert,
+                                                 inplace=inplace,
+                                                 vectorized=vectorized,
+                                                 min_total=min_total,
+                                                 min_nnz=min_nnz)
+
+        ids = self.ids(axis=axis)
+        metadata = self.metadata(axis=axis)
+        index = self._index(axis=axis)
+        invert = bool(invert)
+
+        if vectorized and ids_to_keep is not None:
+            keep = _filter_mask(self._read(axis, np.arange(len(ids))), ids,
+                                metadata, index, ids_to_keep, vectorized=True)
+        elif ids_to_keep is None or isinstance(ids_to_keep, Iterable):
+            keep = _filter_mask(None, ids, None, index, ids_to_keep)
+        elif isinstance(ids_to_keep, FunctionType):
+            md = metadata if metadata is not None else (None,) * len(ids)
+            keep = np.fromiter(
+                (bool(ids_to_keep(v, i, m))
+                 for v, i, m in zip(self.iter_data(axis=axis), ids, md)),
+                dtype=bool, count=len(ids))
+        else:
+            raise TypeError("ids_to_keep must be an iterable or a function")
+
+        if min_total is not None or min_nnz is not None:
+            for start in range(0, len(ids), self._chunk_size):
+                idx = np.arange(start, min(start + self._chunk_size, len(ids)))
+                keep[idx] &= _filter_mask(self._read(axis, idx), ids[idx],
+                                          None, None, None,
+                                          min_total=min_total,
+                                          min_nnz=min_nnz)
+
+        keep = np.flatnonzero(keep ^ invert)
+        mat = self._read(axis, keep)
+        ids = ids[keep]
+        if isinstance(metadata, ColumnarMetadata):
+            metadata = metadata[keep]
+        elif metadata is not None:
+            metadata = tuple(metadata[i] for i in keep)
+
+        if not inplace:
+            if axis == 'sample':
+                obs_ids, samp_ids = self.ids(axis='observation'), ids
+                obs_md = self._get_metadata(axis='observation')
+                samp_md = metadata
+            else:
+                obs_ids, samp_ids = ids, self.ids()
+                obs_md, samp_md = metadata, self._get_metadata()
+
+            return Table(mat, obs_ids.copy(), samp_ids.copy(),
+                         deepcopy(obs_md), deepcopy(samp_md), self.table_id,
+                         type=self.type, dtype=mat.dtype)
+
+        self._data = mat
+        if axis == 'sample':
+            self._sample_ids = ids
+            self._sample_metadata = metadata
+        else:
+            self._observation_ids = ids
+            self._observation_metadata = metadata
+
+        self._index_ids()
+        errcheck(self)
+
+        return self
 
 
 def coo_arrays_to_sparse(data, dtype=np.float64, shape=None):
@@ -159,6 +159,9 @@ def flatten(items):
     return result
 
 
+_NATSORT_CHUNKS = re.compile(r'(\d+(?:\.\d+)?)')
+
+
 def _natsort_key(item):
     """Provides normalized version of item for sorting with digits.
 
@@ -169,12 +172,7 @@ def _natsort_key(item):
     BSD license).
     """
     item = str(item)
-    try:
-        chunks = re.split('(\d+(?:\.\d+)?)', item)
-    except TypeError:
-        # if item is a tuple or list (i.e., indexable, but not a string)
-        # work with the first element
-        chunks = re.split('(\d+(?:\.\d+)?)', item[0])
+    chunks = _NATSORT_CHUNKS.split(item)
     for ii in range(len(chunks)):
         if chunks[ii] and chunks[ii][0] in '0123456789':
             if '.' in chunks[ii]:
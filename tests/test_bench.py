@@ -0,0 +1,94 @@
+#!/usr/bin/env python
+# -----------------------------------------------------------------------------
+# Copyright (c) 2011-2017, The BIOM Format Development Team.
+#
+# Distributed under the terms of the Modified BSD License.
+#
+# The full license is in the file COPYING.txt, distributed with this software.
+# -----------------------------------------------------------------------------
+
+import os
+import json
+import shutil
+from tempfile import mkdtemp
+from unittest import TestCase, main
+
+from biom.bench import (find_bench_tables, run_benchmarks, write_results,
+                        load_results, compare_to_baseline, DEFAULT_BENCH_DIR,
+                        RESULT_FIELDS)
+
+
+class BenchTests(TestCase):
+    def setUp(self):
+        self.tmpdir = mkdtemp()
+
+    def tearDown(self):
+        shutil.rmtree(self.tmpdir)
+
+    def test_find_bench_tables(self):
+        obs = find_bench_tables(DEFAULT_BENCH_DIR, max_size=100)
+        self.assertEqual(len(obs), 3)
+        self.assertEqual([t['density'] for t in obs], [0.001, 0.01, 0.1])
+        for t in obs:
+            self.assertEqual((t['n_observations'], t['n_samples']), (10, 10))
+            self.assertTrue(t['json'].endswith('_bench.biom.gz'))
+            self.assertTrue(t['hdf5'].endswith('_bench_hdf5.biom.gz'))
+
+        obs = find_bench_tables(DEFAULT_BENCH_DIR, max_size=1000)
+        sizes = [t['n_observations'] * t['n_samples'] for t in obs]
+        self.assertEqual(sizes, sorted(sizes))
+        self.assertTrue(max(sizes) <= 1000)
+
+    def test_run_benchmarks(self):
+        obs = run_benchmarks(DEFAULT_BENCH_DIR, ['to_json', 'collapse'],
+                             max_size=100, repeat=2)
+        self.assertEqual(len(obs), 6)
+        for r in obs:
+            self.assertEqual(list(r), RESULT_FIELDS)
+            self.assertIn(r['benchmark'], ('to_json', 'collapse'))
+            self.assertEqual(r['repeat'], 2)
+            self.assertIsNone(r['error'])
+            self.assertTrue(r['min'] <= r['median'] <= r['max'])
+
+        with self.assertRaises(KeyError):
+            run_benchmarks(DEFAULT_BENCH_DIR, ['does not exist'])
+
+    def test_write_load_results(self):
+        res = run_benchmarks(DEFAULT_BENCH_DIR, ['norm'], max_size=100,
+                             repeat=1)
+        fp = os.path.join(self.tmpdir, 'res.json')
+        write_results(res, fp)
+        with open(fp) as f:
+            self.assertIn('environment', json.load(f))
+        self.assertEqual(load_results(fp), res)
+
+        fp = os.path.join(self.tmpdir, 'res.csv')
+        write_results(res, fp)
+        with open(fp) as f:
+            lines = f.read().splitlines()
+        self.assertEqual(lines[0], ','.join(RESULT_FIELDS))
+        self.assertEqual(len(lines), 4)
+
+        with self.assertRaises(ValueError):
+            write_results(res, fp, fmt='xml')
+
+    def test_compare_to_baseline(self):
+        def res(name, t, error=None):
+            return {'benchmark': name, 'n_observations': 10, 'n_samples': 10,
+                    'density': 0.1, 'repeat': 1, 'min': t, 'median': t,
+                    'max': t, 'error': error}
+
+        baseline = [res('a', 1.0), res('b', 1.0), res('c', 1e-5),
+                    res('d', 1.0)]
+        current = [res('a', 1.1), res('b', 2.0), res('c', 1e-4),
+                   res('d', None, 'ValueError: x'), res('e', 5.0)]
+
+        obs = compare_to_baseline(current, baseline, threshold=1.25)
+        self.assertEqual([r['benchmark'] for r in obs], ['b', 'd'])
+        self.assertEqual(obs[0]['ratio'], 2.0)
+        self.assertEqual(obs[0]['baseline'], 1.0)
+        self.assertIsNone(obs[1]['ratio'])
+
+
+if __name__ == '__main__':
+    main()
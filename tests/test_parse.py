@@ -9,14 +9,17 @@
 # -----------------------------------------------------------------------------
 
 import os
-from io import StringIO
+from io import StringIO, BytesIO
 import json
+from collections import OrderedDict
 from unittest import TestCase, main
 
 import numpy as np
 import numpy.testing as npt
 
-from biom.parse import generatedby, MetadataMap, parse_biom_table, parse_uc
+from biom.parse import (generatedby, MetadataMap, parse_biom_table, parse_uc,
+                        direct_subset_json, _parse_json_table, load_table)
+from biom.exception import BiomParseException
 from biom.table import Table
 from biom.util import HAVE_H5PY, __version__
 if HAVE_H5PY:
@@ -199,6 +202,88 @@ class ParseTests(TestCase):
         tab2 = parse_biom_table(tablestring)
         self.assertEqual(tab1, tab2)
 
+    def test_parse_json_table(self):
+        """the streaming parser matches json.load"""
+        t = Table(np.array([[0, 1.5, 2], [3, 0, 0], [0, 0, 0]]),
+                  ['O1', 'O2', 'O3'], ['S1', 'S2', 'S3'],
+                  [{'taxonomy': ['k__a', 'p__[b]']}, {'taxonomy': None},
+                   {'taxonomy': [u'k__\xe9']}], None, type='OTU table')
+        data_first = u'''{"data": [[0,1,1e2] , [1,0,-2.5E-1],[1, 2, 3]],
+            "shape": [2, 3], "matrix_type": "sparse", "type": null,
+            "matrix_element_type": "float", "generated_by": "foo",
+            "rows": [{"id": "a", "metadata": null},
+                     {"id": "b", "metadata": {"x": [[1]]}}],
+            "columns": [{"id": "c", "metadata": null},
+                        {"id": "d", "metadata": null},
+                        {"id": "e", "metadata": null}]}'''
+        dense = json.dumps({"type": None, "generated_by": "foo",
+                            "matrix_type": "dense",
+                            "matrix_element_type": "int", "shape": [2, 2],
+                            "data": [[1, 0], [0, 4]],
+                            "rows": [{"id": "a", "metadata": None},
+                                     {"id": "b", "metadata": None}],
+                            "columns": [{"id": "c", "metadata": None},
+                                        {"id": "d", "metadata": None}]})
+        empty = Table(np.zeros((0, 0)), [], []).to_json('foo')
+
+        for doc in (self.biom_minimal_sparse, t.to_json('foo'), data_first,
+                    u'%s' % dense, empty):
+            exp_json = json.load(StringIO(doc),
+                                 object_pairs_hook=OrderedDict)
+            exp = Table.from_json(exp_json)
+            for chunk_size in (1, 7, 64, 2 ** 20):
+                obs_json = _parse_json_table(StringIO(doc),
+                                             chunk_size=chunk_size)
+                self.assertEqual(list(obs_json), list(exp_json))
+                for key in obs_json:
+                    if key != 'data':
+                        self.assertEqual(obs_json[key], exp_json[key])
+                self.assertEqual(Table.from_json(obs_json), exp)
+
+        self.assertEqual(parse_biom_table(StringIO(self.biom_minimal_sparse)),
+                         Table.from_json(json.loads(self.biom_minimal_sparse)))
+
+        for bad in (u'{"data": [[0, 1, "a"]], "shape": [1, 2]}',
+                    u'{"data": [[0, 1, 1], [0, 1]], "shape": [1, 2]}',
+                    u'{"data": [[0, 1, [1]]], "shape": [1, 2]}',
+                    u'{"data": [[0, 1, 1]',
+                    u'{"shape": [1, 2] "data": []}'):
+            with self.assertRaises(BiomParseException):
+                _parse_json_table(StringIO(bad), chunk_size=4)
+
+    def test_direct_subset_json(self):
+        t = Table(np.array([[0, 1.5, 2], [3, 0, 0], [0, 4, 0]]),
+                  [u'O1', u'O\xe9', u'O3'], [u'S1', u'S\u2603', u'S3'],
+                  [{'taxonomy': ['k__a', 'p__[b]']}, {'taxonomy': None},
+                   {'taxonomy': [u'k__\xe9']}], None, type='OTU table')
+        escaped = t.to_json('foo').encode('utf-8')
+        raw = json.dumps(json.loads(t.to_json('foo')),
+                         ensure_ascii=False).encode('utf-8')
+
+        for doc in (escaped, raw):
+            for chunk_size in (3, 64, 2 ** 20):
+                for axis, ids in (('observation', [u'O3', u'O\xe9']),
+                                  ('sample', [u'S\u2603']),
+                                  ('sample', [])):
+                    obs = u''.join(direct_subset_json(BytesIO(doc), ids, axis,
+                                                      chunk_size=chunk_size))
+                    obs = parse_biom_table(StringIO(obs))
+                    exp = t.filter(ids, axis=axis, inplace=False)
+                    self.assertEqual(obs, exp)
+
+        with self.assertRaises(KeyError):
+            direct_subset_json(BytesIO(escaped), ['O1', 'x'], 'observation')
+        with self.assertRaises(ValueError):
+            direct_subset_json(BytesIO(escaped), ['O1'], 'foo')
+        with self.assertRaises(ValueError):
+            direct_subset_json(BytesIO(b'{"data": []}'), [], 'sample')
+        dense = json.loads(t.to_json('foo'))
+        dense['matrix_type'] = 'dense'
+        dense['data'] = t.matrix_data.toarray().tolist()
+        with self.assertRaises(ValueError):
+            direct_subset_json(BytesIO(json.dumps(dense).encode('utf-8')),
+                               ['O1'], 'observation')
+
     def test_parse_biom_table_subset(self):
         """test the biom table parser subsetting"""
         tab = parse_biom_table(StringIO(self.biom_minimal_sparse),
@@ -295,6 +380,73 @@ class ParseTests(TestCase):
         t_json = parse_biom_table(t_json_stringio)
         self.assertEqual(t, t_json)
 
+    def test_parse_biom_table_metadata(self):
+        """parse_biom_table only loads the requested metadata"""
+        t = parse_biom_table(self.classic_otu_table1_w_tax)
+
+        # TSV
+        obs = parse_biom_table(self.classic_otu_table1_w_tax,
+                               metadata=False)
+        self.assertEqual(obs.metadata(axis='observation'), None)
+        npt.assert_equal(obs.matrix_data.toarray(), t.matrix_data.toarray())
+        obs = parse_biom_table(self.classic_otu_table1_w_tax,
+                               metadata={'sample': ['Consensus Lineage']})
+        self.assertEqual(obs.metadata(axis='observation'), None)
+        obs = parse_biom_table(self.classic_otu_table1_w_tax,
+                               metadata={'observation': ['taxonomy']})
+        self.assertEqual(obs.metadata(axis='observation'), None)
+        obs = parse_biom_table(self.classic_otu_table1_w_tax,
+                               metadata=['Consensus Lineage'])
+        self.assertEqual(obs, t)
+
+        # JSON
+        t = parse_biom_table(StringIO(self.biom_minimal_sparse))
+        obs = parse_biom_table(StringIO(self.biom_minimal_sparse),
+                               metadata=False)
+        self.assertEqual(obs.metadata(), None)
+        self.assertEqual(obs.metadata(axis='observation'), None)
+        npt.assert_equal(obs.matrix_data.toarray(), t.matrix_data.toarray())
+        obs = parse_biom_table(self.biom_minimal_sparse,
+                               metadata={'observation': ['taxonomy']})
+        self.assertEqual(obs.metadata(), None)
+        self.assertEqual(obs.metadata(axis='observation'),
+                         t.metadata(axis='observation'))
+
+    @npt.dec.skipif(HAVE_H5PY is False, msg='H5PY is not installed')
+    def test_load_table_metadata(self):
+        """load_table passes load_metadata on to every format"""
+        cwd = os.getcwd()
+        if '/' in __file__[1:]:
+            os.chdir(__file__.rsplit('/', 1)[0])
+
+        for path in ('test_data/test.biom', 'test_data/test.json'):
+            t = load_table(path)
+            obs = load_table(path, load_metadata=False)
+            self.assertEqual(obs.metadata(), None)
+            self.assertEqual(obs.metadata(axis='observation'), None)
+            npt.assert_equal(obs.matrix_data.toarray(),
+                             t.matrix_data.toarray())
+            npt.assert_equal(obs.ids(), t.ids())
+
+            obs = load_table(path, load_metadata={'sample': ['BODY_SITE'],
+                                                  'observation': []})
+            self.assertEqual([md['BODY_SITE'] for md in obs.metadata()],
+                             [md['BODY_SITE'] for md in t.metadata()])
+            self.assertEqual(list(obs.metadata()[0]), ['BODY_SITE'])
+            self.assertEqual(obs.metadata(axis='observation'), None)
+
+            obs = load_table(path, load_metadata=['taxonomy'])
+            self.assertEqual(obs.metadata(), None)
+            self.assertEqual(obs.metadata(axis='observation'),
+                             t.metadata(axis='observation'))
+
+        with load_table('test_data/test.biom', lazy=True,
+                        load_metadata={'observation': ['taxonomy']}) as lazy:
+            self.assertEqual(lazy.metadata(), None)
+            self.assertEqual(lazy.metadata(axis='observation'),
+                             t.metadata(axis='observation'))
+        os.chdir(cwd)
+
 
 legacy_otu_table1 = """# some comment goes here
 #OTU ID	Fing	Key	NA	Consensus Lineage
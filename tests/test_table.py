@@ -10,6 +10,9 @@
 # ----------------------------------------------------------------------------
 
 import os
+from copy import deepcopy
+from functools import reduce
+from operator import add, mul
 from json import loads
 from tempfile import NamedTemporaryFile
 from unittest import TestCase, main
@@ -21,18 +24,23 @@ import numpy.testing as npt
 import numpy as np
 from scipy.sparse import lil_matrix, csr_matrix, csc_matrix
 import scipy.sparse
+from scipy.spatial.distance import pdist
 import pandas.util.testing as pdt
 import pandas as pd
 
 from biom import example_table, load_table
 from biom.exception import (UnknownAxisError, UnknownIDError, TableException,
                             DisjointIDError)
-from biom.util import unzip, HAVE_H5PY, H5PY_VLEN_STR
-from biom.table import (Table, prefer_self, index_list, list_nparray_to_sparse,
+from biom.util import unzip, HAVE_H5PY, H5PY_VLEN_STR, get_data_path
+from biom.table import (Table, LazyTable, ColumnarMetadata, MetadataRow,
+                        prefer_self, index_list, list_nparray_to_sparse,
                         list_dict_to_sparse, dict_to_sparse,
                         coo_arrays_to_sparse, list_list_to_sparse,
                         nparray_to_sparse, list_sparse_to_sparse,
-                        _identify_bad_value)
+                        _identify_bad_value, _hdf5_read_subset, _json_triples,
+                        _delimited_rows, vlen_list_of_str_formatter,
+                        vlen_list_of_str_parser, _parse_vlen_list_of_str,
+                        _permute_compressed)
 from biom.parse import parse_biom_table
 from biom.err import errstate
 
@@ -585,6 +593,23 @@ class TableTests(TestCase):
         obs = self.simple_derived.max('whole')
         npt.assert_equal(obs, exp)
 
+    def test_min_max_unstored(self):
+        t = Table(np.array([[0, 2, -1], [0, 0, 0], [0, 4, 3]]),
+                  ['a', 'b', 'c'], ['x', 'y', 'z'])
+        npt.assert_equal(t.min('sample'), np.array([0, 2, -1]))
+        npt.assert_equal(t.max('sample'), np.array([0, 4, 3]))
+        npt.assert_equal(t.min('observation'), np.array([-1, 0, 3]))
+        npt.assert_equal(t.max('observation'), np.array([2, 0, 4]))
+        self.assertEqual(t.min('whole'), -1)
+        self.assertEqual(t.max('whole'), 4)
+
+        t = Table(np.zeros((2, 2)), ['a', 'b'], ['x', 'y'])
+        npt.assert_equal(t.min('sample'), np.array([0, 0]))
+        self.assertEqual(t.max('whole'), 0)
+
+        with self.assertRaises(UnknownAxisError):
+            t.min('foo')
+
     @npt.dec.skipif(HAVE_H5PY is False, msg='H5PY is not installed')
     def test_from_hdf5_non_hdf5_file_or_group(self):
         with self.assertRaises(ValueError):
@@ -618,6 +643,48 @@ class TableTests(TestCase):
         for m in t.metadata():
             self.assertIn(m['BODY_SITE'], ('GUT', 'SKIN'))
 
+    @npt.dec.skipif(HAVE_H5PY is False, msg='H5PY is not installed')
+    def test_from_hdf5_metadata_categories(self):
+        cwd = os.getcwd()
+        if '/' in __file__:
+            os.chdir(__file__.rsplit('/', 1)[0])
+        exp = Table.from_hdf5(h5py.File('test_data/test.biom'))
+        obs_none = Table.from_hdf5(h5py.File('test_data/test.biom'),
+                                   metadata=False)
+        obs_some = Table.from_hdf5(h5py.File('test_data/test.biom'),
+                                   metadata=['taxonomy', 'BODY_SITE',
+                                             'missing'])
+        obs_col = Table.from_hdf5(h5py.File('test_data/test.biom'),
+                                  metadata='BODY_SITE',
+                                  columnar_metadata=True)
+        os.chdir(cwd)
+
+        self.assertEqual(obs_none.metadata(), None)
+        self.assertEqual(obs_none.metadata(axis='observation'), None)
+        npt.assert_equal(obs_none.matrix_data.toarray(),
+                         exp.matrix_data.toarray())
+
+        self.assertEqual(obs_some.metadata(axis='observation'),
+                         exp.metadata(axis='observation'))
+        self.assertEqual([dict(m) for m in obs_some.metadata()],
+                         [{'BODY_SITE': m['BODY_SITE']}
+                          for m in exp.metadata()])
+
+        self.assertEqual(obs_col.metadata(axis='observation'), None)
+        self.assertEqual(obs_col.metadata().categories, ['BODY_SITE'])
+
+    def test_parse_vlen_list_of_str(self):
+        data = np.array([[b'k__a', u'p__\xe9'.encode('utf8'), b''],
+                         [b'', b'', b''],
+                         [b'k__a', b'', b'c__c']], dtype=object)
+        exp = [vlen_list_of_str_parser(row) for row in data]
+        self.assertEqual(exp, [['k__a', u'p__\xe9'], None, ['k__a', 'c__c']])
+        self.assertEqual(_parse_vlen_list_of_str(data), exp)
+
+        data = np.array([['k__a', 'p__b'], ['k__c', '']], dtype=object)
+        self.assertEqual(_parse_vlen_list_of_str(data),
+                         [['k__a', 'p__b'], ['k__c']])
+
     @npt.dec.skipif(HAVE_H5PY is False, msg='H5PY is not installed')
     def test_from_hdf5_issue_731(self):
         t = Table.from_hdf5(h5py.File('test_data/test.biom'))
@@ -1026,6 +1093,43 @@ class TableTests(TestCase):
                          ({'taxonomy': ['foo', 'bar']},
                           {'taxonomy': ['foo', 'baz']}))
 
+    @npt.dec.skipif(HAVE_H5PY is False, msg='H5PY is not installed')
+    def test_vlen_list_of_str_formatter_blocks(self):
+        md = [{'taxonomy': ['k__a', u'p__\xe9']}, {'taxonomy': None},
+              {'taxonomy': ('k__a', 'p__b', 'c__c')}, {'taxonomy': []},
+              {'taxonomy': ['k__a']}]
+        exp = [[b'k__a', u'p__\xe9'.encode('utf8'), b''], [b'', b'', b''],
+               [b'k__a', b'p__b', b'c__c'], [b'', b'', b''],
+               [b'k__a', b'', b'']]
+        for block_size in (1, 2, 5, 10):
+            with NamedTemporaryFile() as tmpfile:
+                with h5py.File(tmpfile.name, 'w') as h5:
+                    vlen_list_of_str_formatter(h5, 'taxonomy', md, 'gzip',
+                                               block_size=block_size)
+                    obs = [[v if isinstance(v, bytes) else v.encode('utf8')
+                            for v in row]
+                           for row in h5['metadata/taxonomy'][:].tolist()]
+            self.assertEqual(obs, exp)
+
+    @npt.dec.skipif(HAVE_H5PY is False, msg='H5PY is not installed')
+    def test_to_hdf5_metadata_types(self):
+        t = Table(np.array([[0, 1], [2, 3], [4, 5]]), ['a', 'b', 'c'],
+                  ['d', 'e'],
+                  [{'confidence': 0.5, 'count': 3, 'rank': 'g'},
+                   {'confidence': 1, 'count': 4, 'rank': u'\xe9'},
+                   {'confidence': 0.25, 'count': 5, 'rank': 'g'}])
+
+        with NamedTemporaryFile() as tmpfile:
+            with h5py.File(tmpfile.name, 'w') as h5:
+                t.to_hdf5(h5, 'tests')
+            with h5py.File(tmpfile.name, 'r') as h5:
+                grp = h5['observation/metadata']
+                self.assertEqual(grp['confidence'].dtype, np.float64)
+                self.assertEqual(grp['count'].dtype.kind, 'i')
+            obs = load_table(tmpfile.name)
+        self.assertEqual(obs.metadata(axis='observation'),
+                         t.metadata(axis='observation'))
+
     @npt.dec.skipif(HAVE_H5PY is False, msg='H5PY is not installed')
     def test_to_hdf5_general_fallback_to_list(self):
         st_rich = Table(self.vals,
@@ -1073,6 +1177,51 @@ class TableTests(TestCase):
                 self.assertEqual(m1['barcode'].lower(), m2['barcode'])
             h5.close()
 
+    @npt.dec.skipif(HAVE_H5PY is False, msg='H5PY is not installed')
+    def test_to_hdf5_compression(self):
+        """Write the matrices with the requested filters and chunks"""
+        data = np.arange(1200, dtype=float).reshape(40, 30) % 7
+        t = Table(data, ['O%d' % i for i in range(40)],
+                  ['S%d' % i for i in range(30)],
+                  [{'taxonomy': ['k__a', 'p__%d' % i]} for i in range(40)])
+        t_data = t._data
+        t_format = t._data.format
+
+        params = [({}, ('gzip', 4, False, 65536)),
+                  ({'compress': False}, (None, None, False, None)),
+                  ({'compress': 9, 'shuffle': True, 'chunk_size': 100},
+                   ('gzip', 9, True, 100)),
+                  ({'compress': 'lzf', 'shuffle': True, 'chunk_size': 100},
+                   ('lzf', None, True, 100)),
+                  ({'n_threads': 3, 'chunk_size': 100},
+                   ('gzip', 4, False, 100)),
+                  ({'compress': 1, 'n_threads': 2, 'shuffle': True,
+                    'chunk_size': 64}, ('gzip', 1, True, 64))]
+        for kwargs, exp in params:
+            with NamedTemporaryFile() as tmpfile:
+                with h5py.File(tmpfile.name, 'w') as h5:
+                    t.to_hdf5(h5, 'tests', **kwargs)
+
+                with h5py.File(tmpfile.name, 'r') as h5:
+                    for axis in ('observation', 'sample'):
+                        ds = h5['%s/matrix/data' % axis]
+                        chunks = ds.chunks and ds.chunks[0]
+                        self.assertEqual((ds.compression,
+                                          ds.compression_opts, ds.shuffle,
+                                          chunks),
+                                         exp[:3] + (exp[3] and
+                                                    min(exp[3], t.nnz), ))
+                    obs = Table.from_hdf5(h5)
+
+            self.assertEqual(obs, t)
+            self.assertIs(t._data, t_data)
+            self.assertEqual(t._data.format, t_format)
+
+        with six.assertRaisesRegex(self, ValueError, 'Unknown compression'):
+            with NamedTemporaryFile() as tmpfile:
+                with h5py.File(tmpfile.name, 'w') as h5:
+                    t.to_hdf5(h5, 'tests', compress='bz2')
+
     @npt.dec.skipif(HAVE_H5PY is False, msg='H5PY is not installed')
     def test_to_hdf5(self):
         """Write a file"""
@@ -1262,6 +1411,43 @@ class TableTests(TestCase):
         obs = self.st1.to_tsv(observation_column_name='Taxon')
         self.assertEqual(obs, exp)
 
+    def test_to_tsv_direct_io(self):
+        t = Table(np.array([[0, 1.5, 0], [2, 0, 3], [0, 0, 0]]),
+                  ['O1', 'O2', 'O3'], ['S1', 'S2', 'S3'],
+                  [{'tax': 'a'}, {'tax': 'b'}, {'tax': 'c'}])
+        exp = '\n'.join(
+            ["# Constructed from biom file",
+             "#OTU ID\tS1\tS2\tS3\ttaxonomy",
+             "O1\t0.0\t1.5\t0.0\ta",
+             "O2\t2.0\t0.0\t3.0\tb",
+             "O3\t0.0\t0.0\t0.0\tc"])
+
+        fh = StringIO()
+        obs = t.to_tsv(header_key='tax', header_value='taxonomy',
+                       direct_io=fh)
+        self.assertEqual(obs, None)
+        self.assertEqual(fh.getvalue(), exp)
+        self.assertEqual(t.to_tsv(header_key='tax', header_value='taxonomy'),
+                         exp)
+
+        # the data of a transposed table are held column-wise
+        obs = t.transpose().transpose().to_tsv(header_key='tax',
+                                               header_value='taxonomy')
+        self.assertEqual(obs, exp)
+
+    def test_delimited_rows(self):
+        mat = csr_matrix(np.array([[0, 1.5, 0], [2, 0, 3], [0, 0, 0]]))
+        exp = [['0.0,1.5,0.0', '2.0,0.0,3.0', '0.0,0.0,0.0']]
+        self.assertEqual(list(_delimited_rows(mat, ',')), exp)
+
+        exp = [['0.0,1.5,0.0'], ['2.0,0.0,3.0'], ['0.0,0.0,0.0']]
+        self.assertEqual(list(_delimited_rows(mat, ',', chunk_cells=2)), exp)
+        self.assertEqual(list(_delimited_rows(mat.tocsc(), ',',
+                                              chunk_cells=2)), exp)
+
+        mat = csr_matrix(np.array([[0, 4], [5, 0]], dtype=int))
+        self.assertEqual(list(_delimited_rows(mat, '\t')), [['0\t4', '5\t0']])
+
     def test_group_metadata_sample(self):
         """Returns the sample group metadata"""
         self.assertEqual(self.st_group_rich.group_metadata(),
@@ -1339,6 +1525,221 @@ class TableTests(TestCase):
         with self.assertRaises(UnknownIDError):
             self.simple_derived.index(5, 'observation')
 
+    def test_from_arrays(self):
+        from collections import defaultdict
+        data = csc_matrix(np.array([[0., 1., 2.], [3., 0., 5.]]))
+        md = [{'a': 1}, None, defaultdict(lambda: None, a=3)]
+        obs = Table.from_arrays(data, ['O1', 'O2'], ['S1', 'S2', 'S3'],
+                                sample_metadata=md, table_id='x')
+        self.assertIs(obs.matrix_data, data)
+        exp = Table(data, ['O1', 'O2'], ['S1', 'S2', 'S3'],
+                    sample_metadata=md, table_id='x')
+        self.assertEqual(obs, exp)
+        self.assertIs(obs.metadata()[2], md[2])
+        self.assertEqual(obs.metadata('S2'), {})
+        self.assertEqual(obs.metadata('S1')['b'], None)
+        self.assertEqual(obs.metadata(axis='observation'), None)
+        self.assertEqual(obs.index('S3', 'sample'), 2)
+        self.assertEqual(obs.index('O2', 'observation'), 1)
+
+        data = data.tocsc()
+        obs = Table.from_arrays(data, ['O1', 'O2'], ['S1', 'S2', 'S3'],
+                                copy=True)
+        self.assertIsNot(obs.matrix_data, data)
+        self.assertIsNot(obs.matrix_data.data, data.data)
+        exp = Table(data, ['O1', 'O2'], ['S1', 'S2', 'S3'])
+        self.assertEqual(obs, exp)
+
+        csr = data.tocsr()
+        obs = Table.from_arrays((csr.data, csr.indices, csr.indptr),
+                                ['O1', 'O2'], ['S1', 'S2', 'S3'],
+                                [None, None], [None] * 3)
+        self.assertEqual(obs, exp)
+        self.assertEqual(obs.matrix_data.format, 'csr')
+        self.assertEqual(obs.metadata(), None)
+
+        obs = Table.from_arrays(data.tocoo().astype(np.int32), ['O1', 'O2'],
+                                ['S1', 'S2', 'S3'])
+        self.assertEqual(obs.matrix_data.format, 'csr')
+        self.assertEqual(obs.dtype, np.float64)
+
+        # the storage dtypes are kept, unless another is asked for
+        obs = Table.from_arrays(data.astype(np.uint32), ['O1', 'O2'],
+                                ['S1', 'S2', 'S3'])
+        self.assertEqual(obs.dtype, np.uint32)
+        obs = Table.from_arrays(data.astype(np.uint32), ['O1', 'O2'],
+                                ['S1', 'S2', 'S3'], dtype='float32')
+        self.assertEqual(obs.dtype, np.float32)
+
+    def test_storage_dtypes(self):
+        data = np.array([[0, 1, 2], [3, 0, 5]])
+        for dtype in (np.uint32, np.int64, np.float32, np.float64):
+            t = Table(data, ['O1', 'O2'], ['S1', 'S2', 'S3'], dtype=dtype)
+            self.assertEqual(t.dtype, dtype)
+            npt.assert_equal(t.matrix_data.toarray(), data)
+            self.assertEqual(t.copy().dtype, dtype)
+            self.assertEqual(t.transpose().dtype, dtype)
+
+        self.assertEqual(Table(data, ['O1', 'O2'], ['S1', 'S2', 'S3']).dtype,
+                         np.float64)
+        for dtype in (np.int32, 'U5', 'foo'):
+            with self.assertRaises(TableException):
+                Table(data, ['O1', 'O2'], ['S1', 'S2', 'S3'], dtype=dtype)
+
+    def test_astype(self):
+        t = Table(np.array([[0, 1.5, 2], [3, 0, 5]]), ['O1', 'O2'],
+                  ['S1', 'S2', 'S3'], [{'a': 1}, {'a': 2}], None, 'x')
+        exp = t.copy()
+        obs = t.astype('uint32')
+        self.assertEqual(obs.dtype, np.uint32)
+        npt.assert_equal(obs.matrix_data.toarray(), [[0, 1, 2], [3, 0, 5]])
+        self.assertEqual(obs.table_id, 'x')
+        self.assertIs(obs._get_metadata('observation')[0],
+                      t._get_metadata('observation')[0])
+
+        obs.metadata('O1', 'observation')['a'] = 4
+        self.assertEqual(t, exp)
+        obs.add_metadata({'O1': {'a': 3}}, axis='observation')
+        self.assertEqual(t, exp)
+        self.assertEqual(obs.astype(float).dtype, np.float64)
+
+        with self.assertRaises(TableException):
+            t.astype(np.int8)
+
+    def test_storage_dtype_kept(self):
+        t = Table(np.array([[0, 2, 3, 1], [4, 0, 2, 0], [1, 1, 0, 0]]),
+                  ['O1', 'O2', 'O3'], ['S1', 'S2', 'S3', 'S4'],
+                  sample_metadata=[{'g': 'a'}, {'g': 'b'}, {'g': 'a'},
+                                   {'g': 'b'}], dtype='uint32')
+
+        seen = []
+
+        def f(values, id_, md):
+            seen.append(values.dtype)
+            return values.sum() > 2
+
+        obs = t.filter(f, inplace=False)
+        self.assertEqual(obs.dtype, np.uint32)
+        self.assertEqual(set(seen), {np.dtype(np.uint32)})
+        self.assertEqual(list(obs.ids()), ['S1', 'S2', 'S3'])
+        obs = t.filter(None, axis='observation', min_total=5, inplace=False)
+        self.assertEqual(list(obs.ids(axis='observation')), ['O1', 'O2'])
+        self.assertEqual(obs.dtype, np.uint32)
+
+        obs = t.subsample(2, seed=42)
+        self.assertEqual(obs.dtype, np.uint32)
+        npt.assert_equal(obs.sum(axis='sample'), [2, 2, 2])
+        obs = t.subsample(3, with_replacement=True, seed=42)
+        self.assertEqual(obs.dtype, np.uint32)
+        npt.assert_equal(obs.sum(axis='sample'), [3, 3, 3, 3])
+
+        obs = t.collapse(lambda id_, md: md['g'], norm=False)
+        self.assertEqual(obs.dtype, np.uint32)
+        npt.assert_equal(obs.matrix_data.toarray(), [[3, 3], [6, 0], [1, 1]])
+
+        parts = dict(t.partition(lambda id_, md: md['g']))
+        self.assertEqual(parts['a'].dtype, np.uint32)
+
+        obs = t.merge(t.astype('int64'))
+        self.assertEqual(obs.dtype, np.int64)
+        npt.assert_equal(obs.matrix_data.toarray(),
+                         2 * t.matrix_data.toarray())
+
+        other = t.copy()
+        other.update_ids({'S1': 'S5', 'S2': 'S6', 'S3': 'S7', 'S4': 'S8'})
+        self.assertEqual(t.concat([other]).dtype, np.uint32)
+
+        self.assertEqual(t.pa(inplace=False).dtype, np.uint32)
+        self.assertEqual(t.sort(axis='observation').dtype, np.uint32)
+
+    def test_storage_dtype_overflow(self):
+        big = 3 * 10 ** 9
+        t = Table(np.array([[big, big], [1, 2]]), ['O1', 'O2'], ['S1', 'S2'],
+                  sample_metadata=[{'g': 'a'}, {'g': 'a'}], dtype='uint32')
+
+        # sums which do not fit in uint32 are kept in int64
+        obs = t.collapse(lambda id_, md: md['g'], norm=False)
+        self.assertEqual(obs.dtype, np.int64)
+        npt.assert_equal(obs.matrix_data.toarray(), [[2 * big], [3]])
+        npt.assert_equal(t.reduce(add, 'observation'), [2 * big, 3])
+        npt.assert_equal(t.reduce(add, 'sample'), [big + 1, big + 2])
+
+        t = Table(np.array([[2 ** 32 - 1]]), ['O1'], ['S1'], dtype='uint32')
+        other = Table(np.array([[1]]), ['O1'], ['S1'], dtype='uint32')
+        obs = t.merge(other)
+        self.assertEqual(obs.dtype, np.int64)
+        npt.assert_equal(obs.matrix_data.toarray(), [[2 ** 32]])
+
+        # and sums which fit are kept in the storage dtype
+        other = Table(np.array([[0]]), ['O1'], ['S1'], dtype='uint32')
+        self.assertEqual(t.merge(other).dtype, np.uint32)
+
+    def test_storage_dtype_upcast(self):
+        t = Table(np.array([[2, 0], [6, 1]]), ['O1', 'O2'], ['S1', 'S2'],
+                  dtype='uint32')
+        obs = t.norm(inplace=False)
+        self.assertEqual(obs.dtype, np.float64)
+        npt.assert_almost_equal(obs.matrix_data.toarray(),
+                                [[0.25, 0.], [0.75, 1.]])
+        self.assertEqual(t.dtype, np.uint32)
+
+        self.assertEqual(t.rankdata(inplace=False).dtype, np.float64)
+        self.assertEqual(t.astype('float32').norm(inplace=False).dtype,
+                         np.float32)
+
+        # the distance of a smaller count to a larger one does not wrap
+        npt.assert_almost_equal(t.pairwise('braycurtis'),
+                                t.astype(float).pairwise('braycurtis'))
+
+        obs = t.transform(lambda v, id_, md: v / 4., inplace=False,
+                          dtype='float32')
+        self.assertEqual(obs.dtype, np.float32)
+        npt.assert_almost_equal(obs.matrix_data.toarray(),
+                                [[0.5, 0.], [1.5, 0.25]])
+
+        self.assertEqual(loads(t.to_json('tests'))['matrix_element_type'],
+                         'int')
+
+    @npt.dec.skipif(HAVE_H5PY is False, msg='H5PY is not installed')
+    def test_hdf5_storage_dtypes(self):
+        data = np.array([[0, 1, 2], [3, 0, 5]])
+        for dtype in (np.uint32, np.int64, np.float32, np.float64):
+            t = Table(data, ['O1', 'O2'], ['S1', 'S2', 'S3'], dtype=dtype)
+            with NamedTemporaryFile() as tmpfile:
+                with h5py.File(tmpfile.name, 'w') as h5:
+                    t.to_hdf5(h5, 'tests')
+
+                with h5py.File(tmpfile.name, 'r') as h5:
+                    self.assertEqual(h5['sample/matrix/data'].dtype, dtype)
+                    self.assertEqual(Table.from_hdf5(h5), t)
+                    obs = Table.from_hdf5(h5, ids=['S2', 'S3'])
+                    self.assertEqual(obs.dtype, dtype)
+                    obs = Table.from_hdf5(h5, ids=['S2'],
+                                          subset_with_metadata=False)
+                    self.assertEqual(obs.dtype, dtype)
+                    obs = Table.from_hdf5(h5, dtype='float32')
+                    self.assertEqual(obs.dtype, np.float32)
+
+                    lazy = LazyTable(h5)
+                    self.assertEqual(lazy.dtype, dtype)
+                    self.assertEqual(lazy.data('S3').dtype, dtype)
+                    self.assertEqual(lazy.copy(), t)
+
+    def test_from_arrays_errors(self):
+        with self.assertRaises(TableException):
+            Table.from_arrays(np.array([[1, 2]]), ['O1'], ['S1', 'S2'])
+        with self.assertRaises(TableException):
+            Table.from_arrays(csr_matrix(np.array([[1, 2]])), ['O1'],
+                              ['S1', 'S2'], sample_metadata=[1, 2])
+
+        # only checked if asked to
+        data = csr_matrix(np.array([[1, 2]]))
+        Table.from_arrays(data, ['O1'], ['S1', 'S1'])
+        with self.assertRaises(TableException):
+            Table.from_arrays(data, ['O1'], ['S1', 'S1'], validate=True)
+        with self.assertRaises(TableException):
+            Table.from_arrays(data, ['O1'], ['S1'], validate=True)
+
     def test_index_ids(self):
         """Index all the ids!!!"""
         exp_samp = {1: 0, 2: 1}
@@ -1371,6 +1772,11 @@ class TableTests(TestCase):
         obs = self.st1._union_id_order(a, b)
         self.assertEqual(obs, exp)
 
+        c = ['b', 7, 1]
+        exp.update({'b': 8, 7: 9})
+        obs = self.st1._union_id_order(a, b, c)
+        self.assertEqual(obs, exp)
+
     def test_intersect_id_order(self):
         """Combine ids, intersection"""
         a = [1, 2, 3, 4]
@@ -1379,6 +1785,9 @@ class TableTests(TestCase):
         obs = self.st1._intersect_id_order(a, b)
         self.assertEqual(obs, exp)
 
+        obs = self.st1._intersect_id_order(a, b, [4, 'a', 1])
+        self.assertEqual(obs, {4: 0})
+
     def test_verify_metadata(self):
         """Make sure the metadata is sane (including obs/sample ids)"""
         obs_ids = [1, 2, 3]
@@ -2012,6 +2421,24 @@ class SparseTableTests(TestCase):
         npt.assert_equal(self.st1.reduce(f, 'sample'), np.array([17, 20]))
         npt.assert_equal(self.st1.reduce(f, 'observation'), np.array([16, 22]))
 
+    def test_reduce_ufunc(self):
+        """Reduce with functions computed on the sparse matrix"""
+        data = np.array([[0, 2, -1, 0], [3, 4, 0, 0], [0, 0, 0, 0],
+                         [1, 5, 2, 7]])
+        t = Table(data, ['a', 'b', 'c', 'd'], ['w', 'x', 'y', 'z'])
+        t_int = Table(csr_matrix(data), ['a', 'b', 'c', 'd'],
+                      ['w', 'x', 'y', 'z'])
+
+        funcs = [add, np.add, mul, np.multiply, max, np.maximum, np.fmax, min,
+                 np.minimum, np.fmin]
+        for table in (t, t_int):
+            for f in funcs:
+                for axis, dense in (('observation', data), ('sample', data.T)):
+                    exp = np.array([reduce(f, v) for v in dense])
+                    obs = table.reduce(f, axis)
+                    npt.assert_equal(obs, exp)
+                    self.assertEqual(obs.dtype, table.dtype)
+
     def test_transpose(self):
         """Should transpose a sparse table"""
         obs = self.st1.transpose()
@@ -2143,6 +2570,55 @@ class SparseTableTests(TestCase):
         with self.assertRaises(UnknownAxisError):
             self.st1.sort_order(['b', 'a'], axis='foo')
 
+    def test_sort_order_permutes(self):
+        data = scipy.sparse.random(6, 5, density=0.5, format='csr',
+                                   random_state=2)
+        t = Table(data, ['O%d' % i for i in range(6)],
+                  ['S%d' % i for i in range(5)],
+                  [{'o': i} for i in range(6)],
+                  [{'s': i} for i in range(5)])
+        dense = data.toarray()
+
+        obs = t.sort_order(['S3', 'S0', 'S4', 'S1', 'S2'])
+        npt.assert_equal(obs.matrix_data.toarray(), dense[:, [3, 0, 4, 1, 2]])
+        self.assertEqual([md['s'] for md in obs.metadata()], [3, 0, 4, 1, 2])
+        self.assertEqual(obs.index('S4', 'sample'), 2)
+        self.assertEqual(obs.metadata(axis='observation'),
+                         t.metadata(axis='observation'))
+
+        order = ['O5', 'O1', 'O0', 'O3', 'O2', 'O4']
+        obs = t.sort_order(order, axis='observation')
+        npt.assert_equal(obs.ids(axis='observation'), order)
+        npt.assert_equal(obs.matrix_data.toarray(), dense[[5, 1, 0, 3, 2, 4]])
+        self.assertEqual([md['o'] for md in obs.metadata(axis='observation')],
+                         [5, 1, 0, 3, 2, 4])
+        self.assertEqual(obs.index('O0', 'observation'), 2)
+
+        # metadata changed in the sorted table are not changed in the table
+        obs.add_metadata({'O0': {'o': 'x'}}, axis='observation')
+        self.assertEqual(t.metadata('O0', axis='observation')['o'], 0)
+
+        with self.assertRaises(UnknownIDError):
+            t.sort_order(['S0', 'foo'])
+        with six.assertRaisesRegex(self, TableException, 'Duplicate sample'):
+            t.sort_order(['S0', 'S0', 'S1'])
+        with six.assertRaisesRegex(self, TableException,
+                                   'Duplicate observation'):
+            t.sort_order(['O1', 'O0', 'O1'], axis='observation')
+
+    def test_permute_compressed(self):
+        data = scipy.sparse.random(4, 6, density=0.5, format='csr',
+                                   random_state=3)
+        order = np.array([2, 0, 3, 1])
+        obs = _permute_compressed(data, order)
+        self.assertEqual(obs.format, 'csr')
+        npt.assert_equal(obs.toarray(), data.toarray()[order])
+
+        order = np.array([5, 1, 1, 0])
+        obs = _permute_compressed(data.tocsc(), order)
+        self.assertEqual(obs.format, 'csc')
+        npt.assert_equal(obs.toarray(), data.toarray()[:, order])
+
     def test_sort(self):
         """table sorted by a function and provided axis"""
         # sort by samples by a function
@@ -2316,6 +2792,76 @@ class SparseTableTests(TestCase):
         # test 12
         self.assertRaises(TableException, self.st1.merge, self.st4, u, i)
 
+        with self.assertRaises(TableException):
+            self.st1.merge(self.st3, sample='foo')
+        with self.assertRaises(TableException):
+            self.st1.merge(self.st3, observation='foo')
+
+    def test_merge_many(self):
+        """Merge many tables in one pass"""
+        u = 'union'
+        i = 'intersection'
+        t5 = Table(np.array([[1, 2], [3, 0]]), ['2', '4'], ['b', 'd'])
+
+        for sample, observation in ((u, u), (u, i), (i, u), (i, i)):
+            exp = self.st1
+            for t in (self.st3, self.st1, t5):
+                exp = exp.merge(t, sample=sample, observation=observation)
+            obs = self.st1.merge_many([self.st3, self.st1, t5], sample,
+                                      observation)
+            self.assertEqual(obs, exp)
+
+        self.assertEqual(self.st1.merge_many([]), self.st1)
+
+        data = {(0, 0): 5, (0, 1): 6, (0, 2): 0, (0, 3): 0,
+                (1, 0): 7, (1, 1): 8, (1, 2): 0, (1, 3): 0,
+                (2, 0): 0, (2, 1): 0, (2, 2): 1, (2, 3): 2,
+                (3, 0): 0, (3, 1): 0, (3, 2): 3, (3, 3): 4}
+        exp = Table(data, ['1', '2', '3', '4'], ['a', 'b', 'c', 'd'])
+        self.assertEqual(self.st1.merge_many([self.st4]), exp)
+
+        with self.assertRaises(TableException):
+            self.st1.merge_many([self.st3, self.st4], sample=i)
+        with self.assertRaises(TableException):
+            self.st1.merge_many([self.st3], observation='foo')
+
+    def test_merge_many_metadata(self):
+        """Metadata functions are applied to the tables in order"""
+        def md(t, ids):
+            return [{'src': '%s%s' % (t, id_)} for id_ in ids]
+
+        def join(x, y):
+            x = x['src'] if x is not None else '-'
+            y = y['src'] if y is not None else '-'
+            return {'src': '%s,%s' % (x, y)}
+
+        a = Table(np.array([[1, 2], [3, 4]]), ['1', '2'], ['a', 'b'],
+                  md('a', ['1', '2']), md('a', ['a', 'b']))
+        b = Table(np.array([[1, 2], [3, 4]]), ['2', '3'], ['b', 'c'],
+                  None, md('b', ['b', 'c']))
+        c = Table(np.array([[1, 2]]), ['3'], ['a', 'd'],
+                  md('c', ['3']), md('c', ['a', 'd']))
+
+        exp = a.merge(b, sample_metadata_f=join, observation_metadata_f=join)
+        exp = exp.merge(c, sample_metadata_f=join, observation_metadata_f=join)
+        obs = a.merge_many([b, c], sample_metadata_f=join,
+                           observation_metadata_f=join)
+        self.assertEqual(obs, exp)
+        self.assertEqual(obs.metadata('a')['src'], 'aa,-,ca')
+        self.assertEqual(obs.metadata('c')['src'], '-,bc,-')
+        self.assertEqual(obs.metadata('d')['src'], '-,cd')
+        self.assertEqual(obs.metadata('3', axis='observation')['src'],
+                         '-,-,c3')
+
+        # missing metadata is not materialized as an empty dict between
+        # tables, so the metadata of '3' is taken from c
+        obs = a.merge_many([b, c])
+        self.assertEqual([md['src'] for md in obs.metadata()],
+                         ['aa', 'ab', 'bc', 'cd'])
+        self.assertEqual([md['src'] for md in
+                          obs.metadata(axis='observation')],
+                         ['a1', 'a2', 'c3'])
+
     def test_data(self):
         """"""
         # Returns observations for a given sample
@@ -2471,6 +3017,52 @@ class SparseTableTests(TestCase):
         obs = list(self.st1.iter_pairwise(dense=True, tri=False, diag=False))
         npt.assert_equal(obs, exp)
 
+    def test_pairwise(self):
+        data = scipy.sparse.random(40, 30, density=0.2, format='csr',
+                                   random_state=1)
+        data.data = np.round(data.data * 10)
+        data = data.toarray()
+        data[3] = 0
+        data[:, 5] = 0
+        t = Table(data, ['O%d' % i for i in range(40)],
+                  ['S%d' % i for i in range(30)])
+
+        for metric in ('braycurtis', 'cosine', 'euclidean', 'jaccard',
+                       'canberra', lambda u, v: np.abs(u - v).max()):
+            for axis, vectors in (('sample', data.T), ('observation', data)):
+                if metric == 'jaccard':
+                    vectors = vectors != 0
+                exp = pdist(vectors, metric)
+                for block_size in (1, 7, 256):
+                    obs = t.pairwise(metric, axis=axis, block_size=block_size)
+                    npt.assert_almost_equal(obs, exp)
+                obs = t.pairwise(metric, axis=axis, block_size=4, n_threads=3)
+                npt.assert_almost_equal(obs, exp)
+
+    def test_pairwise_out(self):
+        exp = pdist(self.st1.matrix_data.toarray().T, 'braycurtis')
+        with NamedTemporaryFile() as tmpfile:
+            obs = self.st1.pairwise(out=tmpfile.name)
+            self.assertIsInstance(obs, np.memmap)
+            npt.assert_almost_equal(obs, exp)
+            npt.assert_almost_equal(np.fromfile(tmpfile.name), exp)
+
+        # a single vector has no distances
+        t = self.st1.filter(['a'], inplace=False)
+        with NamedTemporaryFile() as tmpfile:
+            obs = t.pairwise(out=tmpfile.name)
+            npt.assert_equal(obs, np.empty(0))
+            self.assertEqual(os.path.getsize(tmpfile.name), 0)
+        npt.assert_equal(t.pairwise(), np.empty(0))
+
+    def test_pairwise_errors(self):
+        with self.assertRaises(UnknownAxisError):
+            self.st1.pairwise(axis='foo')
+        with self.assertRaises(ValueError):
+            self.st1.pairwise('foo')
+        with self.assertRaises(ValueError):
+            self.st1.pairwise(block_size=0)
+
     def test_iter(self):
         """Should iterate over samples"""
         exp = [(np.array([5, 7]), 'a', None), (np.array([6, 8]), 'b', None)]
@@ -2612,6 +3204,115 @@ class SparseTableTests(TestCase):
         self.st_rich._data *= 2
         self.assertNotEqual(copied_table, self.st_rich)
 
+    def test_lazy_copy(self):
+        exp = self.st_rich.copy()
+        obs = self.st_rich.transform(lambda v, i, md: v * 2, inplace=False)
+        self.assertIs(obs.ids(), self.st_rich.ids())
+        self.assertIs(obs._get_metadata('observation'),
+                      self.st_rich._get_metadata('observation'))
+        npt.assert_equal(obs.matrix_data.toarray(),
+                         exp.matrix_data.toarray() * 2)
+        self.assertEqual(self.st_rich, exp)
+
+        # the metadata handed out by either table are its own
+        obs.metadata('1', axis='observation')['taxonomy'] = ['k__x']
+        self.assertEqual(self.st_rich, exp)
+        obs = self.st_rich.norm(inplace=False)
+        self.st_rich.metadata(axis='observation')[0]['taxonomy'] = ['k__x']
+        self.assertEqual(obs.metadata('1', axis='observation')['taxonomy'],
+                         ['k__a', 'p__b'])
+        self.st_rich = exp.copy()
+
+        # including the values nested in them
+        obs = self.st_rich.filter(['a'], inplace=False)
+        obs.metadata(axis='observation')[0]['taxonomy'].append('c__x')
+        self.assertEqual(self.st_rich, exp)
+        obs = self.st_rich.norm(inplace=False)
+        self.st_rich.metadata('1', axis='observation')['taxonomy'].append('x')
+        self.assertEqual(obs.metadata('1', axis='observation')['taxonomy'],
+                         ['k__a', 'p__b'])
+        self.st_rich = exp.copy()
+        obs = self.st_rich.transform(lambda v, i, md: v * 2, inplace=False)
+
+        # the metadata are copied once either table modifies them
+        obs.add_metadata({'a': {'barcode': 'gggg'}})
+        self.assertEqual(obs.metadata('a')['barcode'], 'gggg')
+        self.assertEqual(self.st_rich, exp)
+        self.st_rich.del_metadata(['taxonomy'], axis='observation')
+        self.assertEqual(obs.metadata('1', axis='observation')['taxonomy'],
+                         ['k__a', 'p__b'])
+
+    def test_partition_shares_metadata(self):
+        t = self.st_rich.copy()
+        exp = t.copy()
+        parts = dict(t.partition(lambda id_, md: md['barcode']))
+        self.assertEqual(sorted(parts), ['aatt', 'ttgg'])
+        self.assertEqual(parts['aatt'], exp.filter(['a'], inplace=False))
+        self.assertIs(parts['aatt']._get_metadata()[0],
+                      t._get_metadata()[0])
+
+        parts['aatt'].metadata('a')['barcode'] = 'gggg'
+        self.assertEqual(t, exp)
+        parts['aatt'].add_metadata({'a': {'barcode': 'gggg'}})
+        self.assertEqual(t, exp)
+
+    def test_cache_layouts(self):
+        t = self.st_rich.copy()
+        exp = t.copy()
+        data = t.matrix_data
+        t.cache_layouts()
+
+        # alternating between the axes converts the matrix once
+        npt.assert_equal(t.data('a'), exp.data('a'))
+        csc = t._get_sparse_data()
+        npt.assert_equal(t.data('1', axis='observation'),
+                         exp.data('1', axis='observation'))
+        npt.assert_equal(t.data('b'), exp.data('b'))
+        self.assertIs(t.matrix_data, data)
+        self.assertIs(t._get_sparse_data(), csc)
+        self.assertEqual(t, exp)
+
+        # the cached layout is dropped when the matrix is modified
+        t.transform(lambda v, i, md: v * 2, axis='observation')
+        npt.assert_equal(t.data('a'), exp.data('a') * 2)
+        self.assertIsNot(t._get_sparse_data(), csc)
+
+        # a conversion over the budget is not cached
+        t.cache_layouts(max_bytes=1)
+        self.assertIsNone(t._layout_cache)
+        self.assertIsNot(t._get_sparse_data(), t._get_sparse_data())
+        npt.assert_equal(t.data('a'), exp.data('a') * 2)
+        self.assertEqual(t.matrix_data.format, 'csc')
+
+        t.cache_layouts()
+        t.filter(['b'])
+        npt.assert_equal(t.data('1', axis='observation'), [12.])
+        npt.assert_equal(t.data('b'), [12., 16.])
+        t.cache_layouts(0)
+        self.assertIsNone(t._layout_cache)
+
+    def test_lazy_copy_filter(self):
+        exp = self.st_rich.copy()
+        data = self.st_rich.matrix_data
+        obs = self.st_rich.filter(['b'], inplace=False)
+        self.assertIs(self.st_rich.matrix_data, data)
+        self.assertEqual(self.st_rich, exp)
+        self.assertEqual(obs, exp.filter(['b'], inplace=False))
+
+        # the filtered table owns its matrix, and can filter it in place
+        data = obs.matrix_data
+        obs.filter(['2'], axis='observation')
+        self.assertIs(obs.matrix_data, data)
+        self.assertEqual(self.st_rich, exp)
+
+        obs = self.st_rich.pa(inplace=False)
+        self.assertEqual(self.st_rich, exp)
+        obs = self.st_rich.subsample(5, seed=0)
+        self.assertEqual(self.st_rich, exp)
+        obs = self.st_rich.update_ids({'a': 'x', 'b': 'y'}, inplace=False)
+        self.assertIs(obs.matrix_data, self.st_rich.matrix_data)
+        self.assertEqual(self.st_rich, exp)
+
     def test_filter_table_with_zeros(self):
         table = self.sparse_table
         f_sample = lambda vals, id_, md: vals.size == table.shape[0]
@@ -2818,6 +3519,63 @@ class SparseTableTests(TestCase):
         self.assertEqual(t_sample.shape, (2, 0))
         self.assertEqual(t_obs.shape, (0, 3))
 
+    def test_filter_vectorized(self):
+        def f(data, ids, md):
+            self.assertEqual(data.getformat(), 'csc')
+            self.assertIsNone(md)
+            return np.asarray(data.sum(axis=0)).ravel() > 5
+
+        obs = self.sparse_table.filter(f, vectorized=True, inplace=False)
+        npt.assert_equal(obs.ids(), ['S2', 'S3'])
+        obs = self.sparse_table.filter(f, vectorized=True, invert=True,
+                                       inplace=False)
+        npt.assert_equal(obs.ids(), ['S1', 'S4'])
+
+        obs = self.sparse_table.filter(
+            lambda data, ids, md: ids != 'O2', axis='observation',
+            vectorized=True, inplace=False)
+        exp = self.sparse_table.filter(['O1', 'O3'], axis='observation',
+                                       inplace=False)
+        self.assertEqual(obs, exp)
+
+        with self.assertRaises(ValueError):
+            self.sparse_table.filter(lambda data, ids, md: [True],
+                                     vectorized=True)
+        with self.assertRaises(TypeError):
+            self.sparse_table.filter(['S1'], vectorized=True)
+
+    def test_filter_min_total_min_nnz(self):
+        obs = self.sparse_table.filter(min_total=6, inplace=False)
+        npt.assert_equal(obs.ids(), ['S2', 'S3'])
+        obs = self.sparse_table.filter(min_nnz=1, inplace=False)
+        npt.assert_equal(obs.ids(), ['S1', 'S2', 'S3'])
+        obs = self.sparse_table.filter(min_total=4, min_nnz=2,
+                                       axis='observation', inplace=False)
+        npt.assert_equal(obs.ids(axis='observation'), ['O2'])
+
+        # combined with the other filters, then inverted
+        obs = self.sparse_table.filter(['S1', 'S2'], min_total=2,
+                                       inplace=False)
+        npt.assert_equal(obs.ids(), ['S2'])
+        obs = self.sparse_table.filter(['S1', 'S2'], min_total=2,
+                                       invert=True, inplace=False)
+        npt.assert_equal(obs.ids(), ['S1', 'S3', 'S4'])
+        obs = self.sparse_table.filter(lambda v, i, md: v[0] == 0,
+                                       min_nnz=1, inplace=False)
+        npt.assert_equal(obs.ids(), ['S2'])
+
+        # explicitly stored zeros are not counted
+        t = self.sparse_table.copy()
+        t._data.data[t._data.data == 5] = 0
+        obs = t.filter(min_nnz=2, axis='observation', inplace=False)
+        npt.assert_equal(obs.ids(axis='observation'), ['O1', 'O2'])
+
+    def test_filter_general_does_not_densify_stale_values(self):
+        seen = []
+        self.sparse_table.filter(lambda v, i, md: seen.append(v.copy()),
+                                 axis='observation')
+        npt.assert_equal(seen, [[1, 0, 2, 0], [0, 3, 4, 0], [0, 5, 0, 0]])
+
     def test_subsample(self):
         table = Table(np.array([[0, 5, 0]]), ['O1'], ['S1', 'S2', 'S3'])
 
@@ -2838,6 +3596,97 @@ class SparseTableTests(TestCase):
         self.assertEqual(actual_o2, {(0, 3, 3), (0, 2, 3), (0, 3, 2),
                                      (0, 2, 2)})
 
+    def test_subsample_observation(self):
+        table = Table(np.array([[5, 5, 0], [1, 0, 2]]), ['O1', 'O2'],
+                      ['S1', 'S2', 'S3'])
+        for i in range(10):
+            obs = table.subsample(4, axis='observation')
+            npt.assert_equal(obs.sum(axis='observation'), np.array([4]))
+            self.assertEqual(obs.ids(axis='observation'), ['O1'])
+
+    def test_subsample_seed(self):
+        data = np.array([[3, 1, 0, 30, 9], [0, 3, 3, 2, 14], [5, 8, 1, 0, 11],
+                         [2, 6, 9, 4, 0]])
+        table = Table(data, ['O1', 'O2', 'O3', 'O4'],
+                      ['S1', 'S2', 'S3', 'S4', 'S5'])
+
+        for with_replacement in (False, True):
+            exp = table.subsample(7, with_replacement=with_replacement,
+                                  seed=42)
+            npt.assert_equal(exp.sum(axis='sample'), np.array([7] * 5))
+            for n_threads in (1, 2, 3, 8):
+                obs = table.subsample(7, with_replacement=with_replacement,
+                                      seed=42, n_threads=n_threads)
+                self.assertEqual(obs, exp)
+
+            obs = table.subsample(7, with_replacement=with_replacement,
+                                  seed=np.random.RandomState(42))
+            self.assertEqual(obs, exp)
+
+        obs = set()
+        for seed in range(20):
+            obs.add(tuple(table.subsample(7, seed=seed).data('S5')))
+        self.assertGreater(len(obs), 1)
+
+        exp = table.subsample(2, by_id=True, seed=3)
+        obs = table.subsample(2, by_id=True, seed=3)
+        self.assertEqual(obs, exp)
+
+    def test_subsample_keeps_all(self):
+        table = Table(np.array([[3, 0], [2, 4]]), ['O1', 'O2'], ['S1', 'S2'])
+        obs = table.subsample(4, seed=0)
+        npt.assert_equal(obs.data('S2'), np.array([0, 4]))
+        self.assertEqual(obs.data('S1').sum(), 4)
+
+        obs = table.subsample(5, seed=0)
+        self.assertEqual(obs.ids(), ['S1'])
+        npt.assert_equal(obs.data('S1'), np.array([3, 2]))
+
+    def test_rarefy_many(self):
+        data = np.array([[3, 1, 0, 30, 9], [0, 3, 3, 2, 14], [5, 8, 1, 0, 11],
+                         [2, 6, 9, 4, 0]])
+        table = Table(data, ['O1', 'O2', 'O3', 'O4'],
+                      ['S1', 'S2', 'S3', 'S4', 'S5'],
+                      [{'taxonomy': ['k__a', 'p__%d' % i]} for i in range(4)],
+                      [{'env': i} for i in range(5)])
+
+        for axis in ('sample', 'observation'):
+            for with_replacement in (False, True):
+                rng = np.random.RandomState(7)
+                obs = list(table.rarefy_many(
+                    [2, 13, 20], 3, axis=axis,
+                    with_replacement=with_replacement,
+                    seed=np.random.RandomState(7)))
+                self.assertEqual([(d, i) for d, i, _ in obs],
+                                 [(2, 0), (2, 1), (2, 2), (13, 0), (13, 1),
+                                  (13, 2), (20, 0), (20, 1), (20, 2)])
+                for depth, _, t in obs:
+                    exp = table.subsample(depth, axis=axis,
+                                          with_replacement=with_replacement,
+                                          seed=rng)
+                    self.assertEqual(t, exp)
+
+        # the metadata are shared rather than copied
+        depth, iteration, obs = next(table.rarefy_many(20, seed=0))
+        npt.assert_equal(obs.ids(), np.array(['S4', 'S5']))
+        self.assertIs(obs._get_metadata()[0],
+                      table._get_metadata()[table.index('S4', 'sample')])
+        self.assertIs(obs._get_metadata('observation')[0],
+                      table._get_metadata('observation')[0])
+
+        with self.assertRaises(ValueError):
+            list(table.rarefy_many([10, -1]))
+
+    def test_rarefy_many_columnar_metadata(self):
+        table = Table(np.array([[3, 1, 0], [0, 3, 3]]), ['O1', 'O2'],
+                      ['S1', 'S2', 'S3'], None,
+                      ColumnarMetadata({'env': ['a', 'b', 'c']}))
+        obs = [t for _, _, t in table.rarefy_many([4], 2, seed=0)]
+        for t in obs:
+            self.assertIsInstance(t.metadata(), ColumnarMetadata)
+            self.assertEqual(t.ids(), ['S2'])
+            self.assertEqual(t.metadata('S2')['env'], 'b')
+
     def test_subsample_md_copy_bug(self):
         """subsample would except when if metadata were present"""
         table = Table(np.array([[5, 5, 5]]), ['O1'], ['S1', 'S2', 'S3'],
@@ -3223,6 +4072,47 @@ class SparseTableTests(TestCase):
                      {'collapsed_ids': ['b', 'd', 'f']}])
         self.assertEqual(obs, exp)
 
+    def test_collapse_norm_min_group_size(self):
+        table = Table(np.array([[1, 2, 0, 4],
+                                [5, 0, 7, 8],
+                                [0, 3, 2, 1]]),
+                      ['a', 'b', 'c'], ['s1', 's2', 's3', 's4'], None,
+                      [{'env': 'x'}, {'env': 'y'}, {'env': 'x'},
+                       {'env': 'z'}])
+        partition_f = lambda id_, md: md['env']
+
+        obs = table.collapse(partition_f, min_group_size=2)
+        exp = Table(np.array([[0.5], [6], [1]]), ['a', 'b', 'c'], ['x'],
+                    None, [{'collapsed_ids': ['s1', 's3']}])
+        self.assertEqual(obs, exp)
+
+        obs = table.collapse(partition_f, norm=False)
+        exp = Table(np.array([[1, 2, 4], [12, 0, 8], [2, 3, 1]]),
+                    ['a', 'b', 'c'], ['x', 'y', 'z'], None,
+                    [{'collapsed_ids': ['s1', 's3']},
+                     {'collapsed_ids': ['s2']},
+                     {'collapsed_ids': ['s4']}])
+        self.assertEqual(obs, exp)
+
+        obs = table.collapse(partition_f, norm=False, min_group_size=3)
+        self.assertEqual(obs.shape, (3, 0))
+
+    def test_collapse_one_to_many_divide_unmapped(self):
+        """Vectors without a partition are dropped"""
+        table = Table(np.array([[3, 6], [2, 4], [1, 1]]), ['a', 'b', 'c'],
+                      ['s1', 's2'], [{'p': ['x', 'y']}, {'p': []},
+                                     {'p': ['y']}])
+
+        def bin_f(id_, md):
+            for part in md['p']:
+                yield (part, part)
+
+        obs = table.collapse(bin_f, norm=False, one_to_many=True,
+                             one_to_many_mode='divide', axis='observation')
+        exp = Table(np.array([[1.5, 3], [2.5, 4]]), ['x', 'y'],
+                    ['s1', 's2'], [{'Path': 'x'}, {'Path': 'y'}])
+        self.assertEqual(obs, exp)
+
     def test_collapse_observations_by_metadata(self):
         """Collapse observations by arbitrary metadata"""
         dt_rich = Table(
@@ -3528,6 +4418,24 @@ class SparseTableTests(TestCase):
         reloaded = Table.from_json(loads(serialized))
         self.assertEqual(t, reloaded)
 
+    def test_to_json_no_samples(self):
+        t = Table(np.zeros((2, 0)), ['a', 'b'], [])
+        serialized = loads(t.to_json('foo'))
+        self.assertEqual(serialized['shape'], [2, 0])
+        self.assertEqual(serialized['data'], [])
+        self.assertEqual([r['id'] for r in serialized['rows']], ['a', 'b'])
+        self.assertEqual(serialized['columns'], [])
+
+    def test_json_triples(self):
+        mat = csr_matrix((np.array([2., 0., 1., 0.5, 3.]),
+                          np.array([2, 0, 1, 0, 1]),
+                          np.array([0, 3, 3, 5])), shape=(3, 3))
+        self.assertFalse(mat.has_sorted_indices)
+        exp = [[0, 1, 1.0], [0, 2, 2.0], [2, 0, 0.5], [2, 1, 3.0]]
+        for chunk_nnz in (1, 2, 100):
+            chunks = list(_json_triples(mat, chunk_nnz=chunk_nnz))
+            self.assertEqual(loads('[%s]' % ','.join(chunks)), exp)
+
     def test_to_json_dense_int(self):
         """Get a BIOM format string for a dense table of integers"""
         # check by round trip
@@ -3740,6 +4648,50 @@ class SparseTableTests(TestCase):
             with self.assertRaises(TypeError):
                 Table._extract_data_from_tsv(tsv, dtype=int)
 
+    def test_extract_data_from_tsv_chunked(self):
+        exp = Table._extract_data_from_tsv(legacy_otu_table1.splitlines(),
+                                           dtype=int)
+
+        # an iterator can be read only once, and chunks of a single value
+        # split the table on every line
+        progress = []
+        obs = Table._extract_data_from_tsv(
+            iter(legacy_otu_table1.splitlines()), dtype=int, chunk_size=1,
+            progress=progress.append)
+        npt.assert_equal(obs, exp)
+        self.assertEqual(progress, [1, 2, 3, 4, 5])
+
+        obs = Table._extract_data_from_tsv(legacy_otu_table1.splitlines(),
+                                           dtype=int, sparse=True)
+        self.assertTrue(isinstance(obs[2], csr_matrix))
+        npt.assert_equal(obs[2].toarray(),
+                         [[19111, 44536, 42], [1216, 3500, 6],
+                          [1803, 1184, 2], [1722, 4903, 17],
+                          [589, 2074, 34]])
+        self.assertEqual(obs[:2] + obs[3:], exp[:2] + exp[3:])
+
+    def test_extract_data_from_tsv_no_observations(self):
+        obs = Table._extract_data_from_tsv(['#OTU ID\ta\tb'], sparse=True)
+        self.assertEqual(obs[:2], (['a', 'b'], []))
+        self.assertEqual(obs[2].shape, (0, 2))
+
+    def test_extract_data_from_tsv_fallback(self):
+        # a dtype which numpy does not know is applied to each value
+        tsv = ['#OTU ID\ta\tb', '1\t2\t0', '2\t0\t6']
+        obs = Table._extract_data_from_tsv(tsv, dtype=lambda x: int(x) * 2)
+        self.assertEqual(obs[2], [[0, 0, 4], [1, 1, 12]])
+
+    def test_extract_data_from_tsv_wrong_number_of_values(self):
+        tsv = ['#OTU ID\ta\tb', '1\t2\t3', '2\t6']
+        with six.assertRaisesRegex(self, TypeError,
+                                   "Expected 2 values on line 2, found 1"):
+            Table._extract_data_from_tsv(tsv, dtype=int)
+
+        tsv = ['#OTU ID\ta\tb', '1\t2\t', '2\t6\t7']
+        with six.assertRaisesRegex(self, TypeError,
+                                   "Expected 2 values on line 1, found 1"):
+            Table._extract_data_from_tsv(tsv, dtype=int)
+
     def test_bin_samples_by_metadata(self):
         """Yield tables binned by sample metadata"""
         f = lambda id_, md: md.get('age', np.inf)
@@ -3888,6 +4840,410 @@ class SparseTableTests(TestCase):
         npt.assert_almost_equal(self.st7.get_table_density(), 0.75)
 
 
+class ColumnarMetadataTests(TestCase):
+
+    def setUp(self):
+        self.rows = [{'env': 'a', 'taxonomy': ['k__x', 'p__y']},
+                     {'env': 'b'},
+                     None,
+                     {'env': 'a', 'taxonomy': ['k__x', 'p__z']}]
+        self.md = ColumnarMetadata.from_rows(self.rows)
+
+    def test_init(self):
+        md = ColumnarMetadata({'env': ['a', 'b'], 'depth': np.array([1, 2])})
+        self.assertEqual(len(md), 2)
+        self.assertEqual(sorted(md.categories), ['depth', 'env'])
+        self.assertEqual(md[1], {'env': 'b', 'depth': 2})
+
+        md = ColumnarMetadata({}, 3)
+        self.assertEqual(len(md), 3)
+        self.assertEqual(md[0], {})
+
+        with self.assertRaises(ValueError):
+            ColumnarMetadata({'env': ['a', 'b'], 'depth': [1]})
+        with self.assertRaises(ValueError):
+            ColumnarMetadata({})
+
+    def test_from_rows(self):
+        self.assertEqual(len(self.md), 4)
+        self.assertEqual(sorted(self.md.categories), ['env', 'taxonomy'])
+        self.assertEqual(list(self.md),
+                         [self.rows[0], self.rows[1], {}, self.rows[3]])
+
+    def test_column(self):
+        npt.assert_equal(self.md.column('env'), ['a', 'b', None, 'a'])
+        self.assertEqual(list(self.md.column('taxonomy')),
+                         [['k__x', 'p__y'], None, None, ['k__x', 'p__z']])
+        with self.assertRaises(KeyError):
+            self.md.column('foo')
+
+    def test_getitem(self):
+        row = self.md[-1]
+        self.assertIsInstance(row, MetadataRow)
+        self.assertIsInstance(row, dict)
+        self.assertEqual(row['env'], 'a')
+        self.assertIsNone(row['foo'])
+        self.assertNotIn('foo', row)
+        self.assertIsNone(self.md[1]['taxonomy'])
+        self.assertNotIn('taxonomy', self.md[1])
+
+        with self.assertRaises(IndexError):
+            self.md[4]
+
+        obs = self.md[1:3]
+        self.assertIsInstance(obs, ColumnarMetadata)
+        self.assertEqual(list(obs), [{'env': 'b'}, {}])
+        obs = self.md[np.array([3, 0])]
+        self.assertEqual(list(obs), [self.rows[3], self.rows[0]])
+        obs = self.md[np.array([True, False, False, True])]
+        self.assertEqual(list(obs), [self.rows[0], self.rows[3]])
+
+    def test_row_writes_through(self):
+        row = self.md[2]
+        row['env'] = 'c'
+        row.update({'depth': 5})
+        self.assertEqual(self.md[2], {'env': 'c', 'depth': 5})
+        self.assertIsNone(self.md[0]['depth'])
+        self.assertNotIn('depth', self.md[0])
+
+        del self.md[0]['taxonomy']
+        self.assertEqual(self.md[0], {'env': 'a'})
+        self.assertEqual(self.md[3].pop('env'), 'a')
+        self.assertEqual(self.md[3], {'taxonomy': ['k__x', 'p__z']})
+
+    def test_copy(self):
+        obs = deepcopy(self.md)
+        self.assertIsInstance(obs, ColumnarMetadata)
+        self.assertEqual(obs, self.md)
+        obs[0]['taxonomy'].append('c__w')
+        obs[1]['env'] = 'c'
+        self.assertEqual(self.md[0]['taxonomy'], ['k__x', 'p__y'])
+        self.assertEqual(self.md[1]['env'], 'b')
+        # missing values remain missing in the copy
+        self.assertNotIn('taxonomy', obs[2])
+
+        row = deepcopy(self.md[0])
+        self.assertNotIsInstance(row, MetadataRow)
+        row['env'] = 'c'
+        self.assertEqual(self.md[0]['env'], 'a')
+
+    def test_eq(self):
+        self.assertEqual(self.md, ColumnarMetadata.from_rows(self.rows))
+        self.assertEqual(self.md, [self.rows[0], self.rows[1], {},
+                                   self.rows[3]])
+        self.assertNotEqual(self.md, self.md[:2])
+        self.assertNotEqual(self.md, ColumnarMetadata.from_rows(self.rows[1:]
+                                                                + [{}]))
+
+
+class ColumnarMetadataTableTests(TestCase):
+
+    def setUp(self):
+        data = np.array([[0, 1, 2], [3, 0, 5], [6, 7, 0]])
+        obs_md = [{'taxonomy': ['k__a', 'p__b']},
+                  {'taxonomy': ['k__a', 'p__c']},
+                  {'taxonomy': ['k__b', 'p__d']}]
+        samp_md = [{'env': 'x'}, {'env': 'y'}, {'env': 'x'}]
+        self.rows = Table(data, ['O1', 'O2', 'O3'], ['S1', 'S2', 'S3'],
+                          obs_md, samp_md)
+        self.cols = Table(data, ['O1', 'O2', 'O3'], ['S1', 'S2', 'S3'],
+                          ColumnarMetadata.from_rows(obs_md),
+                          ColumnarMetadata.from_rows(samp_md))
+
+    def assert_columnar(self, table):
+        self.assertIsInstance(table.metadata(), ColumnarMetadata)
+        self.assertIsInstance(table.metadata(axis='observation'),
+                              ColumnarMetadata)
+
+    def test_lazy_copy_metadata_rows(self):
+        exp = self.cols.copy()
+        obs = self.cols.norm(inplace=False)
+        self.assertIs(obs._get_metadata('observation'),
+                      self.cols._get_metadata('observation'))
+        obs.metadata('O1', axis='observation')['taxonomy'] = ['k__z']
+        self.assertEqual(obs.metadata('O1', axis='observation')['taxonomy'],
+                         ['k__z'])
+        self.assertEqual(self.cols, exp)
+
+        obs = self.cols.norm(inplace=False)
+        self.cols.metadata(axis='observation')[0]['taxonomy'] = ['k__z']
+        self.assertEqual(obs.metadata('O1', axis='observation')['taxonomy'],
+                         ['k__a', 'p__b'])
+        obs = self.cols.filter(['S1'], inplace=False)
+        obs.metadata('O2', axis='observation')['taxonomy'].append('c__z')
+        self.assertEqual(self.cols.metadata('O2', 'observation')['taxonomy'],
+                         ['k__a', 'p__c'])
+
+    def test_init(self):
+        self.assert_columnar(self.cols)
+        self.assertEqual(self.cols, self.rows)
+        self.assertEqual(self.rows, self.cols)
+        self.assertEqual(self.cols.metadata('S2')['env'], 'y')
+        self.assertIsNone(self.cols.metadata('S2')['foo'])
+
+        t = Table(self.rows.matrix_data, ['O1', 'O2', 'O3'],
+                  ['S1', 'S2', 'S3'], sample_metadata=ColumnarMetadata({}, 3))
+        self.assertIsNone(t.metadata())
+
+    def test_copy_transpose(self):
+        obs = self.cols.copy()
+        self.assert_columnar(obs)
+        self.assertEqual(obs, self.rows)
+        obs.metadata('S1')['env'] = 'z'
+        self.assertEqual(self.cols.metadata('S1')['env'], 'x')
+
+        obs = self.cols.transpose()
+        self.assert_columnar(obs)
+        self.assertEqual(obs, self.rows.transpose())
+
+    def test_filter(self):
+        for ids_to_keep in (['S3', 'S1'], lambda v, i, md: md['env'] == 'x'):
+            obs = self.cols.filter(ids_to_keep, inplace=False)
+            self.assert_columnar(obs)
+            self.assertEqual(obs, self.rows.filter(ids_to_keep,
+                                                   inplace=False))
+
+        obs = self.cols.filter(['O2'], axis='observation', invert=True)
+        self.assert_columnar(obs)
+        self.assertEqual(
+            list(obs.metadata(axis='observation').column('taxonomy')),
+            [['k__a', 'p__b'], ['k__b', 'p__d']])
+
+    def test_sort_order(self):
+        obs = self.cols.sort_order(['S3', 'S1', 'S2'])
+        self.assert_columnar(obs)
+        self.assertEqual(obs, self.rows.sort_order(['S3', 'S1', 'S2']))
+
+    def test_merge(self):
+        obs = self.cols.merge(self.cols)
+        self.assert_columnar(obs)
+        self.assertEqual(obs, self.rows.merge(self.rows))
+
+    def test_add_del_metadata(self):
+        self.cols.add_metadata({'S1': {'depth': 5}, 'S2': {'depth': 6},
+                                'S3': {'depth': 7}})
+        self.assertEqual(self.cols.metadata('S2'), {'env': 'y', 'depth': 6})
+        self.cols.del_metadata(['env'], axis='sample')
+        self.assertEqual(self.cols.metadata('S2'), {'depth': 6})
+
+    @npt.dec.skipif(HAVE_H5PY is False, msg='H5PY is not installed')
+    def test_hdf5_roundtrip(self):
+        with NamedTemporaryFile(suffix='.biom') as tmpfile:
+            with h5py.File(tmpfile.name, 'w') as fp:
+                self.cols.to_hdf5(fp, 'tests')
+            with h5py.File(tmpfile.name, 'r') as fp:
+                obs = Table.from_hdf5(fp, columnar_metadata=True)
+                obs_subset = Table.from_hdf5(fp, ids=['S1', 'S3'],
+                                             columnar_metadata=True)
+                exp = Table.from_hdf5(fp)
+
+        self.assert_columnar(obs)
+        self.assertEqual(obs, self.rows)
+        self.assertEqual(exp, self.rows)
+        self.assert_columnar(obs_subset)
+        self.assertEqual(obs_subset, self.rows.filter(['S1', 'S3'],
+                                                      inplace=False))
+
+    @npt.dec.skipif(HAVE_H5PY is False, msg='H5PY is not installed')
+    def test_to_hdf5_inconsistent(self):
+        self.cols.metadata('S2')['depth'] = 4
+        with NamedTemporaryFile(suffix='.biom') as tmpfile:
+            with h5py.File(tmpfile.name, 'w') as fp:
+                with six.assertRaisesRegex(self, ValueError,
+                                           'S2 has inconsistent'):
+                    self.cols.to_hdf5(fp, 'tests')
+
+
+class LazyTableTests(TestCase):
+
+    def setUp(self):
+        data = np.array([[0, 1, 2, 0], [3, 0, 0, 4], [0, 0, 0, 0],
+                         [5, 6, 0, 7], [0, 8, 9, 0]])
+        self.table = Table(data, ['O1', 'O2', 'O3', 'O4', 'O5'],
+                           ['S1', 'S2', 'S3', 'S4'],
+                           [{'taxonomy': ['k__a', 'p__b']},
+                            {'taxonomy': ['k__a', 'p__c']},
+                            {'taxonomy': ['k__a', 'p__d']},
+                            {'taxonomy': ['k__b', 'p__e']},
+                            {'taxonomy': ['k__b', 'p__f']}],
+                           [{'env': 'a'}, {'env': 'b'}, {'env': 'a'},
+                            {'env': 'b'}], 'foo', type='OTU table')
+
+        if HAVE_H5PY:
+            self.tmpfile = NamedTemporaryFile(suffix='.biom')
+            with h5py.File(self.tmpfile.name, 'w') as fp:
+                self.table.to_hdf5(fp, 'tests', compress=False)
+            self.lazy = load_table(self.tmpfile.name, lazy=True)
+
+    def tearDown(self):
+        if HAVE_H5PY:
+            self.lazy.close()
+            self.tmpfile.close()
+
+    def assert_not_loaded(self, table):
+        self.assertNotIn('_data', table.__dict__)
+
+    @npt.dec.skipif(HAVE_H5PY is False, msg='H5PY is not installed')
+    def test_metadata_categories(self):
+        with h5py.File(self.tmpfile.name, 'r') as fp:
+            lazy = LazyTable(fp, metadata=['env'])
+            self.assertEqual(lazy.metadata(axis='observation'), None)
+            self.assertEqual(lazy.metadata(), self.table.metadata())
+
+    @npt.dec.skipif(HAVE_H5PY is False, msg='H5PY is not installed')
+    def test_hdf5_read_subset(self):
+        with h5py.File(self.tmpfile.name, 'r') as fp:
+            grp = fp['sample/matrix']
+            indptr = grp['indptr'][:]
+            mat = self.table.matrix_data.tocsc()
+            for idx in ([], [0], [3, 1], [1, 2, 3], [0, 3], [2, 0, 2],
+                        [1, 1], [3, 2, 1, 0]):
+                for max_gap in (0, 1, 8192):
+                    cs = _hdf5_read_subset(grp, indptr, idx, max_gap)
+                    obs = csc_matrix(cs, shape=(5, len(idx)))
+                    npt.assert_equal(obs.toarray(), mat[:, idx].toarray())
+
+    @npt.dec.skipif(HAVE_H5PY is False, msg='H5PY is not installed')
+    def test_load_table_lazy(self):
+        self.assertIsInstance(self.lazy, LazyTable)
+        self.assert_not_loaded(self.lazy)
+        self.assertEqual(self.lazy.shape, (5, 4))
+        self.assertEqual(self.lazy.nnz, 9)
+        self.assertEqual(self.lazy.table_id, 'foo')
+        self.assertEqual(self.lazy.type, 'OTU table')
+        npt.assert_equal(self.lazy.ids(), self.table.ids())
+        npt.assert_equal(self.lazy.ids(axis='observation'),
+                         self.table.ids(axis='observation'))
+        self.assert_not_loaded(self.lazy)
+
+        # not an HDF5 file, so fully loaded
+        t = load_table(get_data_path('test.json'), lazy=True)
+        self.assertNotIsInstance(t, LazyTable)
+
+    @npt.dec.skipif(HAVE_H5PY is False, msg='H5PY is not installed')
+    def test_context_manager(self):
+        with load_table(self.tmpfile.name, lazy=True) as t:
+            npt.assert_equal(t.data('S2'), [1, 0, 0, 6, 8])
+        with self.assertRaises(ValueError):
+            t.data('S2')
+
+    @npt.dec.skipif(HAVE_H5PY is False, msg='H5PY is not installed')
+    def test_data(self):
+        for axis in ('sample', 'observation'):
+            for id_ in self.table.ids(axis=axis):
+                npt.assert_equal(self.lazy.data(id_, axis=axis),
+                                 self.table.data(id_, axis=axis))
+                obs = self.lazy.data(id_, axis=axis, dense=False)
+                exp = self.table.data(id_, axis=axis, dense=False)
+                npt.assert_equal(obs.toarray(), exp.toarray())
+        self.assert_not_loaded(self.lazy)
+
+    @npt.dec.skipif(HAVE_H5PY is False, msg='H5PY is not installed')
+    def test_getitem(self):
+        for i in range(-5, 5):
+            for j in range(-4, 4):
+                self.assertEqual(self.lazy[i, j], self.table[i, j])
+        npt.assert_equal(self.lazy[1, :].toarray(),
+                         self.table[1, :].toarray())
+        npt.assert_equal(self.lazy[:, 2].toarray(),
+                         self.table[:, 2].toarray())
+        self.assert_not_loaded(self.lazy)
+
+        with self.assertRaises(IndexError):
+            self.lazy[5, 0]
+        with self.assertRaises(IndexError):
+            self.lazy[:, :]
+
+    @npt.dec.skipif(HAVE_H5PY is False, msg='H5PY is not installed')
+    def test_iter(self):
+        self.lazy._chunk_size = 3
+        for axis in ('sample', 'observation'):
+            for dense in (True, False):
+                obs = list(self.lazy.iter(dense=dense, axis=axis))
+                exp = list(self.table.iter(dense=dense, axis=axis))
+                self.assertEqual(len(obs), len(exp))
+                for (o_v, o_i, o_m), (e_v, e_i, e_m) in zip(obs, exp):
+                    if not dense:
+                        o_v, e_v = o_v.toarray(), e_v.toarray()
+                    npt.assert_equal(o_v, e_v)
+                    self.assertEqual(o_i, e_i)
+                    self.assertEqual(o_m, e_m)
+        self.assert_not_loaded(self.lazy)
+
+    @npt.dec.skipif(HAVE_H5PY is False, msg='H5PY is not installed')
+    def test_filter(self):
+        def f(values, id_, md):
+            return values.sum() > 10
+
+        for axis in ('sample', 'observation'):
+            for ids_to_keep in (f, self.table.ids(axis=axis)[[2, 0]]):
+                for invert in (True, False):
+                    obs = self.lazy.filter(ids_to_keep, axis=axis,
+                                           invert=invert, inplace=False)
+                    exp = self.table.filter(ids_to_keep, axis=axis,
+                                            invert=invert, inplace=False)
+                    self.assertIs(type(obs), Table)
+                    self.assertEqual(obs, exp)
+        self.assert_not_loaded(self.lazy)
+
+        def g(data, ids, md):
+            return np.asarray(data.sum(axis=axis_num)).ravel() > 10
+
+        self.lazy._chunk_size = 2
+        for axis, axis_num in (('sample', 0), ('observation', 1)):
+            for kwargs in ({'min_total': 11}, {'min_nnz': 2},
+                           {'ids_to_keep': g, 'vectorized': True},
+                           {'ids_to_keep': f, 'min_nnz': 3}):
+                obs = self.lazy.filter(axis=axis, inplace=False, **kwargs)
+                exp = self.table.filter(axis=axis, inplace=False, **kwargs)
+                self.assertEqual(obs, exp)
+        self.assert_not_loaded(self.lazy)
+
+        with self.assertRaises(TypeError):
+            self.lazy.filter(42)
+
+    @npt.dec.skipif(HAVE_H5PY is False, msg='H5PY is not installed')
+    def test_filter_inplace(self):
+        self.lazy.filter(['S4', 'S2'])
+        self.table.filter(['S4', 'S2'])
+        npt.assert_equal(self.lazy.ids(), ['S2', 'S4'])
+        self.assertEqual(self.lazy.copy(), self.table)
+
+        # subsequent operations act on the filtered table
+        self.lazy.filter(lambda v, i, md: v.sum() > 0, axis='observation')
+        self.table.filter(lambda v, i, md: v.sum() > 0, axis='observation')
+        self.assertEqual(self.lazy.copy(), self.table)
+        npt.assert_equal(self.lazy.data('O2', axis='observation'), [0, 4])
+
+    @npt.dec.skipif(HAVE_H5PY is False, msg='H5PY is not installed')
+    def test_metadata(self):
+        self.assertNotIn('_sample_metadata', self.lazy.__dict__)
+        self.assertEqual(self.lazy.metadata(), self.table.metadata())
+        self.assertEqual(self.lazy.metadata(axis='observation'),
+                         self.table.metadata(axis='observation'))
+        self.assertEqual(self.lazy.metadata('S2')['env'], 'b')
+        self.assert_not_loaded(self.lazy)
+
+    @npt.dec.skipif(HAVE_H5PY is False, msg='H5PY is not installed')
+    def test_loads_on_demand(self):
+        obs = self.lazy.sum('sample')
+        npt.assert_equal(obs, self.table.sum('sample'))
+        self.assertIn('_data', self.lazy.__dict__)
+        self.assertEqual(self.lazy.copy(), self.table)
+
+        # derived tables are regular tables
+        obs = self.lazy.sort_order(['S3', 'S1', 'S2', 'S4'])
+        self.assertIs(type(obs), Table)
+        self.assertIs(type(self.lazy.transpose()), Table)
+
+    @npt.dec.skipif(HAVE_H5PY is False, msg='H5PY is not installed')
+    def test_copy(self):
+        obs = self.lazy.copy()
+        self.assertIs(type(obs), Table)
+        self.assertEqual(obs, self.table)
+        self.assert_not_loaded(self.lazy)
+
+
 class SupportTests2(TestCase):
 
     def test_coo_arrays_to_sparse(self):
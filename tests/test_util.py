@@ -22,7 +22,8 @@ from biom.parse import parse_biom_table, load_table
 from biom.util import (natsort, flatten, unzip, HAVE_H5PY,
                        get_biom_project_dir, parse_biom_config_files,
                        compute_counts_per_sample_stats, safe_md5, biom_open,
-                       get_data_path, generate_subsamples, is_hdf5_file)
+                       get_data_path, generate_subsamples, is_hdf5_file,
+                       _natsort_key)
 
 np.random.seed(1234)
 
@@ -60,6 +61,12 @@ class UtilTests(TestCase):
         self.assertEqual(actual_o2, {(0, 3, 3), (0, 2, 3), (0, 3, 2),
                                      (0, 2, 2)})
 
+    def test_natsort_key(self):
+        self.assertEqual(_natsort_key('sample12'),
+                         ([(1, 'sample'), (0, 12), (1, '')], 'sample12'))
+        self.assertEqual(_natsort_key(12), ([(1, ''), (0, 12), (1, '')],
+                                            '12'))
+
     def test_natsort(self):
         """natsort should perform numeric comparisons on strings
 